@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Listing, User, ListingImage, ListingVideo
+from .models import Listing, User, ListingImage, ListingVideo, Job
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from . import moderation
 
 class CustomUserAdmin(UserAdmin):
     add_form = CustomUserCreationForm
@@ -29,13 +30,17 @@ class CustomUserAdmin(UserAdmin):
     
     actions = ['approve_verification', 'reject_verification']
 
+    # The changelist counts matches on every page; skip the second, unfiltered count
+    show_full_result_count = False
+
     def approve_verification(self, request, queryset):
-        rows_updated = queryset.update(verification_status='approved', is_verified_student=True)
+        # Chunked update() that also refreshes cached cards and pages (core.moderation)
+        rows_updated = moderation.set_verification(queryset.values_list('id', flat=True), approved=True)
         self.message_user(request, f"{rows_updated} users verified.")
     approve_verification.short_description = "Approve selected users' verification"
 
     def reject_verification(self, request, queryset):
-        rows_updated = queryset.update(verification_status='rejected', is_verified_student=False)
+        rows_updated = moderation.set_verification(queryset.values_list('id', flat=True), approved=False)
         self.message_user(request, f"{rows_updated} users verification rejected.")
     reject_verification.short_description = "Reject selected users' verification"
 
@@ -50,15 +55,26 @@ class ListingVideoInline(admin.TabularInline):
 
 class ListingAdmin(admin.ModelAdmin):
     list_display = ('title', 'listing_type', 'posted_by', 'is_verified_listing', 'created_at')
+    # posted_by is shown on every row: fetch it in the changelist query
+    list_select_related = ('posted_by',)
     list_filter = ('listing_type', 'is_verified_listing')
-    search_fields = ('title', 'location', 'posted_by__email')
+    # Poster email by exact match, which uses the unique index on User.email
+    search_fields = ('title', 'location', '=posted_by__email')
+    show_full_result_count = False
     inlines = [ListingImageInline, ListingVideoInline]
+    exclude = ('tags',)  # Derived from `interests` on save (core.signals)
     
     actions = ['verify_listings']
 
     def verify_listings(self, request, queryset):
-        queryset.update(is_verified_listing=True)
+        moderation.review_listings(queryset.values_list('id', flat=True), approved=True)
     verify_listings.short_description = "Mark selected listings as Verified"
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'started_at', 'finished_at', 'last_error')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Listing, ListingAdmin)
+admin.site.register(Job, JobAdmin)
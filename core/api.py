@@ -0,0 +1,259 @@
+"""
+Read-only JSON API (v1) for the mobile app.
+
+    /api/v1/listings/                  feed; same filters as the HTML pages
+    /api/v1/listings/<id>/             one listing with gallery and videos
+    /api/v1/users/<id>/listings/       a poster's profile and listings
+
+Rows are fetched with values() and serialized straight from the dicts, so no
+Listing instances are built. `?fields=id,title,rent` selects a sparse
+fieldset, which also narrows the SELECT. Feeds use the same cursors as the
+HTML pages (core.pagination / core.search). Every response carries an ETag
+over its body, answers If-None-Match with 304, and is gzipped when the client
+accepts it.
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from . import search, tags
+from .models import Listing, ListingImage, ListingVideo, User
+from .pagination import FEED_PAGE_SIZE, paginate_feed
+from .view_counter import view_counter
+
+API_CACHE_MAX_AGE = 30
+MAX_PAGE_SIZE = 50
+
+# Public field name -> the values() lookups it needs
+LISTING_FIELDS = {
+    'id': ['id'],
+    'title': ['title'],
+    'description': ['description'],
+    'rent': ['rent'],
+    'location': ['location'],
+    'listing_type': ['listing_type'],
+    'gender_preference': ['gender_preference'],
+    'level_preference': ['level_preference'],
+    'interests': ['interests'],
+    'is_verified_listing': ['is_verified_listing'],
+    'views_count': ['views_count'],
+    'created_at': ['created_at'],
+    'latitude': ['latitude'],
+    'longitude': ['longitude'],
+    'image': ['image', 'image_count'],
+    'has_video': ['video_count'],
+    'poster': ['posted_by_id', 'posted_by__full_name', 'posted_by__is_verified_student', 'posted_by__profile_picture'],
+}
+FEED_FIELDS = ['id', 'title', 'rent', 'location', 'listing_type', 'image', 'is_verified_listing', 'created_at', 'poster']
+DETAIL_FIELDS = list(LISTING_FIELDS)
+# Always selected: the keyset cursor needs them
+CURSOR_LOOKUPS = ['id', 'is_verified_listing', 'created_at']
+
+
+class BadRequest(Exception):
+    pass
+
+
+# --- Responses ---
+
+def _etag_matches(header, etag):
+    # gzip_page turns our ETag into a weak one; compare the opaque part
+    tags_sent = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in tags_sent or etag in tags_sent
+
+
+def json_response(request, payload, status=200):
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+    if status == 200 and _etag_matches(request.headers.get('If-None-Match', ''), etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={API_CACHE_MAX_AGE}'
+    return response
+
+
+def api_view(view):
+    """GET/HEAD only, gzip, and BadRequest -> 400 JSON."""
+    @require_safe
+    @gzip_page
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return json_response(request, {'error': str(e)}, status=400)
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+def not_found(request):
+    return json_response(request, {'error': "Not found."}, status=404)
+
+
+# --- Query helpers ---
+
+def parse_fields(request, default):
+    raw = request.GET.get('fields')
+    if not raw:
+        return default
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LISTING_FIELDS]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(LISTING_FIELDS)}.")
+    return fields
+
+
+def parse_decimal(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise BadRequest(f"{name} must be a number.")
+
+
+def parse_page_size(request):
+    try:
+        size = int(request.GET.get('limit', FEED_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit must be a whole number.")
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def select_fields(queryset, fields):
+    lookups = list(CURSOR_LOOKUPS)
+    for field in fields:
+        lookups += [lookup for lookup in LISTING_FIELDS[field] if lookup not in lookups]
+    return queryset.values(*lookups)
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+def serialize(row, fields):
+    data = {}
+    for field in fields:
+        if field == 'poster':
+            data['poster'] = {
+                'id': row['posted_by_id'],
+                'name': row['posted_by__full_name'],
+                'verified_student': row['posted_by__is_verified_student'],
+                'avatar': media_url(row['posted_by__profile_picture']),
+            }
+        elif field == 'image':
+            data['image'] = media_url(row['image'])
+        elif field == 'has_video':
+            data['has_video'] = row['video_count'] > 0
+        elif field == 'rent':
+            rent = row['rent']
+            data['rent'] = int(rent) if rent == rent.to_integral_value() else float(rent)
+        elif field == 'interests':
+            data['interests'] = [name.strip() for name in (row['interests'] or '').split(',') if name.strip()]
+        else:
+            data[field] = row[field]
+    return data
+
+
+def page_url(request, next_cursor):
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = next_cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+# --- Views ---
+
+@api_view
+def listings(request):
+    """The house / roommate feed with the filters of the HTML pages."""
+    fields = parse_fields(request, FEED_FIELDS)
+    page_size = parse_page_size(request)
+    queryset = Listing.objects.all()
+
+    listing_type = request.GET.get('type')
+    if listing_type:
+        if listing_type not in dict(Listing.LISTING_TYPE_CHOICES):
+            raise BadRequest("type must be 'house' or 'roommate'.")
+        queryset = queryset.filter(listing_type=listing_type)
+    min_budget = parse_decimal(request, 'min_budget')
+    max_budget = parse_decimal(request, 'max_budget')
+    if min_budget is not None:
+        queryset = queryset.filter(rent__gte=min_budget)
+    if max_budget is not None:
+        queryset = queryset.filter(rent__lte=max_budget)
+    gender = request.GET.get('gender')
+    if gender:
+        queryset = queryset.filter(gender_preference=gender)
+    queryset = tags.filter_by_tags(queryset, request.GET.getlist('tags'), request.GET.get('tag_mode', 'all'))
+
+    q = request.GET.get('q')
+    if q and not search.search_available():
+        queryset = search.fallback_filter(queryset, q, search.FTS_COLUMNS)
+    queryset = select_fields(queryset, fields)
+    if q and search.search_available():
+        rows, next_cursor = search.search_feed(queryset, q, cursor=request.GET.get('cursor'), page_size=page_size)
+    else:
+        rows, next_cursor = paginate_feed(queryset, request.GET.get('cursor'), page_size)
+
+    return json_response(request, {
+        'results': [serialize(row, fields) for row in rows],
+        'next': page_url(request, next_cursor),
+    })
+
+
+@api_view
+def listing_detail(request, id):
+    fields = parse_fields(request, DETAIL_FIELDS)
+    row = select_fields(Listing.objects.filter(id=id), fields).first()
+    if row is None:
+        return not_found(request)
+    view_counter.record(id)
+
+    data = serialize(row, fields)
+    if 'poster' in fields:
+        poster = User.objects.filter(id=row['posted_by_id']).values('phone_number').first()
+        data['poster']['phone_number'] = poster['phone_number'] if poster else None
+    # The counters spare the gallery / video queries for listings without any
+    if 'image' in fields:
+        images = ListingImage.objects.filter(listing_id=id).values_list('image', flat=True) if row['image_count'] else []
+        data['images'] = [media_url(name) for name in images]
+    if 'has_video' in fields:
+        videos = ListingVideo.objects.filter(listing_id=id).values_list('video', flat=True) if row['video_count'] else []
+        data['videos'] = [media_url(name) for name in videos]
+    return json_response(request, data)
+
+
+@api_view
+def user_listings(request, user_id):
+    user = User.objects.filter(id=user_id).values(
+        'id', 'full_name', 'department', 'is_verified_student', 'profile_picture',
+    ).first()
+    if user is None:
+        return not_found(request)
+    fields = parse_fields(request, FEED_FIELDS)
+    queryset = select_fields(Listing.objects.filter(posted_by_id=user_id), fields)
+    rows, next_cursor = paginate_feed(queryset, request.GET.get('cursor'), parse_page_size(request))
+    return json_response(request, {
+        'user': {
+            'id': user['id'],
+            'name': user['full_name'],
+            'department': user['department'],
+            'verified_student': user['is_verified_student'],
+            'avatar': media_url(user['profile_picture']),
+            'url': reverse('user_profile', args=[user['id']]),
+        },
+        'results': [serialize(row, fields) for row in rows],
+        'next': page_url(request, next_cursor),
+    })
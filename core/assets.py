@@ -0,0 +1,353 @@
+"""
+Static asset pipeline: minification, precompression, serving and budgets.
+
+`collectstatic` runs through core.storage.MinifiedManifestStaticFilesStorage,
+which minifies the project's own CSS and JS (MINIFY_PREFIXES), names every
+file after a hash of its (minified) content (css/styles.3c1f0e8a9b2d.css)
+and writes `.gz` and, if the brotli package is installed, `.br` variants
+next to each compressible file.
+
+serve_static() sends the collected files. It picks the smallest variant the
+client accepts (Vary: Accept-Encoding). Hashed names never change content,
+so they are cached for a year as `immutable`; other names are revalidated.
+
+page_assets() / asset_sizes() back `manage.py asset_budget`, which reports
+how many static bytes each page template pulls in.
+
+The minifiers are deliberately conservative: comments and redundant
+whitespace go, nothing is renamed or rewritten, and line breaks in JS are
+kept so automatic semicolon insertion still sees them.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .media import _not_modified
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MINIFY_PREFIXES = ('css/', 'js/')
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ico')
+# A variant is only kept if it saves at least this share of the bytes
+MIN_COMPRESSION_SAVING = 0.05
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Content-Encoding -> file suffix, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+DEFAULT_BUDGET_BYTES = 100 * 1024
+
+
+# --- Minification ---
+
+# Punctuation is a token of its own, so the whitespace around it can go
+CSS_TOKEN_RE = re.compile(
+    r'''/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|\s+|[{};:,>]|[^\s"'/{};:,>]+|/''', re.S
+)
+# No whitespace needed before / after these (a space before `:` can be a
+# descendant combinator, as in `a :hover`, so that one is kept)
+CSS_TIGHT_BEFORE = set('{};,>')
+CSS_TIGHT_AFTER = CSS_TIGHT_BEFORE | {':'}
+
+
+def minify_css(css):
+    out = []
+    for token in CSS_TOKEN_RE.findall(css):
+        if token.startswith('/*'):
+            continue
+        if token.isspace():
+            # Whitespace matters between words ("0 auto") and in calc(a + b)
+            if out and out[-1] != ' ' and out[-1][-1] not in CSS_TIGHT_AFTER:
+                out.append(' ')
+            continue
+        if token in CSS_TIGHT_BEFORE and out and out[-1] == ' ':
+            out.pop()
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+    return ''.join(out).strip()
+
+
+JS_WORD = re.compile(r'[\w$\\]')
+# After these a `/` starts a regular expression, not a division
+JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+# ... and so do these keywords (`return /x/.test(s)`)
+JS_REGEX_AFTER_WORDS = {
+    'return', 'typeof', 'case', 'in', 'of', 'void', 'delete', 'instanceof', 'new', 'throw', 'yield', 'await',
+    'else', 'do',
+}
+
+
+def minify_js(js):
+    out = []
+    i, n = 0, len(js)
+    pending_space = None  # None, ' ' or '\n'
+
+    def last_char():
+        return out[-1][-1] if out else ''
+
+    def emit(text):
+        nonlocal pending_space
+        if pending_space and out:
+            prev, nxt = last_char(), text[0]
+            if pending_space == '\n':
+                out.append('\n')
+            elif (JS_WORD.match(prev) and JS_WORD.match(nxt)) or (prev == nxt and prev in '+-'):
+                out.append(' ')
+        pending_space = None
+        out.append(text)
+
+    while i < n:
+        c = js[i]
+        if c in ' \t\r\n':
+            j = i
+            while j < n and js[j] in ' \t\r\n':
+                j += 1
+            pending_space = '\n' if '\n' in js[i:j] or pending_space == '\n' else pending_space or ' '
+            i = j
+        elif js.startswith('//', i):
+            i = js.find('\n', i)
+            i = n if i < 0 else i
+        elif js.startswith('/*', i):
+            end = js.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            if '\n' in js[i:end]:
+                pending_space = '\n'
+            elif not pending_space:
+                pending_space = ' '
+            i = end
+        elif c in '"\'`' or (c == '/' and (not out or last_char() in JS_REGEX_AFTER or out[-1] in JS_REGEX_AFTER_WORDS)):
+            # Strings, template literals and regex literals are copied as is
+            j = i + 1
+            in_class = False
+            while j < n:
+                if js[j] == '\\':
+                    j += 2
+                    continue
+                if c == '/':
+                    if js[j] == '[':
+                        in_class = True
+                    elif js[j] == ']':
+                        in_class = False
+                    elif js[j] == '/' and not in_class:
+                        break
+                elif js[j] == c:
+                    break
+                j += 1
+            j += 1
+            if c == '/':
+                while j < n and js[j].isalpha():
+                    j += 1
+            emit(js[i:j])
+            i = j
+        else:
+            j = i + 1
+            if JS_WORD.match(c):
+                while j < n and JS_WORD.match(js[j]):
+                    j += 1
+            emit(js[i:j])
+            i = j
+    return ''.join(out)
+
+
+def should_minify(name):
+    return name.startswith(MINIFY_PREFIXES) and name.endswith(('.css', '.js')) and '.min.' not in name
+
+
+def minify(name, data):
+    """Minified bytes for `name`, or `data` unchanged if it isn't minified."""
+    if not should_minify(name):
+        return data
+    text = data.decode('utf-8')
+    text = minify_css(text) if name.endswith('.css') else minify_js(text)
+    return text.encode('utf-8')
+
+
+# --- Precompression ---
+
+def is_compressible(name):
+    return name.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress(data):
+    """{suffix: bytes} for the encodings available here."""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_variants(path):
+    """Writes the compressed variants of the file at `path`. Returns their paths."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for suffix, compressed in compress(data).items():
+        if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        written.append(path + suffix)
+    return written
+
+
+# --- Serving ---
+
+def accepted_encodings(header):
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+@lru_cache(maxsize=1)
+def immutable_names():
+    # The manifest is read once per process; a deploy restarts the workers
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+@require_safe
+def serve_static(request, path):
+    path = path.lstrip('/')
+    if not path or path.endswith(tuple(suffix for _, suffix in ENCODINGS)) or not settings.STATIC_ROOT:
+        raise Http404
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    encoding = None
+    if is_compressible(path):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                encoding, full_path = coding, full_path + suffix
+                break
+
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if path in immutable_names():
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = 'public, no-cache'
+        if is_compressible(path):
+            response['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return finish(HttpResponseNotModified())
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = stat.st_size
+        return finish(response)
+    return finish(FileResponse(open(full_path, 'rb'), content_type=content_type))
+
+
+# --- Per-page budget ---
+
+STATIC_TAG_RE = re.compile(r'''{%\s*static\s+['"]([^'"]+)['"]''')
+EXTENDS_RE = re.compile(r'''{%\s*extends\s+['"]([^'"]+)['"]''')
+INCLUDE_RE = re.compile(r'''{%\s*include\s+['"]([^'"]+)['"]''')
+# Third-party scripts and stylesheets (not preconnect hints)
+EXTERNAL_RE = re.compile(
+    r'''<script\b[^>]*\bsrc=["'](https?://[^"']+)["']'''
+    r'''|<link\b(?=[^>]*\brel=["']stylesheet["'])[^>]*\bhref=["'](https?://[^"']+)["']'''
+)
+
+
+def project_templates():
+    """{name: source} for the templates in the project's TEMPLATES DIRS."""
+    templates = {}
+    for engine in settings.TEMPLATES:
+        for directory in engine.get('DIRS', []):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith('.html'):
+                        full_path = os.path.join(root, filename)
+                        name = os.path.relpath(full_path, directory).replace(os.sep, '/')
+                        with open(full_path, encoding='utf-8') as f:
+                            templates.setdefault(name, f.read())
+    return templates
+
+
+def page_assets(templates=None):
+    """
+    {page template: (static paths, external URLs)} for every template that
+    is neither extended nor included by another, following extends and
+    include (literal names only).
+    """
+    templates = project_templates() if templates is None else templates
+    used = set()
+    for source in templates.values():
+        used.update(EXTENDS_RE.findall(source))
+        used.update(INCLUDE_RE.findall(source))
+
+    def collect(name, seen):
+        if name in seen or name not in templates:
+            return [], []
+        seen.add(name)
+        source = templates[name]
+        assets = STATIC_TAG_RE.findall(source)
+        external = [script or stylesheet for script, stylesheet in EXTERNAL_RE.findall(source)]
+        for other in EXTENDS_RE.findall(source) + INCLUDE_RE.findall(source):
+            more_assets, more_external = collect(other, seen)
+            assets += more_assets
+            external += more_external
+        return assets, external
+
+    pages = {}
+    for name in sorted(set(templates) - used):
+        assets, external = collect(name, set())
+        pages[name] = (list(dict.fromkeys(assets)), list(dict.fromkeys(external)))
+    return pages
+
+
+@lru_cache(maxsize=256)
+def asset_sizes(path):
+    """
+    Bytes for one static path: raw (source), min (as collected), gzip/br
+    (None if not compressed) and transfer (smallest a browser would get).
+    None if the file can't be found.
+    """
+    source = finders.find(path)
+    if not source:
+        return None
+    with open(source, 'rb') as f:
+        raw = f.read()
+    data = minify(path, raw)
+    sizes = {'raw': len(raw), 'min': len(data), 'gzip': None, 'br': None}
+    if is_compressible(path):
+        for suffix, compressed in compress(data).items():
+            sizes['gzip' if suffix == '.gz' else 'br'] = len(compressed)
+    sizes['transfer'] = min(size for size in (sizes['min'], sizes['gzip'], sizes['br']) if size is not None)
+    return sizes
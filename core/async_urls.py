@@ -0,0 +1,22 @@
+"""
+core.urls with the async views from core.async_views swapped in, for
+requests served under ASGI (see roomlink.asgi). Same paths and names, so
+reverse() and templates don't care which one resolved the request.
+"""
+from django.urls import path
+
+from . import async_views, urls
+
+ASYNC_VIEWS = {
+    'home': async_views.home,
+    'houses': async_views.houses,
+    'roommates': async_views.roommates,
+    'listing_detail': async_views.listing_detail,
+    'user_profile': async_views.user_profile,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in urls.urlpatterns
+]
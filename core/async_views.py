@@ -0,0 +1,124 @@
+"""
+Async versions of the read-heavy public pages, served under ASGI.
+
+roomlink.asgi sends requests through core.async_urls, which swaps these in
+for the synchronous views in core.views; WSGI keeps serving those. The
+filters come from the same helpers, only the fetching differs: the async
+ORM (async for, aget, afirst, ain_bulk) instead of blocking calls. Django
+has no async database driver for SQLite, so each query still runs in a
+worker thread, but the request doesn't hold a thread while it waits, and a
+slow page no longer occupies one of the few threads sync views run on.
+
+Raw SQL (the FTS ranking), the in-memory matching index and template
+rendering have no async API and go through sync_to_async. Rendering runs in
+the same thread-sensitive executor as the sync views, so the event loop
+never blocks on a template or on anything it loads lazily.
+
+This buys isolation, not speed: every query and every render still hops to
+a worker thread, and benchmark_concurrency measures these views at or below
+the WSGI ones (see core.benchmarks).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import aprefetch_related_objects
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from . import geo, rent_stats, search, tags
+from .models import Listing, User
+from .page_cache import cache_anonymous_page
+from .pagination import FEED_ORDERING, FEED_PAGE_SIZE, apaginate_feed
+from .view_counter import view_counter
+from .views import (
+    HOUSE_SEARCH_COLUMNS, detail_context, find_matches, house_feed_query, houses_context, match_seeker,
+    media_lookups, next_page_url, rank_matches, roommate_feed_query,
+)
+
+
+async def load_user(request):
+    """
+    Resolves request.user up front: templates read it synchronously, and a
+    lazy user would query the database from the event loop.
+    """
+    request.user = await request.auser()
+
+
+arender = sync_to_async(render)
+
+
+@cache_anonymous_page
+async def home(request):
+    await load_user(request)
+    featured = Listing.objects.for_cards().order_by(*FEED_ORDERING)[:FEED_PAGE_SIZE]
+    featured_houses = [listing async for listing in featured]
+    return await arender(request, 'home.html', {'featured_houses': featured_houses})
+
+
+@cache_anonymous_page
+async def houses(request):
+    await load_user(request)
+    houses, q, near, radius, sort_by_distance = house_feed_query(request)
+
+    if sort_by_distance:
+        if q and search.search_available():
+            ranking = await sync_to_async(search.ranked_ids)(q, HOUSE_SEARCH_COLUMNS)
+            houses = houses.filter(id__in=ranking)
+        houses, next_cursor = await geo.adistance_feed(houses, request.GET.get('cursor'))
+    elif q and search.search_available():
+        houses, next_cursor = await search.asearch_feed(houses, q, HOUSE_SEARCH_COLUMNS, request.GET.get('cursor'))
+    else:
+        houses, next_cursor = await apaginate_feed(houses, request.GET.get('cursor'))
+    summary = await rent_stats.aget_summary('house', near.slug if near else '')
+    return await arender(request, 'houses.html', houses_context(request, houses, next_cursor, near, radius, summary))
+
+
+@cache_anonymous_page
+async def roommates(request):
+    await load_user(request)
+    if request.GET.get('match') and request.user.is_authenticated:
+        return await roommate_matches(request)
+
+    roommates, q, gender, selected_tags, tag_mode = roommate_feed_query(request)
+    if q and search.search_available():
+        roommates, next_cursor = await search.asearch_feed(roommates, q, cursor=request.GET.get('cursor'))
+    else:
+        roommates, next_cursor = await apaginate_feed(roommates, request.GET.get('cursor'))
+    return await arender(request, 'roommates.html', {
+        'roommates': roommates,
+        'next_page_url': next_page_url(request, next_cursor),
+        'interest_facets': await tags.afacet_counts(gender),
+        'selected_tags': selected_tags,
+        'tag_mode': tag_mode,
+        'rent_summary': rent_stats.as_dict(await rent_stats.aget_summary('roommate')),
+    })
+
+
+async def roommate_matches(request):
+    own = await (
+        Listing.objects.filter(posted_by=request.user, listing_type='roommate').order_by('-created_at').afirst()
+    )
+    if own is None and not request.GET.getlist('interests'):
+        messages.info(request, "Post a roommate request first so we can find your best matches.")
+        return redirect('roommates')
+
+    # The index may (re)load from the database first
+    matches = await sync_to_async(lambda: find_matches(request, match_seeker(request, own)))()
+    listings = await Listing.objects.for_cards().ain_bulk([listing_id for listing_id, _ in matches])
+    return await arender(request, 'roommates.html', {'roommates': rank_matches(matches, listings), 'match_mode': True})
+
+
+async def listing_detail(request, id):
+    await load_user(request)
+    house = await aget_object_or_404(Listing.objects.select_related('posted_by'), id=id)
+    await aprefetch_related_objects([house], *media_lookups(house))
+    view_counter.record(house.id)
+    return await arender(request, 'listing_detail.html', detail_context(house))
+
+
+async def user_profile(request, user_id):
+    await load_user(request)
+    profile_user = await aget_object_or_404(User, id=user_id)
+    user_listings = Listing.objects.for_cards().filter(posted_by=profile_user).order_by('-created_at')
+    return await arender(request, 'user_profile.html', {
+        'profile_user': profile_user,
+        'user_listings': [listing async for listing in user_listings],
+    })
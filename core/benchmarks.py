@@ -0,0 +1,378 @@
+"""
+In-process benchmark suite for the routes in core.urls.
+
+`manage.py benchmark` seeds a throwaway database per dataset size
+(seed_scale), then drives every Scenario through the Django test client:
+anonymous and logged in, with search queries, budget and the other filters.
+For each scenario it records the p50/p95/p99 latency, the queries per request
+and the peak memory allocated while serving one request. Allocations are
+measured with tracemalloc in a separate pass, so tracing doesn't slow the
+timed requests.
+
+Results are compared with a baseline JSON. A scenario regresses when its
+status changes, when it runs more queries, or when its median latency or its
+allocations grow by more than the threshold (and by more than a small noise
+floor).
+
+`manage.py benchmark_concurrency` uses run_concurrent() to compare
+throughput under load: the same requests sent, N at a time, to the WSGI
+handler from a thread pool (how a threaded WSGI server runs the sync views)
+and to the ASGI application from asyncio tasks (the async views).
+
+The async path is not faster. SQLite has no async driver, so every query
+and every template render in the async views hops to the single
+thread-sensitive executor, while the WSGI pool runs requests side by side.
+On a 2,000-listing seed the sync views served roughly 40-100 req/s and the
+async ones 30-38, with the gap widening as concurrency grows. Serve under
+ASGI for websockets or long-polling, not for throughput.
+"""
+import asyncio
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from . import uploads, urls
+from .models import Listing, User
+
+DEFAULT_THRESHOLD = 0.5
+NOISE_FLOOR_MS = 5.0
+ALLOC_NOISE_KIB = 64
+
+
+class Scenario(NamedTuple):
+    name: str
+    url_name: str
+    params: dict = {}
+    auth: bool = False
+    # Fixture the URL argument comes from: 'listing', 'user', 'own_listing' or 'upload'
+    arg: str = None
+
+
+SCENARIOS = [
+    Scenario('home', 'home'),
+    Scenario('home, logged in', 'home', auth=True),
+    Scenario('houses', 'houses'),
+    Scenario('houses, logged in', 'houses', auth=True),
+    Scenario('houses search', 'houses', {'q': 'self contain gandu'}),
+    Scenario('houses budget', 'houses', {'min_budget': 100000, 'max_budget': 200000}),
+    Scenario('houses search + budget', 'houses', {'q': 'flat', 'max_budget': 250000}),
+    Scenario('houses gender', 'houses', {'gender': 'female'}),
+    Scenario('houses near, nearest first', 'houses', {'near': 'main-gate', 'km': 2, 'sort': 'distance'}),
+    Scenario('roommates', 'roommates'),
+    Scenario('roommates search', 'roommates', {'q': 'reading'}),
+    Scenario('roommates budget + gender', 'roommates', {'min_budget': 50000, 'max_budget': 120000, 'gender': 'female'}),
+    Scenario('roommates tags', 'roommates', {'tags': ['music', 'football']}),
+    Scenario('roommates best matches', 'roommates', {'match': 1}, auth=True),
+    Scenario('listing detail', 'listing_detail', arg='listing'),
+    Scenario('listing detail, logged in', 'listing_detail', auth=True, arg='listing'),
+    Scenario('user profile', 'user_profile', arg='user'),
+    Scenario('rent stats', 'rent_stats', {'type': 'house', 'area': 'gandu'}),
+    Scenario('api listings', 'api_listings', {'type': 'house'}),
+    Scenario('api search + budget', 'api_listings', {'q': 'gandu', 'max_budget': 200000}),
+    Scenario('api sparse fields', 'api_listings', {'fields': 'id,title,rent', 'limit': 50}),
+    Scenario('api listing detail', 'api_listing_detail', arg='listing'),
+    Scenario('api user listings', 'api_user_listings', arg='user'),
+    Scenario('signup', 'signup'),
+    Scenario('login', 'login'),
+    Scenario('logout', 'logout'),
+    Scenario('post listing form', 'post_listing', auth=True),
+    Scenario('post listing form (short url)', 'post', auth=True),
+    Scenario('profile', 'profile', auth=True),
+    Scenario('update avatar', 'update_avatar', auth=True),
+    Scenario('upload verification', 'upload_verification', auth=True),
+    Scenario('my listings', 'my_listings', auth=True),
+    Scenario('edit listing form', 'edit_listing', auth=True, arg='own_listing'),
+    Scenario('settings', 'settings', auth=True),
+    Scenario('chunked upload status', 'chunked_upload', auth=True, arg='upload'),
+]
+# Routes whose only request has side effects the suite can't repeat
+NOT_BENCHMARKED = {
+    'delete_listing': "GET deletes the listing",
+    'chunked_upload_start': "POST only; creates an upload",
+}
+
+
+def url_names():
+    return {pattern.name for pattern in urls.urlpatterns if pattern.name}
+
+
+def uncovered_routes():
+    covered = {scenario.url_name for scenario in SCENARIOS} | set(NOT_BENCHMARKED)
+    return url_names() - covered
+
+
+def fixtures():
+    """Objects the scenarios point at: the busiest poster and their listings."""
+    user = (
+        User.objects.filter(listings__listing_type='roommate')
+        .annotate(listing_total=Count('listings')).order_by('-listing_total', 'id').first()
+    )
+    if user is None:
+        raise ValueError("The benchmark needs data; run seed_scale first.")
+    listing = (
+        Listing.objects.filter(listing_type='house')
+        .annotate(image_total=Count('images')).order_by('-image_total', 'id').first()
+    )
+    return {
+        'user': user,
+        'listing': listing,
+        'own_listing': Listing.objects.filter(posted_by=user).order_by('-created_at').first(),
+        'upload': uploads.start_upload(user, 'benchmark.mp4', 1024 * 1024),
+    }
+
+
+def scenario_url(scenario, objects):
+    if scenario.arg is None:
+        return reverse(scenario.url_name)
+    return reverse(scenario.url_name, args=[objects[scenario.arg].pk])
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, url, params, iterations, warmup):
+    for _ in range(warmup):
+        client.get(url, params)
+
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        status = response.status_code
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        client.get(url, params)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    if len(timings) > 1:
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = timings[0]
+    return {
+        'status': status,
+        'p50': round(p50, 2),
+        'p95': round(p95, 2),
+        'p99': round(p99, 2),
+        # A periodic write (view count flush) can add to a single request
+        'queries': statistics.median_low(queries),
+        'alloc_kib': round(peak / 1024, 1),
+    }
+
+
+def run_suite(iterations=20, warmup=2, only=None, progress=None):
+    """Runs the scenarios against the current database. Returns {name: metrics}."""
+    objects = fixtures()
+    anonymous = Client()
+    logged_in = Client()
+    logged_in.force_login(objects['user'])
+
+    results = {}
+    for scenario in SCENARIOS:
+        if only and only.lower() not in scenario.name.lower():
+            continue
+        client = logged_in if scenario.auth else anonymous
+        results[scenario.name] = measure(client, scenario_url(scenario, objects), scenario.params, iterations, warmup)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regression messages for `results` against `baseline` ({size: {name: metrics}} both)."""
+    regressions = []
+    for size, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            label = f"[{size} listings] {name}"
+            if current['status'] != previous['status']:
+                regressions.append(f"{label}: status {previous['status']} -> {current['status']}")
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{label}: {previous['queries']} -> {current['queries']} queries")
+            # The median is the gate; p95/p99 of a few dozen requests are too
+            # noisy on a shared machine to fail a build on
+            if (current['p50'] > previous['p50'] * (1 + threshold)
+                    and current['p50'] - previous['p50'] > NOISE_FLOOR_MS):
+                regressions.append(f"{label}: p50 {previous['p50']} -> {current['p50']} ms (p95 {current['p95']})")
+            if (current['alloc_kib'] > previous['alloc_kib'] * (1 + threshold)
+                    and current['alloc_kib'] - previous['alloc_kib'] > ALLOC_NOISE_KIB):
+                regressions.append(f"{label}: peak allocations {previous['alloc_kib']} -> {current['alloc_kib']} KiB")
+    return regressions
+
+
+# --- Concurrency (WSGI vs ASGI) ---
+
+CONCURRENT_SCENARIOS = [
+    Scenario('home', 'home'),
+    Scenario('houses', 'houses'),
+    Scenario('houses search', 'houses', {'q': 'self contain gandu'}),
+    Scenario('roommates budget + gender', 'roommates', {'min_budget': 50000, 'max_budget': 120000, 'gender': 'female'}),
+    Scenario('listing detail', 'listing_detail', arg='listing'),
+    Scenario('user profile', 'user_profile', arg='user'),
+]
+
+
+def concurrent_requests(objects, total):
+    """`total` anonymous GETs cycling through CONCURRENT_SCENARIOS: (path, query string) pairs."""
+    requests = [
+        (scenario_url(scenario, objects), urlencode(scenario.params, doseq=True))
+        for scenario in CONCURRENT_SCENARIOS
+    ]
+    return [requests[i % len(requests)] for i in range(total)]
+
+
+def wsgi_environ(path, query_string):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, query_string):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+
+def wsgi_get(application, path, query_string):
+    """One request through a WSGI application. Returns (status, ms)."""
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    start = time.perf_counter()
+    response = application(wsgi_environ(path, query_string), start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        # Sends request_finished, like a WSGI server
+        response.close()
+    return statuses[0], (time.perf_counter() - start) * 1000
+
+
+async def asgi_get(application, path, query_string):
+    """One request through an ASGI application. Returns (status, ms)."""
+    statuses = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Waiting for a disconnect that never comes; the handler cancels this
+            await asyncio.Event().wait()
+        received = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    start = time.perf_counter()
+    await application(asgi_scope(path, query_string), receive, send)
+    return statuses[0], (time.perf_counter() - start) * 1000
+
+
+def load_stats(results, wall_seconds):
+    timings = [ms for _, ms in results]
+    cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else [timings[0]] * 99
+    return {
+        'requests': len(results),
+        'errors': sum(1 for status, _ in results if status >= 500),
+        'rps': round(len(results) / wall_seconds, 1),
+        'p50': round(cuts[49], 2),
+        'p95': round(cuts[94], 2),
+    }
+
+
+def run_wsgi_load(application, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda request: wsgi_get(application, *request), requests))
+    return load_stats(results, time.perf_counter() - start)
+
+
+def run_asgi_load(application, requests, concurrency):
+    async def run():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(request):
+            async with limit:
+                return await asgi_get(application, *request)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(request) for request in requests))
+        return load_stats(results, time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def run_concurrent(wsgi_application, asgi_application, concurrency_levels, total, progress=None):
+    """
+    {concurrency: {'wsgi': stats, 'asgi': stats}} for the current database;
+    stats are requests/s, p50/p95 latency and the number of 5xx responses.
+    """
+    requests = concurrent_requests(fixtures(), total)
+    results = {}
+    for concurrency in concurrency_levels:
+        # One untimed pass each, so caches and connections are warm for both
+        run_wsgi_load(wsgi_application, requests[:concurrency], concurrency)
+        run_asgi_load(asgi_application, requests[:concurrency], concurrency)
+        results[concurrency] = {
+            'wsgi': run_wsgi_load(wsgi_application, requests, concurrency),
+            'asgi': run_asgi_load(asgi_application, requests, concurrency),
+        }
+        if progress:
+            progress(concurrency, results[concurrency])
+    return results
@@ -0,0 +1,113 @@
+"""
+Denormalized counters: Listing.image_count / video_count (gallery images and
+videos) and User.listing_count.
+
+Cards, the listing page and profiles read these columns instead of counting
+related rows. core.signals keeps them current: every create or delete of a
+ListingImage, ListingVideo or Listing applies a +1 / -1 as an F() update, so
+concurrent writers never overwrite each other, and a full save() of a
+loaded instance leaves the counters alone (models.CounterFieldsMixin).
+
+bulk_create, queryset.delete() and raw SQL skip the signals; bulk loaders
+apply their counts themselves (add_listings), and `manage.py
+reconcile_counters` recounts in batches and repairs any drift.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Listing, ListingImage, ListingVideo, User
+
+RECONCILE_BATCH_SIZE = 2000
+
+# (counter name, model, column, related model, foreign key to the model)
+COUNTERS = [
+    ('listing images', Listing, 'image_count', ListingImage, 'listing'),
+    ('listing videos', Listing, 'video_count', ListingVideo, 'listing'),
+    ('user listings', User, 'listing_count', Listing, 'posted_by'),
+]
+
+
+# --- Incremental updates ---
+
+def adjust(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # A counter that has drifted to 0 stays there until reconciled
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def media_added(instance):
+    adjust(Listing, instance.listing_id, _media_field(instance), 1)
+
+
+def media_deleted(instance):
+    adjust(Listing, instance.listing_id, _media_field(instance), -1)
+
+
+def _media_field(instance):
+    return 'image_count' if isinstance(instance, ListingImage) else 'video_count'
+
+
+def listing_saved(listing, created):
+    if created:
+        adjust(User, listing.posted_by_id, 'listing_count', 1)
+        return
+    previous = getattr(listing, '_loaded_values', {}).get('posted_by_id')
+    if previous is not None and previous != listing.posted_by_id:
+        adjust(User, previous, 'listing_count', -1)
+        adjust(User, listing.posted_by_id, 'listing_count', 1)
+
+
+def listing_deleted(listing):
+    adjust(User, listing.posted_by_id, 'listing_count', -1)
+
+
+def add_listings(listings):
+    """listing_count for listings inserted with bulk_create: one UPDATE per distinct per-poster count."""
+    by_delta = defaultdict(list)
+    for poster_id, delta in Counter(listing.posted_by_id for listing in listings).items():
+        by_delta[delta].append(poster_id)
+    for delta, poster_ids in by_delta.items():
+        User.objects.filter(id__in=poster_ids).update(listing_count=F('listing_count') + delta)
+
+
+# --- Reconciliation ---
+
+def actual_count(related, foreign_key):
+    """Subquery counting the `related` rows that point at the outer row."""
+    rows = related.objects.filter(**{foreign_key: OuterRef('pk')}).order_by().values(foreign_key)
+    return Coalesce(Subquery(rows.annotate(n=Count('pk')).values('n')), Value(0))
+
+
+def reconcile(batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Recounts every counter in primary-key batches and fixes the rows that
+    have drifted. Returns {counter name: rows repaired (or, with dry_run,
+    found wrong)}.
+
+    The repair recounts inside the UPDATE itself, so a media upload landing
+    between the check and the fix is still counted.
+    """
+    repaired = {}
+    for name, model, field, related, foreign_key in COUNTERS:
+        repaired[name] = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .annotate(actual=actual_count(related, foreign_key))
+                .values_list('pk', field, 'actual')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            drifted = [pk for pk, stored, actual in batch if stored != actual]
+            if drifted and not dry_run:
+                with transaction.atomic():
+                    model.objects.filter(pk__in=drifted).update(**{field: actual_count(related, foreign_key)})
+            repaired[name] += len(drifted)
+    return repaired
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from .models import Listing
+from .validators import MAX_VIDEO_SIZE, MAX_VIDEO_SIZE_MB
 
 User = get_user_model()
 
@@ -139,6 +140,6 @@ class ListingForm(forms.ModelForm):
                 raise forms.ValidationError("You can upload a maximum of 2 videos.")
             
             for video in videos:
-                if video.size > 20 * 1024 * 1024:
-                    raise forms.ValidationError(f"Video {video.name} exceeds the 20MB limit.")
+                if video.size > MAX_VIDEO_SIZE:
+                    raise forms.ValidationError(f"Video {video.name} exceeds the {MAX_VIDEO_SIZE_MB}MB limit.")
         return videos
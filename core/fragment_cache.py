@@ -0,0 +1,116 @@
+"""
+Versioned fragment cache for listing cards.
+
+Each card is cached under a key made of the card variant (which template it
+comes from), the listing id and two version stamps: one for the listing and
+one for its poster. Invalidation never deletes fragments; it bumps a version
+so the next render misses and old fragments simply expire. Versions are bumped
+from the signal handlers in core.signals and from admin bulk actions that
+bypass signals (queryset.update()).
+
+Fragments expire after CARD_CACHE_TIMEOUT so "X hours ago" labels don't go
+stale for long.
+
+Pages fetch their cards in bulk with {% prefetch_cards %} (see
+core.templatetags.listing_cards): one get_many for the version stamps, one
+for the fragments and one counter update per outcome, however many cards
+the page shows.
+"""
+import time
+
+from django.core.cache import cache
+
+CARD_CACHE_TIMEOUT = 300
+STATS_KEYS = {'hit': 'card_cache:hits', 'miss': 'card_cache:misses'}
+
+
+def _listing_version_key(listing_id):
+    return f'card_version:listing:{listing_id}'
+
+
+def _poster_version_key(user_id):
+    return f'card_version:user:{user_id}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def card_key(listing, variant):
+    return card_keys([listing], variant)[listing.id]
+
+
+def card_keys(listings, variant):
+    """{listing id: cache key} for a page of cards, reading every version stamp in one get_many."""
+    version_keys = {}
+    for listing in listings:
+        version_keys[listing.id] = (_listing_version_key(listing.id), _poster_version_key(listing.posted_by_id))
+    wanted = {key for pair in version_keys.values() for key in pair}
+    versions = cache.get_many(wanted)
+
+    # A missing version (never bumped, or evicted) gets a fresh stamp, which
+    # can never match a fragment cached under an older one.
+    missing = {key: _new_version() for key in wanted if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {
+        listing_id: f'card:{variant}:{listing_id}:{versions[listing_key]}:{versions[poster_key]}'
+        for listing_id, (listing_key, poster_key) in version_keys.items()
+    }
+
+
+def get_card(key):
+    html = cache.get(key)
+    _count('hit' if html is not None else 'miss')
+    return html
+
+
+def get_cards(keys):
+    """{key: html} for the cached ones among `keys`: one get_many, and one stats update per outcome."""
+    found = cache.get_many(keys)
+    _count('hit', len(found))
+    _count('miss', len(set(keys)) - len(found))
+    return found
+
+
+def set_card(key, html):
+    cache.set(key, html, CARD_CACHE_TIMEOUT)
+
+
+def invalidate_listings(listing_ids):
+    cache.set_many({_listing_version_key(pk): _new_version() for pk in listing_ids}, timeout=None)
+
+
+def invalidate_posters(user_ids):
+    cache.set_many({_poster_version_key(pk): _new_version() for pk in user_ids}, timeout=None)
+
+
+# --- Hit/miss statistics (shared through the cache backend) ---
+
+def _count(outcome, amount=1):
+    if not amount:
+        return
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # First count since a reset, or evicted
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+
+def stats():
+    values = cache.get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS['hit'], 0)
+    misses = values.get(STATS_KEYS['miss'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many(STATS_KEYS.values())
@@ -0,0 +1,26 @@
+"""
+Offline gazetteer: campus landmarks and the areas students write in the
+free-text Listing.location, with coordinates, so listings can be geocoded
+without calling an external service.
+
+Coordinates are approximate (about 100-300 m) and are meant to be
+corrected by whoever runs the site; adding an alias is the usual fix when a
+common spelling is not recognised. Aliases are matched as whole words,
+case-insensitively, and the longest match wins ("AY Lodge Gandu" -> Gandu,
+"FULafia north gate" -> North Gate).
+"""
+
+# slug: (name, kind, latitude, longitude, aliases)
+PLACES = {
+    'main-campus': ('Main Campus', 'landmark', 8.4841, 8.5706, ['main campus', 'permanent site', 'fulafia', 'school']),
+    'main-gate': ('Main Gate', 'landmark', 8.4805, 8.5682, ['main gate', 'school gate', 'front gate']),
+    'north-gate': ('North Gate', 'landmark', 8.4898, 8.5719, ['north gate', 'back gate']),
+    'town-campus': ('Town Campus', 'landmark', 8.4966, 8.5187, ['town campus', 'mini campus', 'temporary site']),
+    'gandu': ('Gandu', 'area', 8.4763, 8.5598, ['gandu']),
+    'mararaba': ('Mararaba', 'area', 8.5032, 8.5425, ['mararaba', 'mararaba akunza']),
+    'akurba': ('Akurba', 'area', 8.4702, 8.5468, ['akurba']),
+    'bukan-sidi': ('Bukan Sidi', 'area', 8.5104, 8.5262, ['bukan sidi', 'bukan-sidi']),
+    'shinge': ('Shinge', 'area', 8.4918, 8.5337, ['shinge']),
+    'tudun-kauri': ('Tudun Kauri', 'area', 8.5001, 8.5093, ['tudun kauri']),
+    'kwandere': ('Kwandere', 'area', 8.5227, 8.5571, ['kwandere']),
+}
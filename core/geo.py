@@ -0,0 +1,187 @@
+"""
+Geocoding and proximity search for listings.
+
+Listing.location stays free text; when it mentions a place from the offline
+gazetteer (core.gazetteer), latitude/longitude are filled in on save.
+
+"Within N km of X" is answered in two steps inside one query: a bounding-box
+range on (listing_type, latitude, longitude), which the listing_geo_idx
+index serves without scanning the table, then the exact haversine distance,
+computed in SQL only for the rows inside the box. Django registers the math
+functions (SIN, COS, ASIN, ...) on SQLite, so this works on any backend.
+"""
+import base64
+import binascii
+import math
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from .gazetteer import PLACES
+from .pagination import FEED_PAGE_SIZE
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 2
+MAX_RADIUS_KM = 50
+
+
+class Place(NamedTuple):
+    slug: str
+    name: str
+    kind: str
+    latitude: float
+    longitude: float
+
+
+def get_place(slug):
+    if slug not in PLACES:
+        return None
+    name, kind, latitude, longitude, _ = PLACES[slug]
+    return Place(slug, name, kind, latitude, longitude)
+
+
+def all_places():
+    """Landmarks first, then areas, each alphabetically (for the filter menu)."""
+    return sorted((get_place(slug) for slug in PLACES), key=lambda place: (place.kind != 'landmark', place.name))
+
+
+@lru_cache(maxsize=1)
+def _alias_index():
+    aliases = {}
+    for slug, (name, _, _, _, extra) in PLACES.items():
+        for alias in [name, *extra]:
+            aliases[_normalize(alias)] = slug
+    # Longest first, so "mararaba akunza" is tried before "mararaba"
+    pattern = '|'.join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+    return re.compile(rf'\b(?:{pattern})\b'), aliases
+
+
+def _normalize(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def geocode(text):
+    """Returns the gazetteer Place mentioned in `text` (longest match), or None."""
+    if not text:
+        return None
+    pattern, aliases = _alias_index()
+    matches = [match.group(0) for match in pattern.finditer(_normalize(text))]
+    if not matches:
+        return None
+    return get_place(aliases[max(matches, key=len)])
+
+
+def geocode_listing(listing):
+    """
+    Sets listing.latitude/longitude from its location text when the text is
+    new or changed. Coordinates given explicitly on a new listing (imports,
+    admin) are kept; a changed location that the gazetteer doesn't know
+    clears the old coordinates instead of leaving them pointing elsewhere.
+    """
+    adding = listing._state.adding
+    loaded = getattr(listing, '_loaded_values', {})
+    if not adding and listing.location == loaded.get('location', listing.location):
+        return
+    if adding and listing.latitude is not None and listing.longitude is not None:
+        return
+    place = geocode(listing.location)
+    if place is not None:
+        listing.latitude, listing.longitude = place.latitude, place.longitude
+    elif not adding:
+        listing.latitude = listing.longitude = None
+
+
+# --- Distance ---
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, km):
+    """(min_lat, max_lat, min_lon, max_lon) of a box containing the circle."""
+    dlat = math.degrees(km / EARTH_RADIUS_KM)
+    dlon = math.degrees(km / (EARTH_RADIUS_KM * max(math.cos(math.radians(latitude)), 1e-6)))
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from (latitude, longitude), as a SQL expression."""
+    a = (
+        Power(Sin(Radians(F('latitude') - latitude) / 2), 2)
+        + math.cos(math.radians(latitude)) * Cos(Radians(F('latitude')))
+        * Power(Sin(Radians(F('longitude') - longitude) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def within(queryset, latitude, longitude, km):
+    """Listings within `km` of the point, annotated with `distance` (km)."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, km)
+    return queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(distance=distance_expression(latitude, longitude)).filter(distance__lte=km)
+
+
+def parse_radius(value):
+    try:
+        km = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RADIUS_KM
+    if not math.isfinite(km) or km <= 0:
+        return DEFAULT_RADIUS_KM
+    return min(km, MAX_RADIUS_KM)
+
+
+# --- Nearest-first pagination ---
+
+def _encode_position(listing):
+    raw = f"g|{listing.distance!r}|{listing.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_position(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, distance, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return (float(distance), int(pk)) if kind == 'g' else None
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def distance_feed(queryset, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    Keyset pagination nearest-first over a within() queryset. Returns
+    (listings, next_cursor) like core.pagination.paginate_feed.
+    """
+    return _page(list(_seek(queryset, cursor, page_size)), page_size)
+
+
+async def adistance_feed(queryset, cursor=None, page_size=FEED_PAGE_SIZE):
+    """distance_feed for async views."""
+    return _page([listing async for listing in _seek(queryset, cursor, page_size)], page_size)
+
+
+def _seek(queryset, cursor, page_size):
+    queryset = queryset.order_by('distance', 'id')
+    position = _decode_position(cursor)
+    if position:
+        distance, pk = position
+        queryset = queryset.filter(Q(distance__gt=distance) | Q(distance=distance, id__gt=pk))
+    return queryset[:page_size + 1]
+
+
+def _page(listings, page_size):
+    next_cursor = None
+    if len(listings) > page_size:
+        listings = listings[:page_size]
+        next_cursor = _encode_position(listings[-1])
+    return listings, next_cursor
@@ -0,0 +1,181 @@
+"""
+A small database-backed job queue.
+
+Work is registered with @task and queued with enqueue(); queued jobs are
+stored as core.models.Job rows and executed by `manage.py run_jobs`, which
+runs up to --concurrency jobs at once in threads. Failed jobs are retried
+with exponential backoff until max_attempts, then marked failed with the
+traceback in last_error. No external broker is needed: SQLite is the queue.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import fragment_cache, page_cache, thumbnails
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 5  # seconds; doubles with every attempt
+STALE_AFTER = timedelta(minutes=15)
+
+registry = {}
+
+
+def task(name):
+    def register(func):
+        registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, max_attempts=3, delay=0, **payload):
+    if name not in registry:
+        raise ValueError(f"Unknown job '{name}'")
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_once(name, max_attempts=3, **payload):
+    """
+    enqueue() unless a job with the same name and payload is still waiting
+    to run. Returns the new job, or None if one was already queued.
+    """
+    if name not in registry:
+        raise ValueError(f"Unknown job '{name}'")
+    pending = Job.objects.filter(name=name, status='queued', **{f'payload__{key}': value for key, value in payload.items()})
+    if pending.exists():
+        return None
+    return enqueue(name, max_attempts=max_attempts, **payload)
+
+
+def enqueue_many(name, payloads, max_attempts=3):
+    """Queues one job per payload with a single INSERT (for bulk imports)."""
+    if name not in registry:
+        raise ValueError(f"Unknown job '{name}'")
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        [Job(name=name, payload=payload, max_attempts=max_attempts, run_after=now) for payload in payloads]
+    )
+
+
+def claim_next(worker_id):
+    """
+    Atomically moves the oldest due job from queued to running. Several
+    workers may race for the same row; the conditional UPDATE lets exactly
+    one of them win.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_by=worker_id, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    try:
+        registry[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            logger.error("Job %s failed permanently", job, exc_info=True)
+        else:
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at', 'locked_by'])
+    return job
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Puts back jobs left 'running' by a worker that died mid-job."""
+    return Job.objects.filter(
+        status='running', started_at__lt=timezone.now() - older_than,
+    ).update(status='queued', locked_by='')
+
+
+def _run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        # Each worker thread has its own database connection
+        close_old_connections()
+
+
+def work(concurrency=2, poll_interval=1.0, once=False, stop_event=None):
+    """
+    Worker loop used by `manage.py run_jobs`. With once=True it drains the
+    queue (jobs due now) and returns the number of jobs run.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = stop_event or threading.Event()
+    requeue_stale()
+    processed = 0
+
+    if concurrency <= 1:
+        # Run jobs inline in this thread
+        while not stop_event.is_set():
+            job = claim_next(worker_id)
+            if job:
+                run_job(job)
+                processed += 1
+            elif once:
+                break
+            else:
+                time.sleep(poll_interval)
+        return processed
+
+    running = set()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while not stop_event.is_set():
+            running = {future for future in running if not future.done()}
+            job = claim_next(worker_id) if len(running) < concurrency else None
+            if job:
+                running.add(pool.submit(_run_in_thread, job))
+                processed += 1
+                continue
+            if once and not running:
+                break
+            time.sleep(poll_interval if not running else 0.05)
+    return processed
+
+
+# --- Tasks ---
+
+@task('generate_thumbnails')
+def generate_thumbnails(model, pk, field):
+    instance = apps.get_model('core', model).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    thumbnails.generate_derivatives(getattr(instance, field))
+    thumbnails.record_derivatives(instance, field)
+    # The record is written with update(), so refresh what shows the image
+    if model == 'user':
+        fragment_cache.invalidate_posters([pk])
+    else:
+        fragment_cache.invalidate_listings([getattr(instance, 'listing_id', pk)])
+    page_cache.bump_generation()
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the static assets each page template pulls in (through extends/include): raw, minified, "
+        "gzip/brotli and transferred bytes, and fails if a page goes over the byte budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, help="Transferred bytes allowed per page (default: settings.STATIC_BUDGET_BYTES).")
+        parser.add_argument('--assets', action='store_true', help="Also list every asset with its sizes.")
+
+    def handle(self, *args, **options):
+        budget = options['budget'] or getattr(settings, 'STATIC_BUDGET_BYTES', assets.DEFAULT_BUDGET_BYTES)
+        pages = assets.page_assets()
+        missing = sorted({path for paths, _ in pages.values() for path in paths if assets.asset_sizes(path) is None})
+        if missing:
+            raise CommandError(f"Static files referenced by templates but not found: {', '.join(missing)}.")
+
+        self.stdout.write(f"{'Page':<34} {'assets':>6} {'raw':>9} {'min':>9} {'sent':>9} {'external':>8}")
+        over = []
+        for page, (paths, external) in pages.items():
+            sizes = [assets.asset_sizes(path) for path in paths]
+            raw = sum(size['raw'] for size in sizes)
+            minified = sum(size['min'] for size in sizes)
+            sent = sum(size['transfer'] for size in sizes)
+            line = f"{page:<34} {len(paths):>6} {raw:>9} {minified:>9} {sent:>9} {len(external):>8}"
+            if sent > budget:
+                over.append(page)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if options['assets']:
+            self.stdout.write(f"\n{'Asset':<34} {'raw':>9} {'min':>9} {'gzip':>9} {'br':>9}")
+            for path in sorted({path for paths, _ in pages.values() for path in paths}):
+                size = assets.asset_sizes(path)
+                self.stdout.write(
+                    f"{path:<34} {size['raw']:>9} {size['min']:>9} {size['gzip'] or '-':>9} {size['br'] or '-':>9}"
+                )
+        external = sorted({url for _, urls in pages.values() for url in urls})
+        if external:
+            self.stdout.write("\nThird-party scripts/styles (not counted): " + ', '.join(external))
+
+        if over:
+            raise CommandError(f"{len(over)} pages over the {budget}-byte static budget: {', '.join(over)}.")
+        self.stdout.write(self.style.SUCCESS(f"All {len(pages)} pages within {budget} bytes of static assets."))
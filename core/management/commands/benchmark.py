@@ -0,0 +1,116 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from core import benchmarks
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks every route in-process (test client) on freshly seeded databases of several sizes, "
+        "reports p50/p95/p99, queries and peak allocations, and fails on regressions against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help="Comma-separated listing counts to seed.")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per scenario first.")
+        parser.add_argument('--seed', type=int, default=1, help="seed_scale seed.")
+        parser.add_argument('--only', help="Only scenarios whose name contains this text.")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON to compare with.")
+        parser.add_argument('--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+                            help="Allowed relative growth of median latency and allocations (0.5 = 50%%).")
+        parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline.")
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be whole numbers, e.g. 1000,10000.")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        uncovered = benchmarks.uncovered_routes()
+        if uncovered:
+            raise CommandError(f"Routes without a benchmark scenario: {', '.join(sorted(uncovered))}.")
+
+        results = {}
+        for size in sizes:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{size} listings"))
+            results[str(size)] = self.run_size(size, options)
+
+        failed = [
+            f"[{size} listings] {name}: status {metrics['status']}"
+            for size, scenarios in results.items() for name, metrics in scenarios.items() if metrics['status'] >= 500
+        ]
+        if failed:
+            raise CommandError("Server errors:\n" + '\n'.join(failed))
+
+        report = {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'sizes': results,
+        }
+        if options['output']:
+            self.write_json(options['output'], report)
+
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            self.write_json(baseline_path, report)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {baseline_path}."))
+            return
+        if not os.path.exists(baseline_path):
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+            return
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)['sizes']
+        regressions = benchmarks.compare(results, baseline, options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"{len(regressions)} regressions against {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}."))
+
+    def run_size(self, size, options):
+        # Media and the performance log stay out of the project; DEBUG off
+        # like production (and no query log slowing every request down)
+        media_root = tempfile.mkdtemp()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            with override_settings(MEDIA_ROOT=media_root, PERF_LOG_FILE=None, DEBUG=False):
+                cache.clear()
+                call_command('seed_scale', listings=size, seed=options['seed'], stdout=StringIO())
+                return benchmarks.run_suite(
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    only=options['only'],
+                    progress=self.print_row,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def print_row(self, name, metrics):
+        self.stdout.write(
+            f"  {name:<34} {metrics['status']:>4} p50 {metrics['p50']:>8.2f}  p95 {metrics['p95']:>8.2f}  "
+            f"p99 {metrics['p99']:>8.2f} ms  {metrics['queries']:>3} queries  {metrics['alloc_kib']:>8.1f} KiB"
+        )
+
+    def write_json(self, path, data):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
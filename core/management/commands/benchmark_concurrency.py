@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from core import benchmarks
+from roomlink.handlers import AsyncViewsHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput of the sync views under WSGI (thread pool) with the async views under ASGI "
+        "(asyncio tasks) at several concurrency levels, in-process on a freshly seeded database. "
+        "Expect ASGI to trail WSGI: its queries and renders are serialized on one worker thread."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=10000, help="Listings to seed.")
+        parser.add_argument('--seed', type=int, default=1, help="seed_scale seed.")
+        parser.add_argument('--concurrency', default='1,8,32', help="Comma-separated numbers of requests in flight.")
+        parser.add_argument('--requests', type=int, default=300, help="Requests per run.")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError("--concurrency must be whole numbers, e.g. 1,8,32.")
+        if not levels or min(levels) < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1.")
+
+        media_root = tempfile.mkdtemp()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            with override_settings(MEDIA_ROOT=media_root, PERF_LOG_FILE=None, DEBUG=False):
+                cache.clear()
+                call_command('seed_scale', listings=options['listings'], seed=options['seed'], stdout=StringIO())
+                self.stdout.write(f"{'in flight':>9}  {'server':<6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'5xx':>5}")
+                results = benchmarks.run_concurrent(
+                    WSGIHandler(), AsyncViewsHandler(), levels, options['requests'], progress=self.print_level,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        errors = sum(stats['errors'] for level in results.values() for stats in level.values())
+        if errors:
+            raise CommandError(f"{errors} requests failed with a server error.")
+
+    def print_level(self, concurrency, servers):
+        for server, stats in servers.items():
+            self.stdout.write(
+                f"{concurrency:>9}  {server:<6} {stats['rps']:>8.1f} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['errors']:>5}"
+            )
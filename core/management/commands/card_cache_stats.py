@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import fragment_cache
+
+
+class Command(BaseCommand):
+    help = "Shows hit/miss counters for the listing card fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = fragment_cache.stats()
+        self.stdout.write(
+            f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit ratio: {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            fragment_cache.reset_stats()
+            self.stdout.write("Counters reset.")
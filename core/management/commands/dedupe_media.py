@@ -0,0 +1,137 @@
+import os
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import thumbnails
+from core.models import Listing, ListingImage, ListingVideo, User
+from core.storage import ContentAddressedStorage, hash_file
+
+FILE_FIELDS = [
+    (Listing, 'image'),
+    (ListingImage, 'image'),
+    (ListingVideo, 'video'),
+    (User, 'profile_picture'),
+    (User, 'verification_document'),
+]
+SKIP_DIRS = ('thumbs', 'upload_staging')
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves existing media into the content-addressed layout, pointing every "
+        "file field at one shared copy, and deletes byte-identical duplicates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change.")
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not core.storage.ContentAddressedStorage.")
+        dry_run = options['dry_run']
+
+        # 1. Work out the content-addressed name of every referenced file
+        moves = {}
+        updates = defaultdict(lambda: defaultdict(list))
+        missing = 0
+        for model, field in FILE_FIELDS:
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for pk, name in rows.values_list('pk', field).iterator():
+                if storage.is_content_addressed(name):
+                    continue
+                if name not in moves:
+                    if not storage.exists(name):
+                        missing += 1
+                        continue
+                    with storage.open(name, 'rb') as f:
+                        moves[name] = storage.content_name(name, hash_file(f))
+                updates[(model, field)][moves[name]].append(pk)
+
+        # 2. Make sure every target exists before any row points at it
+        targets = set(moves.values())
+        created = [target for target in targets if not storage.exists(target)]
+        if not dry_run:
+            for old, new in moves.items():
+                if not storage.exists(new):
+                    self.link(storage.path(old), storage.path(new))
+
+        # 3. Repoint the rows
+        if not dry_run:
+            with transaction.atomic():
+                for (model, field), by_name in updates.items():
+                    for new, pks in by_name.items():
+                        model.objects.filter(pk__in=pks).update(**{field: new})
+
+        # 4. The old names are now unreferenced copies; one copy of each new
+        # target is kept (hardlinked, so it costs nothing extra)
+        kept = set(created)
+        freed = 0
+        for old, new in moves.items():
+            if new in kept:
+                kept.discard(new)
+            else:
+                freed += storage.size(old)
+            if not dry_run:
+                self.move_derivatives(storage, old, new)
+                storage.delete(old)
+
+        # The repointed rows now show the derivatives of their new names
+        if not dry_run:
+            for (model, field), by_name in updates.items():
+                column = thumbnails.derivatives_field(field)
+                if not any(f.name == column for f in model._meta.get_fields()):
+                    continue
+                for new, pks in by_name.items():
+                    model.objects.filter(pk__in=pks).update(**{column: thumbnails.derivatives_record(new, storage)})
+
+        # 5. Unreferenced files that duplicate something we now store
+        orphans = 0
+        for path in self.walk(storage.location):
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if storage.is_content_addressed(name) or name in moves:
+                continue
+            with open(path, 'rb') as f:
+                stored = storage.content_name(name, hash_file(f))
+            if stored in targets or (stored != name and storage.exists(stored)):
+                orphans += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+
+        prefix = "Would move" if dry_run else "Moved"
+        self.stdout.write(f"{prefix} {len(moves)} referenced files into {len(targets)} content-addressed files.")
+        self.stdout.write(f"Duplicate unreferenced files: {orphans}. Missing files skipped: {missing}.")
+        self.stdout.write(self.style.SUCCESS(f"Space {'to free' if dry_run else 'freed'}: {freed / 1024 / 1024:.1f} MB"))
+
+    def link(self, source, target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                for block in iter(lambda: src.read(64 * 1024), b''):
+                    dst.write(block)
+
+    def move_derivatives(self, storage, old, new):
+        for width in thumbnails.THUMBNAIL_WIDTHS:
+            for ext in ('webp', 'jpg'):
+                old_thumb = thumbnails.derivative_name(old, width, ext)
+                if not storage.exists(old_thumb):
+                    continue
+                new_thumb = thumbnails.derivative_name(new, width, ext)
+                if storage.exists(new_thumb):
+                    storage.delete(old_thumb)
+                else:
+                    os.makedirs(os.path.dirname(storage.path(new_thumb)), exist_ok=True)
+                    os.replace(storage.path(old_thumb), storage.path(new_thumb))
+
+    def walk(self, root):
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == str(root):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in filenames:
+                yield os.path.join(dirpath, filename)
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes chunked video uploads that were abandoned before being attached, with their staging files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float, default=uploads.UPLOAD_EXPIRY.total_seconds() / 3600,
+            help="Expire uploads untouched for this long.",
+        )
+
+    def handle(self, *args, **options):
+        if options['hours'] <= 0:
+            raise CommandError("--hours must be positive.")
+        expired = uploads.expire_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} uploads."))
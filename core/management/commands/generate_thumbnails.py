@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core import thumbnails
+from core.models import Listing, ListingImage, User
+
+
+class Command(BaseCommand):
+    help = "Generates responsive WebP/JPEG derivatives for existing listing and profile images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        sources = [
+            ('listing thumbnails', Listing.objects.exclude(image='').exclude(image=None), 'image'),
+            ('gallery images', ListingImage.objects.exclude(image=''), 'image'),
+            ('profile pictures', User.objects.exclude(profile_picture='').exclude(profile_picture=None), 'profile_picture'),
+        ]
+        for label, queryset, field in sources:
+            processed = 0
+            for obj in queryset.only('id', field).iterator():
+                if thumbnails.generate_derivatives(getattr(obj, field), force=options['force']):
+                    processed += 1
+                # Also records derivatives made before they were recorded
+                thumbnails.record_derivatives(obj, field)
+            self.stdout.write(f"{label}: {processed} processed")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,224 @@
+import csv
+import json
+import os
+import time
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import counters, geo, jobs, page_cache, rent_stats, search, tags
+from core.forms import ListingForm
+from core.matching import roommate_index
+from core.models import Listing, ListingImage, ListingVideo, User
+from core.validators import MAX_IMAGE_SIZE_MB, MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, MAX_VIDEO_SIZE_MB, looks_like_video
+
+FORM_FIELDS = [
+    'title', 'description', 'rent', 'location', 'listing_type', 'gender_preference', 'level_preference', 'interests',
+    'latitude', 'longitude',
+]
+MEDIA_SEPARATORS = ('|', ';')
+MAX_VIDEOS = 2
+
+
+class RowError(Exception):
+    pass
+
+
+class ImportListingForm(ListingForm):
+    # Media comes from --media-dir, not from uploads; dropping the file
+    # fields also saves copying them for every row.
+    images = None
+    videos = None
+
+    class Meta(ListingForm.Meta):
+        fields = FORM_FIELDS
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        # Line 1 is the header
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, row
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f"invalid JSON ({e})")
+                continue
+            yield line_number, row if isinstance(row, dict) else RowError("expected a JSON object")
+
+
+def split_media(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    for separator in MEDIA_SEPARATORS:
+        value = value.replace(separator, ',')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports listings from a CSV or JSONL file. Rows are validated with "
+        "ListingForm and inserted with bulk_create, one transaction per batch. "
+        "`images` / `videos` columns name files in --media-dir (separated by | or ;)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or JSONL file.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--poster', help="Email of the user to post rows that have no posted_by column.")
+        parser.add_argument('--media-dir', help="Directory that image and video file names are relative to.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per INSERT / transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate every row without saving anything.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist.")
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        self.media_dir = options['media_dir']
+        self.dry_run = options['dry_run']
+        self.posters = {}
+        self.default_poster = self.get_poster(options['poster']) if options['poster'] else None
+        if options['poster'] and self.default_poster is None:
+            raise CommandError(f"No user with email {options['poster']}.")
+
+        rows = read_jsonl(path) if file_format == 'jsonl' else read_csv(path)
+        started = time.monotonic()
+        imported = failed = 0
+        batch = []
+        for line_number, row in rows:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(self.prepare(row))
+            except RowError as e:
+                failed += 1
+                self.stderr.write(f"line {line_number}: {e}")
+                continue
+            if len(batch) >= options['batch_size']:
+                imported += self.flush(batch)
+                batch = []
+                self.report(imported, failed, started)
+        if batch:
+            imported += self.flush(batch)
+        self.report(imported, failed, started)
+
+        verb = "Validated" if self.dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {imported} listings, {failed} rows rejected."))
+
+    # --- Rows ---
+
+    def get_poster(self, email):
+        key = email.strip().lower()
+        if key not in self.posters:
+            self.posters[key] = User.objects.filter(email__iexact=key).first()
+        return self.posters[key]
+
+    def prepare(self, row):
+        """Validates one row; returns (listing, image paths, video paths)."""
+        data = {field: row.get(field) or '' for field in FORM_FIELDS}
+        if isinstance(row.get('interests'), list):
+            data['interests'] = ','.join(row['interests'])
+        form = ImportListingForm(data=data)
+        if not form.is_valid():
+            raise RowError('; '.join(
+                f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()
+            ))
+
+        poster = self.get_poster(row['posted_by']) if row.get('posted_by') else self.default_poster
+        if poster is None:
+            raise RowError(f"unknown poster {row.get('posted_by')!r}" if row.get('posted_by') else "no posted_by and no --poster")
+
+        listing = form.save(commit=False)
+        listing.posted_by = poster
+        listing.is_verified_listing = False
+        if listing.listing_type == 'roommate' and not listing.title:
+            listing.title = f"Roommate Request - {poster.full_name}"
+        # pre_save doesn't run for bulk_create; latitude/longitude columns win
+        geo.geocode_listing(listing)
+
+        images = [self.media_path(name, MAX_IMAGE_SIZE, f'{MAX_IMAGE_SIZE_MB}MB') for name in split_media(row.get('images'))]
+        videos = [self.media_path(name, MAX_VIDEO_SIZE, f'{MAX_VIDEO_SIZE_MB}MB') for name in split_media(row.get('videos'))]
+        if len(videos) > MAX_VIDEOS:
+            raise RowError(f"videos: at most {MAX_VIDEOS} per listing.")
+        for video in videos:
+            with open(video, 'rb') as f:
+                if not looks_like_video(f.read(16)):
+                    raise RowError(f"videos: {os.path.basename(video)} is not a supported video file.")
+        return listing, images, videos
+
+    def media_path(self, name, max_size, size_label):
+        if not self.media_dir:
+            raise RowError("row has media but no --media-dir was given.")
+        path = os.path.join(self.media_dir, name)
+        if not os.path.isfile(path):
+            raise RowError(f"media file {name} not found.")
+        if os.path.getsize(path) > max_size:
+            raise RowError(f"{name} exceeds the {size_label} limit.")
+        return path
+
+    # --- Saving ---
+
+    def store(self, model, field, path):
+        name = model._meta.get_field(field).generate_filename(None, os.path.basename(path))
+        with open(path, 'rb') as f:
+            return default_storage.save(name, File(f))
+
+    def flush(self, batch):
+        if self.dry_run:
+            return len(batch)
+
+        # Copy media first: the content-addressed storage makes the thumbnail
+        # and its identical first gallery image a single file.
+        media = []
+        for listing, images, videos in batch:
+            gallery = [self.store(ListingImage, 'image', path) for path in images]
+            if gallery:
+                listing.image = self.store(Listing, 'image', images[0])
+            media.append((gallery, [self.store(ListingVideo, 'video', path) for path in videos]))
+            listing.image_count, listing.video_count = len(gallery), len(videos)
+
+        # bulk_create skips post_save, so do what the signals would have done
+        # (search index, interest tags, rent stats, counters, thumbnail jobs,
+        # matching matrix) for the whole batch at once.
+        with transaction.atomic():
+            listings = Listing.objects.bulk_create([listing for listing, _, _ in batch])
+            counters.add_listings(listings)
+            gallery_rows = []
+            video_rows = []
+            for listing, (gallery, videos) in zip(listings, media):
+                gallery_rows += [ListingImage(listing=listing, image=name) for name in gallery]
+                video_rows += [ListingVideo(listing=listing, video=name) for name in videos]
+            ListingImage.objects.bulk_create(gallery_rows)
+            ListingVideo.objects.bulk_create(video_rows)
+            search.index_listings(listings)
+            tags.sync_listing_tags([listing for listing in listings if listing.interests], created=True)
+            rent_stats.apply_changes(
+                (listing.listing_type, listing.location, listing.rent, 1) for listing in listings
+            )
+            jobs.enqueue_many('generate_thumbnails', [
+                {'model': 'listing', 'pk': listing.pk, 'field': 'image'} for listing in listings if listing.image
+            ] + [
+                {'model': 'listingimage', 'pk': image.pk, 'field': 'image'} for image in gallery_rows
+            ])
+        tags.invalidate_facets()
+        page_cache.bump_generation()
+        roommate_index.invalidate()
+        return len(listings)
+
+    def report(self, imported, failed, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"{imported} imported, {failed} rejected ({imported / elapsed:.0f} rows/s)")
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import perf
+
+
+class Command(BaseCommand):
+    help = "Summarizes the request performance log: p50/p95/p99 response time per URL name."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help="Log file to read (default: settings.PERF_LOG_FILE).")
+        parser.add_argument('--hours', type=float, help="Only requests from the last N hours.")
+        parser.add_argument('--slowest', type=int, default=0, help="Also list the N slowest requests with their worst query.")
+
+    def handle(self, *args, **options):
+        path = options['log'] or perf.log_file()
+        if not path:
+            raise CommandError("No log file; set PERF_LOG_FILE or pass --log.")
+        entries = list(perf.read_entries(path))
+        if options['hours']:
+            since = timezone.now() - timedelta(hours=options['hours'])
+            entries = [entry for entry in entries if (parse_datetime(entry.get('ts', '')) or since) >= since]
+        if not entries:
+            self.stdout.write("No requests logged.")
+            return
+
+        self.stdout.write(f"{'URL name':<32} {'requests':>9} {'slow':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for row in perf.summarize(entries):
+            self.stdout.write(
+                f"{row['url_name']:<32} {row['requests']:>9} {row['slow']:>6} "
+                f"{row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f} {row['queries']:>8}"
+            )
+
+        slowest = sorted((entry for entry in entries if entry.get('slow')), key=lambda entry: entry['total_ms'], reverse=True)
+        for entry in slowest[:options['slowest']]:
+            self.stdout.write(f"\n{entry['total_ms']:.1f} ms  {entry['method']} {entry['path']}  ({entry['queries']} queries, {entry['db_ms']:.1f} ms SQL)")
+            for query in entry.get('worst_queries', [])[:1]:
+                self.stdout.write(f"  {query['ms']:.1f} ms  {query['sql']}")
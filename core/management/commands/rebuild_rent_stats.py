@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import rent_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the rent summary table (histograms, percentiles) from all listings."
+
+    def handle(self, *args, **options):
+        count = rent_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rent summaries."))
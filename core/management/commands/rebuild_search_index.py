@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the FTS5 listing search index from the Listing table."
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError("Full-text search needs the SQLite database backend.")
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} listings."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts the denormalized counters (listing image/video counts, user "
+        "listing counts) and repairs rows that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=counters.RECONCILE_BATCH_SIZE, help="Rows checked per query.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted rows without fixing them.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        repaired = counters.reconcile(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = "wrong" if options['dry_run'] else "repaired"
+        for name, count in repaired.items():
+            self.stdout.write(f"{name}: {count} {verb}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(repaired.values())} counters {verb}."))
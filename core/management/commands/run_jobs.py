@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (thumbnail generation, ...) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Jobs to run at the same time.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due now, then exit.")
+
+    def handle(self, *args, **options):
+        if not options['once']:
+            self.stdout.write(f"Worker started (concurrency {options['concurrency']}). Press Ctrl+C to stop.")
+        try:
+            processed = jobs.work(
+                concurrency=options['concurrency'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping worker.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs."))
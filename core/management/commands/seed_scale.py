@@ -0,0 +1,289 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image, ImageDraw
+
+from core import counters, fragment_cache, page_cache, rent_stats, search, tags, thumbnails
+from core.gazetteer import PLACES
+from core.matching import roommate_index
+from core.models import Listing, ListingImage, ListingVideo, User
+
+SEED_UNTIL = '2026-09-01'
+EMAIL_DOMAIN = 'seed{seed}.roomlink.test'
+PLACEHOLDER_IMAGES = 24
+PLACEHOLDER_AVATARS = 8
+# Smallest file looks_like_video() accepts; enough for the pages, not for playback
+PLACEHOLDER_VIDEO = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom'
+
+# Share of listings per gazetteer place; None is a location the gazetteer doesn't know
+PLACE_WEIGHTS = {
+    'gandu': 30, 'main-gate': 15, 'akurba': 12, 'mararaba': 10, 'north-gate': 8, 'shinge': 6,
+    'bukan-sidi': 5, 'main-campus': 4, 'tudun-kauri': 4, 'town-campus': 3, 'kwandere': 3, None: 8,
+}
+UNKNOWN_LOCATIONS = ['Lafia town', 'Jos road', 'Near Shoprite', 'Doma road', 'Old market area']
+LOCATION_FORMATS = ['{place}', '{lodge} Lodge, {place}', 'Behind {place}', 'Off {place} road', 'No. {number}, {place}']
+LODGES = ['AY', 'Grace', 'Peace', 'Royal', 'Emerald', 'Unity', 'Favour', 'Victory', 'Goshen', 'Sunrise']
+# Rent relative to the median; closer to campus costs more
+AREA_RENT = {'main-gate': 1.25, 'north-gate': 1.15, 'main-campus': 1.2, 'gandu': 1.0, 'town-campus': 1.0, 'kwandere': 0.75}
+HOUSE_MEDIAN_RENT = 180000
+ROOMMATE_MEDIAN_RENT = 80000
+
+HOUSE_KINDS = [('Self-contain', 35), ('Single room', 25), ('Room and parlour', 15), ('2 bedroom flat', 12),
+               ('Shared apartment', 8), ('3 bedroom flat', 5)]
+DESCRIPTION_PHRASES = [
+    'Water runs every day.', 'Prepaid meter, light is steady.', 'Fenced compound with a gate man.',
+    'Tiled floors and POP ceiling.', 'Five minutes walk to the gate.', 'Kitchen and toilet inside.',
+    'Quiet area, good for reading.', 'Landlord lives elsewhere.', 'Borehole in the compound.',
+    'Keke stops in front of the lodge.', 'Newly painted.', 'Wardrobe and reading table included.',
+]
+ROOMMATE_PHRASES = [
+    'Looking for a clean and calm roommate.', 'I am easy going and respect privacy.',
+    'Rent and bills are shared equally.', 'I read late most nights.', 'Prefer someone in the same faculty.',
+    'No parties in the room please.', 'I cook often and can share.',
+]
+INTERESTS = [
+    'Music', 'Football', 'Reading', 'Movies', 'Gaming', 'Cooking', 'Fitness', 'Fellowship', 'Dancing',
+    'Photography', 'Coding', 'Fashion', 'Basketball', 'Writing', 'Art', 'Chess', 'Travel', 'Studying',
+    'Night owl', 'Early riser', 'Introvert', 'Extrovert', 'No pets', 'Pet friendly', 'Non-smoker',
+]
+FIRST_NAMES = [
+    'Aisha', 'Chinedu', 'Emeka', 'Fatima', 'Grace', 'Ibrahim', 'Joy', 'Kelechi', 'Maryam', 'Musa', 'Ngozi',
+    'Oluwaseun', 'Precious', 'Sadiq', 'Tolu', 'Uche', 'Yusuf', 'Zainab', 'Blessing', 'David', 'Esther',
+    'Hauwa', 'John', 'Amina', 'Samuel', 'Halima', 'Daniel', 'Ruth', 'Abdullahi', 'Chioma',
+]
+LAST_NAMES = [
+    'Abubakar', 'Adeyemi', 'Bello', 'Danjuma', 'Eze', 'Garba', 'Ibrahim', 'Nwosu', 'Obi', 'Ogundele',
+    'Okafor', 'Okon', 'Olawale', 'Sani', 'Suleiman', 'Umar', 'Usman', 'Yakubu', 'Agbo', 'Ameh',
+]
+DEPARTMENTS = ['Computer Science', 'Accounting', 'Medicine', 'Law', 'Economics', 'Microbiology',
+               'Mass Communication', 'Civil Engineering', 'Biochemistry', 'English']
+
+
+def zipf_weights(count, exponent):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a production-sized, deterministic dataset (users, listings, gallery images, videos) "
+        "with skewed distributions for location, rent, interests and verification. Media are a few "
+        "shared placeholder files, so a million listings stay small on disk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=10000, help="Listings to create (e.g. 10000 to 1000000).")
+        parser.add_argument('--users', type=int, help="Users to create (default: one per four listings).")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows per INSERT / transaction.")
+        parser.add_argument('--until', default=SEED_UNTIL, help="Date (YYYY-MM-DD) of the newest listing.")
+        parser.add_argument('--days', type=int, default=730, help="Listings are spread over this many days before --until.")
+
+    def handle(self, *args, **options):
+        listing_count = options['listings']
+        user_count = options['users'] or max(listing_count // 4, 1)
+        if listing_count < 1 or options['batch_size'] < 1:
+            raise CommandError("--listings and --batch-size must be at least 1.")
+        try:
+            until = datetime.strptime(options['until'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            raise CommandError("--until must be a date like 2026-09-01.")
+        self.seed = options['seed']
+        self.domain = EMAIL_DOMAIN.format(seed=self.seed)
+        if User.objects.filter(email__endswith='@' + self.domain).exists():
+            raise CommandError(f"Seed {self.seed} was already loaded; use another --seed or a fresh database.")
+
+        self.rng = random.Random(self.seed)
+        self.until = until
+        self.days = options['days']
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        self.make_media()
+        users = self.create_users(user_count)
+        created = self.create_listings(users, listing_count, started)
+
+        # bulk_create skipped the signals; derived data is rebuilt once at the end
+        rent_stats.rebuild()
+        tags.invalidate_facets()
+        roommate_index.invalidate()
+        fragment_cache.invalidate_posters([user.id for user in users])
+        page_cache.bump_generation()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {user_count} users and {created} listings in {elapsed:.1f}s (seed {self.seed})."
+        ))
+
+    # --- Media ---
+
+    def save_media(self, model, field, filename, content):
+        name = model._meta.get_field(field).generate_filename(None, filename)
+        return default_storage.save(name, ContentFile(content))
+
+    def placeholder_image(self, size, index):
+        # Deterministic per index, distinct enough to tell cards apart
+        rng = random.Random(f'{self.seed}-{index}')
+        background = tuple(rng.randint(90, 200) for _ in range(3))
+        image = Image.new('RGB', size, background)
+        draw = ImageDraw.Draw(image)
+        width, height = size
+        for _ in range(4):
+            left, top = rng.randint(0, width // 2), rng.randint(height // 3, height - 20)
+            right, bottom = left + rng.randint(width // 6, width // 2), min(top + rng.randint(20, height // 2), height)
+            draw.rectangle([left, top, right, bottom], fill=tuple(rng.randint(40, 240) for _ in range(3)))
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+    def make_media(self):
+        self.images = []
+        self.derivatives = {}
+        for index in range(PLACEHOLDER_IMAGES):
+            name = self.save_media(ListingImage, 'image', f'seed-{index}.jpg', self.placeholder_image((1280, 960), index))
+            self.images.append(name)
+            # Derivatives are per file name, so every listing using it shares them
+            thumbnails.generate_derivatives(ListingImage(image=name).image)
+            self.derivatives[name] = thumbnails.derivatives_record(name)
+        self.avatars = [
+            self.save_media(User, 'profile_picture', f'seed-avatar-{index}.jpg', self.placeholder_image((256, 256), 1000 + index))
+            for index in range(PLACEHOLDER_AVATARS)
+        ]
+        self.video = self.save_media(ListingVideo, 'video', 'seed.mp4', PLACEHOLDER_VIDEO)
+
+    # --- Users ---
+
+    def create_users(self, count):
+        rng = self.rng
+        password = make_password(None)
+        joined = self.until - timedelta(days=self.days + 30)
+        users = []
+        for number in range(count):
+            verified = rng.random() < 0.25
+            users.append(User(
+                email=f'user{number}@{self.domain}',
+                password=password,
+                full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                phone_number=f'080{rng.randrange(10 ** 8):08d}',
+                department=rng.choice(DEPARTMENTS),
+                is_verified_student=verified,
+                verification_status='approved' if verified else rng.choices(
+                    ['not_submitted', 'pending', 'rejected'], weights=[80, 15, 5])[0],
+                profile_picture=rng.choice(self.avatars) if rng.random() < 0.4 else None,
+                date_joined=joined,
+            ))
+        created = []
+        for start in range(0, count, self.batch_size):
+            created += User.objects.bulk_create(users[start:start + self.batch_size])
+        return created
+
+    # --- Listings ---
+
+    def create_listings(self, users, count, started):
+        # A few agents post most houses; the same ranking for roommate posts
+        poster_weights = list(accumulate(zipf_weights(len(users), exponent=0.8)))
+        places = list(PLACE_WEIGHTS)
+        place_weights = list(accumulate(PLACE_WEIGHTS.values()))
+        interest_weights = zipf_weights(len(INTERESTS), exponent=0.8)
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            posters = self.rng.choices(users, cum_weights=poster_weights, k=size)
+            batch = [
+                self.make_listing(poster, self.rng.choices(places, cum_weights=place_weights)[0], interest_weights)
+                for poster in posters
+            ]
+            self.flush(batch)
+            created += size
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{created}/{count} listings ({created / elapsed:.0f}/s)")
+        return created
+
+    def make_listing(self, poster, slug, interest_weights):
+        rng = self.rng
+        listing_type = 'house' if rng.random() < 0.7 else 'roommate'
+        if slug is None:
+            location, latitude, longitude = rng.choice(UNKNOWN_LOCATIONS), None, None
+        else:
+            name, _, latitude, longitude, aliases = PLACES[slug]
+            place = rng.choice([name, name, *aliases]).title()
+            location = rng.choice(LOCATION_FORMATS).format(
+                place=place, lodge=rng.choice(LODGES), number=rng.randint(1, 60),
+            )
+            # Spread listings around the place instead of stacking them on one point
+            latitude, longitude = latitude + rng.gauss(0, 0.002), longitude + rng.gauss(0, 0.002)
+
+        median = HOUSE_MEDIAN_RENT if listing_type == 'house' else ROOMMATE_MEDIAN_RENT
+        rent = rng.lognormvariate(0, 0.5) * median * AREA_RENT.get(slug, 0.85)
+        if rng.random() < 0.01:
+            rent *= 5  # the odd luxury listing
+        rent = max(round(rent / 5000) * 5000, 15000)
+
+        verified = rng.random() < (0.2 if poster.is_verified_student else 0.03)
+        age = timedelta(days=self.days * rng.random() ** 2, seconds=rng.randrange(86400))
+        area = PLACES[slug][0] if slug else location
+        if listing_type == 'house':
+            kind = rng.choices([kind for kind, _ in HOUSE_KINDS], weights=[weight for _, weight in HOUSE_KINDS])[0]
+            title = f'{kind} in {area}'
+            description = ' '.join(rng.sample(DESCRIPTION_PHRASES, rng.randint(2, 4)))
+            gender = rng.choices([None, 'male', 'female'], weights=[60, 20, 20])[0]
+            level = None
+            interests = None
+            image_count = rng.choices(range(7), weights=[10, 20, 25, 20, 12, 8, 5])[0]
+            has_video = rng.random() < 0.08
+        else:
+            title = f'Roommate Request - {poster.full_name}'
+            description = ' '.join(rng.sample(ROOMMATE_PHRASES, rng.randint(1, 3)))
+            gender = rng.choices([None, 'male', 'female'], weights=[10, 45, 45])[0]
+            level = rng.choices([None, '100', '200', '300', '400', '500'], weights=[20, 25, 22, 18, 10, 5])[0]
+            wanted = rng.choices(range(6), weights=[10, 20, 30, 25, 10, 5])[0]
+            picked = []
+            while len(picked) < wanted:
+                interest = rng.choices(INTERESTS, weights=interest_weights)[0]
+                if interest not in picked:
+                    picked.append(interest)
+            interests = ', '.join(picked) or None
+            image_count = rng.choices(range(3), weights=[40, 40, 20])[0]
+            has_video = rng.random() < 0.02
+
+        gallery = [rng.choice(self.images) for _ in range(image_count)]
+        listing = Listing(
+            title=title, description=description, rent=rent, location=location,
+            latitude=latitude, longitude=longitude, listing_type=listing_type,
+            gender_preference=gender, level_preference=level, interests=interests,
+            image=gallery[0] if gallery else None, image_derivatives=self.derivatives[gallery[0]] if gallery else {},
+            posted_by=poster, is_verified_listing=verified,
+            views_count=min(int(rng.paretovariate(1.2) * 8), 50000),
+            image_count=len(gallery), video_count=int(has_video),
+            created_at=self.until - age,
+        )
+        return listing, gallery, has_video
+
+    def flush(self, batch):
+        created_at = Listing._meta.get_field('created_at')
+        with transaction.atomic():
+            # Keep the generated dates; auto_now_add would stamp them all "now"
+            created_at.auto_now_add = False
+            try:
+                listings = Listing.objects.bulk_create([listing for listing, _, _ in batch])
+            finally:
+                created_at.auto_now_add = True
+            counters.add_listings(listings)
+            gallery_rows = []
+            video_rows = []
+            for listing, (_, gallery, has_video) in zip(listings, batch):
+                gallery_rows += [
+                    ListingImage(listing=listing, image=name, image_derivatives=self.derivatives[name]) for name in gallery
+                ]
+                if has_video:
+                    video_rows.append(ListingVideo(listing=listing, video=self.video))
+            ListingImage.objects.bulk_create(gallery_rows)
+            ListingVideo.objects.bulk_create(video_rows)
+            search.index_listings(listings)
+            tags.sync_listing_tags([listing for listing in listings if listing.interests], created=True)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replication import LaggedReplica
+from core.routers import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Keeps the replica SQLite file a delayed copy of the primary (local testing of the read replica)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=2.0, help="Seconds the replica trails the primary.")
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds between snapshots.")
+        parser.add_argument('--once', action='store_true', help="Copy the primary to the replica now, then exit.")
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in settings.DATABASES:
+            raise CommandError("No 'replica' database configured; set ROOMLINK_REPLICA_DB to a second SQLite file.")
+        primary = settings.DATABASES['default']['NAME']
+        replica = settings.DATABASES[REPLICA_ALIAS]['NAME']
+
+        if options['once']:
+            LaggedReplica(primary, replica, lag=0).tick()
+            self.stdout.write(self.style.SUCCESS(f"Copied {primary} to {replica}."))
+            return
+
+        simulator = LaggedReplica(primary, replica, lag=options['lag'])
+        self.stdout.write(f"Replicating {primary} -> {replica} with {options['lag']}s lag. Press Ctrl+C to stop.")
+        try:
+            simulator.run(interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping replication.")
+        finally:
+            simulator.close()
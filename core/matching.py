@@ -0,0 +1,268 @@
+"""
+Roommate compatibility scoring.
+
+Every roommate listing is encoded once into a row of compact features:
+
+    interests  int bitset, one bit per interest tag (core.tags slug) in a
+               vocabulary built from listing data only
+    gender     one-hot bitmask (all bits set when there is no preference)
+    level      index into Listing.LEVEL_CHOICES, or -1
+    rent       float
+
+The rows live in column lists (a small in-memory matrix) that are updated in
+place when a roommate listing is saved or deleted (see core.signals), so
+ranking a seeker is one pass of integer AND / popcount over the columns and
+never touches the database or re-splits the comma-separated interests.
+
+Each process keeps its own matrix. A version counter in the cache tells a
+process when another one changed a listing; it then reloads the matrix with
+a single values_list() query.
+"""
+import heapq
+import threading
+
+from django.core.cache import cache
+from django.utils.text import slugify
+
+from .models import Listing
+from .tags import split_interests
+
+VERSION_KEY = 'roommate_index:version'
+
+GENDERS = [value for value, _ in Listing.GENDER_CHOICES]
+ANY_GENDER = (1 << len(GENDERS)) - 1
+LEVELS = [value for value, _ in Listing.LEVEL_CHOICES]
+
+# Interests that rule each other out (see the checkboxes in post.html)
+CONFLICTING_INTERESTS = [
+    (slugify(a), slugify(b))
+    for a, b in [('night owl', 'early riser'), ('introvert', 'extrovert'), ('pet friendly', 'no pets')]
+]
+
+WEIGHTS = {'interests': 0.5, 'rent': 0.3, 'level': 0.2}
+NEUTRAL = 0.5  # score for a feature one side left blank
+
+
+def to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CompatibilityIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.vocabulary = {}
+        self.conflicts = {}  # bit -> bitmask of the interests it conflicts with
+        self.version = None
+        self.reset()
+
+    def reset(self):
+        self.ids = []
+        self.posters = []
+        self.interests = []
+        self.genders = []
+        self.levels = []
+        self.rents = []
+        self.positions = {}
+        self.loaded = False
+
+    # --- Encoding ---
+
+    def interest_bit(self, slug):
+        bit = self.vocabulary.get(slug)
+        if bit is None:
+            bit = self.vocabulary[slug] = 1 << len(self.vocabulary)
+            for a, b in CONFLICTING_INTERESTS:
+                other = b if slug == a else a if slug == b else None
+                if other is not None:
+                    other_bit = self.interest_bit(other)
+                    self.conflicts[bit] = self.conflicts.get(bit, 0) | other_bit
+                    self.conflicts[other_bit] = self.conflicts.get(other_bit, 0) | bit
+        return bit
+
+    def encode(self, interests=None, gender=None, level=None, rent=None, learn=False):
+        """
+        Encodes one profile; `interests` is a list or a comma-joined string.
+        Only listing data is encoded with `learn`: a seeker's interests that no
+        listing has are ignored, so request input never grows the vocabulary.
+        """
+        if not isinstance(interests, str):
+            interests = ','.join(interests or [])
+        mask = 0
+        for slug in split_interests(interests):
+            if learn:
+                mask |= self.interest_bit(slug)
+            else:
+                mask |= self.vocabulary.get(slug, 0)
+        gender_mask = 1 << GENDERS.index(gender) if gender in GENDERS else ANY_GENDER
+        level_index = LEVELS.index(level) if level in LEVELS else -1
+        return mask, gender_mask, level_index, to_float(rent)
+
+    # --- Maintenance ---
+
+    def load(self):
+        rows = Listing.objects.filter(listing_type='roommate').values_list(
+            'id', 'posted_by_id', 'interests', 'gender_preference', 'level_preference', 'rent',
+        )
+        with self.lock:
+            self.version = self.shared_version()
+            self.reset()
+            for listing_id, poster_id, interests, gender, level, rent in rows.iterator():
+                self.put(listing_id, poster_id, self.encode(interests, gender, level, rent, learn=True))
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded or self.version != self.shared_version():
+            self.load()
+
+    def put(self, listing_id, poster_id, vector):
+        interests, gender, level, rent = vector
+        position = self.positions.get(listing_id)
+        if position is None:
+            self.positions[listing_id] = len(self.ids)
+            self.ids.append(listing_id)
+            self.posters.append(poster_id)
+            self.interests.append(interests)
+            self.genders.append(gender)
+            self.levels.append(level)
+            self.rents.append(rent or 0.0)
+        else:
+            self.posters[position] = poster_id
+            self.interests[position] = interests
+            self.genders[position] = gender
+            self.levels[position] = level
+            self.rents[position] = rent or 0.0
+
+    def drop(self, listing_id):
+        position = self.positions.pop(listing_id, None)
+        if position is None:
+            return
+        # Move the last row into the gap so removal is O(1)
+        last = len(self.ids) - 1
+        for column in (self.ids, self.posters, self.interests, self.genders, self.levels, self.rents):
+            column[position] = column[last]
+            column.pop()
+        if position != last:
+            self.positions[self.ids[position]] = position
+
+    def listing_changed(self, listing):
+        """Updates (or removes) one listing's row after it was saved."""
+        vector = None
+        if listing.listing_type == 'roommate':
+            vector = self.encode(
+                listing.interests, listing.gender_preference, listing.level_preference, listing.rent, learn=True,
+            )
+        with self.lock:
+            if self.apply_locally():
+                if vector is None:
+                    self.drop(listing.id)
+                else:
+                    self.put(listing.id, listing.posted_by_id, vector)
+
+    def encode_seeker(self, *args, **kwargs):
+        """encode() for a search, against the current listings' vocabulary."""
+        with self.lock:
+            self.ensure_loaded()
+            return self.encode(*args, **kwargs)
+
+    def listing_deleted(self, listing_id):
+        with self.lock:
+            if self.apply_locally():
+                self.drop(listing_id)
+
+    def invalidate(self):
+        """Forces every process to reload, e.g. after a bulk_create."""
+        self.bump_version()
+
+    # --- Cross-process versioning ---
+
+    def shared_version(self):
+        return cache.get(VERSION_KEY, 0)
+
+    def bump_version(self):
+        try:
+            return cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, 0, None)
+            return cache.incr(VERSION_KEY)
+
+    def apply_locally(self):
+        """
+        Bumps the shared version. Returns True when this process's matrix was
+        current until now, so the change can be applied in place; otherwise
+        the matrix is left to reload on next use.
+        """
+        new_version = self.bump_version()
+        if self.loaded and self.version == new_version - 1:
+            self.version = new_version
+            return True
+        self.loaded = False
+        return False
+
+    # --- Scoring ---
+
+    def best_matches(self, seeker, limit=20, exclude_poster=None, gender=None, min_rent=None, max_rent=None):
+        """
+        Ranks every roommate listing against `seeker` (an encode() tuple).
+        Returns [(listing_id, score)] with scores between 0 and 1, best first.
+        Gender, when both sides state one, and the rent bounds are hard filters.
+        """
+        with self.lock:
+            self.ensure_loaded()
+            seek_interests, seek_gender, seek_level, seek_rent = seeker
+            if gender in GENDERS:
+                seek_gender &= 1 << GENDERS.index(gender)
+            seek_count = seek_interests.bit_count()
+            seek_conflicts = 0
+            for bit, conflicting in self.conflicts.items():
+                if seek_interests & bit:
+                    seek_conflicts |= conflicting
+            min_rent, max_rent = to_float(min_rent), to_float(max_rent)
+
+            w_interests, w_rent, w_level = WEIGHTS['interests'], WEIGHTS['rent'], WEIGHTS['level']
+            scored = []
+            for listing_id, poster_id, interests, genders, level, rent in zip(
+                self.ids, self.posters, self.interests, self.genders, self.levels, self.rents,
+            ):
+                if not seek_gender & genders or poster_id == exclude_poster:
+                    continue
+                if (min_rent is not None and rent < min_rent) or (max_rent is not None and rent > max_rent):
+                    continue
+
+                union = (seek_interests | interests).bit_count()
+                if seek_count and union:
+                    shared = (seek_interests & interests).bit_count()
+                    clashes = (seek_conflicts & interests).bit_count()
+                    interest_score = max(shared - clashes, 0) / union
+                else:
+                    interest_score = NEUTRAL
+
+                if seek_rent and rent:
+                    rent_score = 1 - abs(seek_rent - rent) / max(seek_rent, rent)
+                else:
+                    rent_score = NEUTRAL
+
+                if seek_level < 0 or level < 0:
+                    level_score = NEUTRAL
+                else:
+                    level_score = max(1 - abs(seek_level - level) / 2, 0)
+
+                scored.append((
+                    w_interests * interest_score + w_rent * rent_score + w_level * level_score,
+                    listing_id,
+                ))
+
+        return [(listing_id, round(score, 3)) for score, listing_id in heapq.nlargest(limit, scored)]
+
+
+roommate_index = CompatibilityIndex()
+
+
+def seeker_from_listing(listing, rent=None):
+    return roommate_index.encode_seeker(
+        listing.interests, listing.gender_preference, listing.level_preference,
+        rent if rent not in (None, '') else listing.rent,
+    )
+
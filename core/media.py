@@ -0,0 +1,165 @@
+"""
+Serving uploaded media (MEDIA_ROOT) from Django.
+
+django.views.static.serve, used through static() in DEBUG, sends every file
+whole and has no byte-range support, so listing videos can't seek. This view
+adds single-range requests (206/416), ETag / Last-Modified validators with
+304s, long-lived cache headers, and hands full files to FileResponse so the
+WSGI server can use sendfile. If MEDIA_ACCEL_REDIRECT_PREFIX is set, the
+view only checks access and lets the front proxy (nginx `internal` location)
+send the bytes.
+
+Verification documents are ID cards and admission letters, so only staff can
+fetch them; in-progress chunked uploads are never served.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+DEFAULT_MAX_AGE = 60 * 60 * 24 * 30
+PRIVATE_PREFIXES = ('verification_docs/',)
+HIDDEN_PREFIXES = ('upload_staging/',)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of a file starting at `start`."""
+
+    def __init__(self, f, start, length):
+        self.file = f
+        self.remaining = length
+        f.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) for a single `bytes=` range, None if there is no
+    usable Range header (serve the whole file), or 'unsatisfiable'.
+    Multi-range requests are answered with the whole file, which RFC 9110
+    allows.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+    return since is not None and int(mtime) <= since
+
+
+def _range_allowed(request, etag, mtime):
+    # If-Range: only send a part if the client's copy is still current
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+@require_safe
+def serve_media(request, path):
+    path = path.lstrip('/')
+    if not path or path.startswith(HIDDEN_PREFIXES):
+        raise Http404
+    private = path.startswith(PRIVATE_PREFIXES)
+    if private and not request.user.is_staff:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    size, mtime = stat.st_size, stat.st_mtime
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Accept-Ranges'] = 'bytes'
+        if private:
+            response['Cache-Control'] = 'private, no-store'
+        else:
+            max_age = getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+            response['Cache-Control'] = f'public, max-age={max_age}'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
+
+    if _not_modified(request, etag, mtime):
+        return finish(HttpResponseNotModified())
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if accel_prefix:
+        # The proxy handles Range itself; we only decided who may see what
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        return finish(response)
+
+    byte_range = parse_range(request.headers.get('Range'), size) if _range_allowed(request, etag, mtime) else None
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        return finish(response)
+
+    if byte_range is None:
+        return finish(FileResponse(open(full_path, 'rb'), content_type=content_type))
+
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(RangeFile(open(full_path, 'rb'), start, length), status=206, content_type=content_type)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_listingvideo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-is_verified_listing', '-created_at', '-id'], name='listing_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['listing_type', '-is_verified_listing', '-created_at', '-id'], name='listing_type_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['listing_type', 'gender_preference', '-is_verified_listing', '-created_at', '-id'], name='listing_gender_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['listing_type', 'rent'], name='listing_type_rent_idx'),
+        ),
+    ]
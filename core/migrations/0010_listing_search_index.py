@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_listing_fts USING fts5("
+        "title, location, description, interests, poster_name, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_listing_fts (rowid, title, location, description, interests, poster_name) "
+        "SELECT l.id, l.title, l.location, l.description, "
+        "REPLACE(COALESCE(l.interests, ''), ',', ' '), u.full_name "
+        "FROM core_listing l JOIN core_user u ON u.id = l.posted_by_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_listing_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_listing_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='listings', to='core.interesttag'),
+        ),
+    ]
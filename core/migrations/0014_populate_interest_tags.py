@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def split_interests(value):
+    names = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())
+        if name and slugify(name):
+            names.setdefault(slugify(name), name)
+    return names
+
+
+def populate_tags(apps, schema_editor):
+    Listing = apps.get_model('core', 'Listing')
+    InterestTag = apps.get_model('core', 'InterestTag')
+    Through = Listing.tags.through
+
+    wanted = {}
+    all_names = {}
+    rows = Listing.objects.exclude(interests__isnull=True).exclude(interests='').values_list('id', 'interests')
+    for listing_id, interests in rows.iterator():
+        wanted[listing_id] = split_interests(interests)
+        for slug, name in wanted[listing_id].items():
+            all_names.setdefault(slug, name)
+
+    InterestTag.objects.bulk_create(
+        [InterestTag(name=name, slug=slug) for slug, name in all_names.items()], ignore_conflicts=True,
+    )
+    tag_ids = dict(InterestTag.objects.values_list('slug', 'id'))
+    Through.objects.bulk_create(
+        [
+            Through(listing_id=listing_id, interesttag_id=tag_ids[slug])
+            for listing_id, names in wanted.items() for slug in names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def clear_tags(apps, schema_editor):
+    Listing = apps.get_model('core', 'Listing')
+    Listing.tags.through.objects.all().delete()
+    apps.get_model('core', 'InterestTag').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_interesttag'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, clear_tags),
+    ]
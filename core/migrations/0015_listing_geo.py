@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:27
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of core.gazetteer / core.geo.geocode as of this migration:
+# slug -> (latitude, longitude, names matched as whole words)
+PLACES = {
+    'main-campus': (8.4841, 8.5706, ['main campus', 'permanent site', 'fulafia', 'school']),
+    'main-gate': (8.4805, 8.5682, ['main gate', 'school gate', 'front gate']),
+    'north-gate': (8.4898, 8.5719, ['north gate', 'back gate']),
+    'town-campus': (8.4966, 8.5187, ['town campus', 'mini campus', 'temporary site']),
+    'gandu': (8.4763, 8.5598, ['gandu']),
+    'mararaba': (8.5032, 8.5425, ['mararaba', 'mararaba akunza']),
+    'akurba': (8.4702, 8.5468, ['akurba']),
+    'bukan-sidi': (8.5104, 8.5262, ['bukan sidi', 'bukan-sidi']),
+    'shinge': (8.4918, 8.5337, ['shinge']),
+    'tudun-kauri': (8.5001, 8.5093, ['tudun kauri']),
+    'kwandere': (8.5227, 8.5571, ['kwandere']),
+}
+
+
+def normalize(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def geocode(text):
+    """(latitude, longitude) of the place `text` mentions (longest match), or None."""
+    aliases = {normalize(alias): slug for slug, (_, _, names) in PLACES.items() for alias in names}
+    pattern = '|'.join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+    matches = re.findall(rf'\b(?:{pattern})\b', normalize(text or ''))
+    if not matches:
+        return None
+    latitude, longitude, _ = PLACES[aliases[max(matches, key=len)]]
+    return latitude, longitude
+
+
+def geocode_listings(apps, schema_editor):
+    Listing = apps.get_model('core', 'Listing')
+    changed = []
+    for listing in Listing.objects.only('id', 'location').iterator():
+        place = geocode(listing.location)
+        if place is not None:
+            listing.latitude, listing.longitude = place
+            changed.append(listing)
+    Listing.objects.bulk_update(changed, ['latitude', 'longitude'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_populate_interest_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['listing_type', 'latitude', 'longitude'], name='listing_geo_idx'),
+        ),
+        migrations.RunPython(geocode_listings, migrations.RunPython.noop),
+    ]
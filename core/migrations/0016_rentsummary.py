@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:29
+
+import re
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copies of core.rent_stats and core.geo as of this migration
+RENT_BUCKETS = [
+    0, 25000, 50000, 75000, 100000, 150000, 200000, 250000, 300000,
+    400000, 500000, 750000, 1000000, 1500000, 2000000,
+]
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Gazetteer place slug -> names matched as whole words
+PLACE_NAMES = {
+    'main-campus': ['main campus', 'permanent site', 'fulafia', 'school'],
+    'main-gate': ['main gate', 'school gate', 'front gate'],
+    'north-gate': ['north gate', 'back gate'],
+    'town-campus': ['town campus', 'mini campus', 'temporary site'],
+    'gandu': ['gandu'],
+    'mararaba': ['mararaba', 'mararaba akunza'],
+    'akurba': ['akurba'],
+    'bukan-sidi': ['bukan sidi', 'bukan-sidi'],
+    'shinge': ['shinge'],
+    'tudun-kauri': ['tudun kauri'],
+    'kwandere': ['kwandere'],
+}
+
+
+def normalize(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def area_of(location, aliases, pattern):
+    matches = pattern.findall(normalize(location or ''))
+    return aliases[max(matches, key=len)] if matches else None
+
+
+def percentiles_from(histogram):
+    count = sum(histogram)
+    result = {}
+    if count <= 0:
+        return result
+    for percentile in PERCENTILES:
+        target = count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(histogram):
+            if bucket_count > 0 and cumulative + bucket_count >= target:
+                low = RENT_BUCKETS[index]
+                high = RENT_BUCKETS[index + 1] if index + 1 < len(RENT_BUCKETS) else low
+                fraction = (target - cumulative) / bucket_count
+                result[str(percentile)] = round(low + (high - low) * fraction)
+                break
+            cumulative += bucket_count
+    return result
+
+
+def build_summaries(apps, schema_editor):
+    Listing = apps.get_model('core', 'Listing')
+    RentSummary = apps.get_model('core', 'RentSummary')
+    aliases = {normalize(alias): slug for slug, names in PLACE_NAMES.items() for alias in names}
+    pattern = re.compile(
+        r'\b(?:%s)\b' % '|'.join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+    )
+
+    # {(listing_type, area): (count, total, histogram)}; area '' is every listing of the type
+    summaries = {}
+    for listing_type, location, rent in Listing.objects.values_list('listing_type', 'location', 'rent').iterator():
+        if rent is None or not listing_type:
+            continue
+        rent = Decimal(str(rent))
+        keys = [(listing_type, '')]
+        area = area_of(location, aliases, pattern)
+        if area is not None:
+            keys.append((listing_type, area))
+        for key in keys:
+            count, total, histogram = summaries.get(key, (0, Decimal(0), [0] * len(RENT_BUCKETS)))
+            histogram[max(bisect_right(RENT_BUCKETS, rent) - 1, 0)] += 1
+            summaries[key] = (count + 1, total + rent, histogram)
+
+    RentSummary.objects.bulk_create([
+        RentSummary(
+            listing_type=listing_type, area=area, count=count, total=total,
+            histogram=histogram, percentiles=percentiles_from(histogram),
+        )
+        for (listing_type, area), (count, total, histogram) in summaries.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_listing_geo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('house', 'House'), ('roommate', 'Roommate')], max_length=20)),
+                ('area', models.CharField(blank=True, help_text='Gazetteer place slug; empty for all listings', max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('histogram', models.JSONField(default=list, help_text='Listing count per bucket of core.rent_stats.RENT_BUCKETS')),
+                ('percentiles', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('listing_type', 'area'), name='rent_summary_key')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0016_rentsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_verified_listing', False), ('reviewed_at__isnull', True)), fields=['created_at', 'id'], name='listing_review_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('verification_status', 'pending')), fields=['id'], name='user_pending_verification_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing_rows(apps, schema_editor):
+    Listing = apps.get_model('core', 'Listing')
+    ListingImage = apps.get_model('core', 'ListingImage')
+    ListingVideo = apps.get_model('core', 'ListingVideo')
+    User = apps.get_model('core', 'User')
+
+    def count(related, foreign_key):
+        rows = related.objects.filter(**{foreign_key: OuterRef('pk')}).order_by().values(foreign_key)
+        return Coalesce(Subquery(rows.annotate(n=Count('pk')).values('n')), Value(0))
+
+    Listing.objects.update(image_count=count(ListingImage, 'listing'), video_count=count(ListingVideo, 'listing'))
+    User.objects.update(listing_count=count(Listing, 'posted_by'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_moderation_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='listing_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
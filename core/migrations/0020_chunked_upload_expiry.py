@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_recorded_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chunkedupload',
+            index=models.Index(fields=['user', 'status'], name='chunked_upload_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chunkedupload',
+            index=models.Index(fields=['status', 'updated_at'], name='chunked_upload_stale_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .validators import validate_video_size
 
 class UserManager(BaseUserManager):
@@ -20,7 +23,23 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('is_active', True)
         return self.create_user(email, password, **extra_fields)
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    For models with denormalized counters (COUNTER_FIELDS), which are only
+    ever changed with F() updates in the database (core.counters). A plain
+    save() of an existing row leaves them out of its UPDATE, so an instance
+    loaded before a counter moved doesn't write the old value back. Saves
+    that name a counter in update_fields still write it.
+    """
+    COUNTER_FIELDS = ()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     username = None # We use email as username
     email = models.EmailField(_('email address'), unique=True)
     
@@ -49,12 +68,28 @@ class User(AbstractUser):
 
     # Profile Picture
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Thumbnail widths written for profile_picture (core.thumbnails.record_derivatives)
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Kept by core.signals, repaired by `manage.py reconcile_counters`
+    listing_count = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name', 'phone_number']
 
     objects = UserManager()
 
+    COUNTER_FIELDS = ('listing_count',)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The verification queue (core.moderation): only pending rows are indexed
+            models.Index(
+                fields=['id'], name='user_pending_verification_idx',
+                condition=models.Q(verification_status='pending'),
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -74,7 +109,28 @@ class User(AbstractUser):
         return clean_number
 
 
-class Listing(models.Model):
+class ListingQuerySet(models.QuerySet):
+    def for_cards(self):
+        """
+        Everything a listing card reads, fetched up front: the poster (badges,
+        avatar, WhatsApp link) in the same query. The video badge reads the
+        video_count column, so there is no `videos.exists` query per card.
+        """
+        return self.select_related('posted_by')
+
+
+class InterestTag(models.Model):
+    """One interest / habit, e.g. "Night Owl". Listings link to these through Listing.tags."""
+    name = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class Listing(CounterFieldsMixin, models.Model):
     LISTING_TYPE_CHOICES = [
         ('house', 'House'),
         ('roommate', 'Roommate'),
@@ -84,6 +140,9 @@ class Listing(models.Model):
     description = models.TextField()
     rent = models.DecimalField(max_digits=10, decimal_places=2)
     location = models.CharField(max_length=255)
+    # Filled from `location` via the offline gazetteer (core.geo) when it names a known place
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     listing_type = models.CharField(max_length=20, choices=LISTING_TYPE_CHOICES)
     
     # Roommate Specific Fields
@@ -94,18 +153,79 @@ class Listing(models.Model):
     level_preference = models.CharField(max_length=10, choices=LEVEL_CHOICES, blank=True, null=True)
     
     interests = models.CharField(max_length=255, blank=True, null=True, help_text="Comma separated interests (e.g. Reading, Music, Sports)")
+    # Normalized copy of `interests` for exact filtering; kept in sync by core.signals
+    tags = models.ManyToManyField(InterestTag, related_name='listings', blank=True)
 
     # Simple single image for MVP (Acts as thumbnail)
     image = models.ImageField(upload_to='listing_images/', blank=True, null=True)
+    # Thumbnail widths written for image (core.thumbnails.record_derivatives)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     posted_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listings')
     is_verified_listing = models.BooleanField(default=False)
+    # Set when a moderator approves or rejects the listing; unreviewed
+    # unverified listings make up the moderation queue (core.moderation)
+    reviewed_at = models.DateTimeField(blank=True, null=True)
     views_count = models.PositiveIntegerField(default=0)
+    # Gallery images and videos; kept by core.signals, repaired by `manage.py reconcile_counters`
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    video_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ListingQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('image_count', 'video_count')
+
+    class Meta:
+        # Composite indexes matching the feed queries in core.views: the
+        # listing_type filter, optional rent range / gender filter, and the
+        # keyset ordering in core.pagination.FEED_ORDERING.
+        indexes = [
+            models.Index(fields=['-is_verified_listing', '-created_at', '-id'], name='listing_feed_idx'),
+            models.Index(fields=['listing_type', '-is_verified_listing', '-created_at', '-id'], name='listing_type_feed_idx'),
+            models.Index(fields=['listing_type', 'gender_preference', '-is_verified_listing', '-created_at', '-id'], name='listing_gender_feed_idx'),
+            models.Index(fields=['listing_type', 'rent'], name='listing_type_rent_idx'),
+            # Bounding-box range for "within N km" (core.geo)
+            models.Index(fields=['listing_type', 'latitude', 'longitude'], name='listing_geo_idx'),
+            # The listing review queue, oldest first; only unreviewed rows are indexed
+            models.Index(
+                fields=['created_at', 'id'], name='listing_review_queue_idx',
+                condition=models.Q(is_verified_listing=False, reviewed_at__isnull=True),
+            ),
+        ]
+
+    # Fields whose previous values core.signals needs (geocoding, rent stats,
+    # listing counts, interest tags and facets, thumbnails)
+    TRACKED_FIELDS = ('location', 'listing_type', 'rent', 'posted_by_id', 'interests', 'gender_preference', 'image')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def _tracked_value(self, field):
+        value = self.__dict__.get(field)
+        # Files by name: a FieldFile is updated in place when it is saved
+        return getattr(value, 'name', value) if field == 'image' else value
+
+    def remember_loaded_values(self):
+        self._loaded_values = {field: self._tracked_value(field) for field in self.TRACKED_FIELDS}
+
+    def changed_since_loaded(self, *fields):
+        """True if any of the TRACKED_FIELDS given differs from the value loaded (or last saved)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(self._tracked_value(field) != loaded.get(field) for field in fields)
+
     def __str__(self):
         return self.title
 
+    @property
+    def has_video(self):
+        return self.video_count > 0
+
     @property
     def interests_list(self):
         if self.interests:
@@ -138,6 +258,7 @@ class Listing(models.Model):
 class ListingImage(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='listing_images/gallery/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -151,3 +272,93 @@ class ListingVideo(models.Model):
 
     def __str__(self):
         return f"Video for {self.listing.title}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work (see core.jobs). Rows are picked up by
+    `manage.py run_jobs`, so heavy media processing happens outside the
+    request that uploaded the files.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A video being uploaded in pieces (see core.uploads). Bytes are appended to
+    a staging file until `received == total_size`; the finished file is then
+    moved into place as a ListingVideo when the listing form is submitted.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Per-user limit and expiry of abandoned uploads (core.uploads)
+            models.Index(fields=['user', 'status'], name='chunked_upload_user_idx'),
+            models.Index(fields=['status', 'updated_at'], name='chunked_upload_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size} bytes)"
+
+
+class RentSummary(models.Model):
+    """
+    Precomputed rent distribution for one listing type, either overall
+    (area '') or for one gazetteer area. Maintained incrementally by
+    core.rent_stats so the budget filters read one row instead of
+    aggregating over every listing.
+    """
+    listing_type = models.CharField(max_length=20, choices=Listing.LISTING_TYPE_CHOICES)
+    area = models.CharField(max_length=50, blank=True, help_text="Gazetteer place slug; empty for all listings")
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    histogram = models.JSONField(default=list, help_text="Listing count per bucket of core.rent_stats.RENT_BUCKETS")
+    percentiles = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing_type', 'area'], name='rent_summary_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_type} rents in {self.area or 'all areas'} ({self.count})"
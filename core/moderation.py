@@ -0,0 +1,197 @@
+"""
+Moderation queue for staff: pending student verifications and listings
+awaiting review, at /admin/moderation/.
+
+The default admin changelists don't scale to this: they count every
+matching row on each page, page with OFFSET and (for listings) query the
+poster per row. The queue instead
+  * pages with a keyset cursor over the partial indexes on User
+    (user_pending_verification_idx) and Listing (listing_review_queue_idx),
+    oldest first, so page 200 costs what page 1 does,
+  * never counts; a page knows only whether another one follows,
+  * fetches each listing's poster in the same query,
+  * shows document and image previews collapsed, loaded only when opened.
+
+Approving or rejecting runs as a series of small UPDATEs (MODERATION_CHUNK_SIZE
+rows each, every chunk its own transaction) so a large selection doesn't hold
+the SQLite write lock for long. update() skips signals, so the caches that
+show verification badges are invalidated here: the card fragments of the
+affected listings/posters and the anonymous page cache.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from . import fragment_cache, page_cache
+from .models import Listing, User
+
+QUEUE_PAGE_SIZE = 50
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+MODERATION_CHUNK_SIZE = 500
+QUEUES = {
+    'verifications': "Student verifications",
+    'listings': "Listings awaiting review",
+}
+# Deciding a queue's rows needs the same permission as the matching admin actions
+QUEUE_PERMISSIONS = {
+    'verifications': 'core.change_user',
+    'listings': 'core.change_listing',
+}
+
+
+# --- Queues ---
+
+def pending_verifications():
+    return User.objects.filter(verification_status='pending')
+
+
+def unreviewed_listings():
+    return Listing.objects.filter(is_verified_listing=False, reviewed_at__isnull=True)
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat() if created_at else ''}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at or None, id), or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return (datetime.fromisoformat(created_at) if created_at else None), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def verification_page(cursor=None, page_size=QUEUE_PAGE_SIZE):
+    """(users, next_cursor), oldest account first."""
+    users = pending_verifications().only(
+        'id', 'email', 'full_name', 'department', 'matric_number', 'verification_document', 'date_joined',
+    ).order_by('id')
+    position = decode_cursor(cursor)
+    if position:
+        users = users.filter(id__gt=position[1])
+    users = list(users[:page_size + 1])
+    next_cursor = None
+    if len(users) > page_size:
+        users = users[:page_size]
+        next_cursor = encode_cursor(None, users[-1].id)
+    return users, next_cursor
+
+
+def listing_page(cursor=None, page_size=QUEUE_PAGE_SIZE):
+    """(listings with their posters, next_cursor), oldest listing first."""
+    listings = unreviewed_listings().select_related('posted_by').order_by('created_at', 'id')
+    position = decode_cursor(cursor)
+    if position and position[0]:
+        created_at, pk = position
+        listings = listings.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    listings = list(listings[:page_size + 1])
+    next_cursor = None
+    if len(listings) > page_size:
+        listings = listings[:page_size]
+        next_cursor = encode_cursor(listings[-1].created_at, listings[-1].id)
+    return listings, next_cursor
+
+
+# --- Bulk decisions ---
+
+def _chunks(ids, size):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def set_verification(user_ids, approved, chunk_size=MODERATION_CHUNK_SIZE):
+    """Approves or rejects the users' verification. Returns the number of users updated."""
+    status = 'approved' if approved else 'rejected'
+    updated = 0
+    for chunk in _chunks(user_ids, chunk_size):
+        with transaction.atomic():
+            updated += User.objects.filter(id__in=chunk).update(verification_status=status, is_verified_student=approved)
+        fragment_cache.invalidate_posters(chunk)
+    if updated:
+        page_cache.bump_generation()
+    return updated
+
+
+def review_listings(listing_ids, approved, chunk_size=MODERATION_CHUNK_SIZE):
+    """
+    Marks the listings reviewed; approved ones become Verified Listings.
+    Returns the number of listings updated.
+    """
+    now = timezone.now()
+    updated = 0
+    for chunk in _chunks(listing_ids, chunk_size):
+        with transaction.atomic():
+            updated += Listing.objects.filter(id__in=chunk).update(is_verified_listing=approved, reviewed_at=now)
+        fragment_cache.invalidate_listings(chunk)
+    if updated:
+        page_cache.bump_generation()
+    return updated
+
+
+# --- View ---
+
+def _selected_ids(request):
+    ids = []
+    for value in request.POST.getlist('ids'):
+        try:
+            ids.append(int(value))
+        except ValueError:
+            continue
+    return ids
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+def queue(request):
+    """Staff only: wrapped in admin.site.admin_view() in roomlink.urls."""
+    name = request.GET.get('queue')
+    if name not in QUEUES:
+        name = 'verifications'
+    if not request.user.has_perm(QUEUE_PERMISSIONS[name]):
+        raise PermissionDenied
+    cursor = request.GET.get('cursor')
+
+    if request.method == 'POST':
+        ids = _selected_ids(request)
+        approved = request.POST.get('decision') == 'approve'
+        if not ids:
+            messages.warning(request, "Select at least one row.")
+        elif name == 'verifications':
+            count = set_verification(ids, approved)
+            messages.success(request, f"{count} verifications {'approved' if approved else 'rejected'}.")
+        else:
+            count = review_listings(ids, approved)
+            messages.success(request, f"{count} listings {'verified' if approved else 'rejected'}.")
+        # Decided rows leave the queue, so the same cursor shows the next ones
+        url = f"{reverse('moderation_queue')}?queue={name}"
+        return redirect(f"{url}&cursor={cursor}" if cursor else url)
+
+    rows, next_cursor = verification_page(cursor) if name == 'verifications' else listing_page(cursor)
+    for row in rows:
+        document = getattr(row, 'verification_document', None)
+        # PDFs get a link instead of an inline preview
+        row.document_is_image = bool(document) and document.name.lower().endswith(IMAGE_EXTENSIONS)
+    return TemplateResponse(request, 'admin/moderation_queue.html', {
+        **admin.site.each_context(request),
+        'title': QUEUES[name],
+        'queue': name,
+        'queues': {key: label for key, label in QUEUES.items() if request.user.has_perm(QUEUE_PERMISSIONS[key])},
+        'rows': rows,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+    })
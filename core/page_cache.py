@@ -0,0 +1,155 @@
+"""
+Full-page cache for the anonymous feed pages (home, houses, roommates).
+
+Only GETs without a session cookie are cached, so deciding never loads the
+session or the user; visitors who have one (logged in, or holding flash
+messages) get the page rendered. A request is also cached only when every
+query parameter is one the page key understands (CACHE_PARAMS); anything else (tags, near,
+match...) renders as usual. The key is the path plus the normalized query
+string: empty values dropped and parameters sorted, so `?max_budget=&q=flat`
+and `?q=flat` share an entry.
+
+Entries are stamped with the listings generation, a stamp bumped whenever a
+listing (or anything shown on its card) is created, edited or deleted, from
+core.signals and from admin actions that bypass signals. An entry from an
+older generation, or older than PAGE_CACHE_TIMEOUT, is stale. The first
+request to find it stale takes a short lock and rebuilds the page; requests
+arriving meanwhile are served the stale copy instead of all rendering the
+same page at once. Stale copies are kept for PAGE_CACHE_STALE_TIMEOUT.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CACHE_PARAMS = ('q', 'min_budget', 'max_budget', 'gender', 'cursor')
+PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_STALE_TIMEOUT = 60 * 60
+REBUILD_LOCK_TIMEOUT = 30
+GENERATION_KEY = 'page_cache:generation'
+STATUS_HEADER = 'X-Page-Cache'
+
+
+def _new_generation():
+    return time.time_ns()
+
+
+def generation():
+    # A missing stamp (never bumped, or evicted) gets a fresh one, which no
+    # cached page can carry
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        current = _new_generation()
+        cache.set(GENERATION_KEY, current, timeout=None)
+    return current
+
+
+async def ageneration():
+    current = await cache.aget(GENERATION_KEY)
+    if current is None:
+        current = _new_generation()
+        await cache.aset(GENERATION_KEY, current, timeout=None)
+    return current
+
+
+def bump_generation():
+    """Marks every cached page stale."""
+    cache.set(GENERATION_KEY, _new_generation(), timeout=None)
+
+
+def page_key(request):
+    """The cache key for `request`, or None if the page must not be cached."""
+    if request.method != 'GET' or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    if not set(request.GET) <= set(CACHE_PARAMS):
+        return None
+    # Flash messages are rendered into the page and meant for one visitor
+    if len(get_messages(request)):
+        return None
+    params = sorted((name, value) for name, values in request.GET.lists() for value in values if value)
+    digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+    return f'page:{request.path}:{digest}'
+
+
+def _lock_key(key):
+    return f'{key}:rebuilding'
+
+
+def _is_fresh(entry, current_generation):
+    return entry['generation'] == current_generation and time.time() - entry['built_at'] < PAGE_CACHE_TIMEOUT
+
+
+def _entry(response, current_generation):
+    return {
+        'generation': current_generation,
+        'built_at': time.time(),
+        'content': response.content,
+        'content_type': response['Content-Type'],
+    }
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _from_entry(entry, status):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response[STATUS_HEADER] = status
+    return response
+
+
+def cache_anonymous_page(view):
+    """Decorator for a feed view, sync or async."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = page_key(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+
+            current_generation = await ageneration()
+            entry = await cache.aget(key)
+            if entry is not None and _is_fresh(entry, current_generation):
+                return _from_entry(entry, 'hit')
+            if entry is not None and not await cache.aadd(_lock_key(key), 1, REBUILD_LOCK_TIMEOUT):
+                return _from_entry(entry, 'stale')
+            try:
+                response = await view(request, *args, **kwargs)
+                if _cacheable(response):
+                    await cache.aset(key, _entry(response, current_generation), PAGE_CACHE_STALE_TIMEOUT)
+            finally:
+                if entry is not None:
+                    await cache.adelete(_lock_key(key))
+            response[STATUS_HEADER] = 'miss'
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = page_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        current_generation = generation()
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry, current_generation):
+            return _from_entry(entry, 'hit')
+        # Stale: one request rebuilds, the others get the old page meanwhile
+        if entry is not None and not cache.add(_lock_key(key), 1, REBUILD_LOCK_TIMEOUT):
+            return _from_entry(entry, 'stale')
+        try:
+            response = view(request, *args, **kwargs)
+            if _cacheable(response):
+                cache.set(key, _entry(response, current_generation), PAGE_CACHE_STALE_TIMEOUT)
+        finally:
+            if entry is not None:
+                cache.delete(_lock_key(key))
+        response[STATUS_HEADER] = 'miss'
+        return response
+    return wrapper
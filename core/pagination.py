@@ -0,0 +1,86 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+# Feed ordering: Verified listings first, then newest. `id` breaks ties so the
+# ordering is total and a cursor always points at exactly one row.
+FEED_ORDERING = ('-is_verified_listing', '-created_at', '-id')
+FEED_PAGE_SIZE = 20
+
+
+def encode_cursor(listing):
+    """`listing` is a Listing or a values() dict with the FEED_ORDERING fields."""
+    if isinstance(listing, dict):
+        verified, created_at, pk = listing['is_verified_listing'], listing['created_at'], listing['id']
+    else:
+        verified, created_at, pk = listing.is_verified_listing, listing.created_at, listing.id
+    raw = f"{int(verified)}|{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (is_verified_listing, created_at, id) or None if the cursor
+    is missing or malformed (callers then just serve the first page).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        verified, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return bool(int(verified)), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def paginate_feed(queryset, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    Keyset pagination over FEED_ORDERING.
+
+    Instead of OFFSET (which makes SQLite walk every skipped row), we seek
+    directly past the last row of the previous page, so page 50 costs the
+    same as page 1 as long as the feed indexes on Listing are used.
+
+    Returns (listings, next_cursor). next_cursor is None on the last page.
+    """
+    return _page(list(_seek(queryset, cursor, page_size)), page_size)
+
+
+async def apaginate_feed(queryset, cursor=None, page_size=FEED_PAGE_SIZE):
+    """paginate_feed for async views."""
+    return _page([listing async for listing in _seek(queryset, cursor, page_size)], page_size)
+
+
+def _seek(queryset, cursor, page_size):
+    queryset = queryset.order_by(*FEED_ORDERING)
+
+    position = decode_cursor(cursor)
+    if position:
+        verified, created_at, pk = position
+        queryset = queryset.filter(
+            Q(is_verified_listing__lt=verified) |
+            Q(is_verified_listing=verified, created_at__lt=created_at) |
+            Q(is_verified_listing=verified, created_at=created_at, id__lt=pk)
+        )
+
+    # Fetch one extra row to know whether there is another page
+    return queryset[:page_size + 1]
+
+
+def _page(listings, page_size):
+    next_cursor = None
+    if len(listings) > page_size:
+        listings = listings[:page_size]
+        next_cursor = encode_cursor(listings[-1])
+    return listings, next_cursor
+
+
+def next_page_url(request, next_cursor):
+    """Current URL with all active filters kept and the cursor swapped."""
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = next_cursor
+    return f"{request.path}?{params.urlencode()}"
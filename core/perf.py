@@ -0,0 +1,304 @@
+"""
+Per-request performance recording.
+
+PerfMiddleware measures, for every request:
+  db     SQL time and query count (connection.execute_wrapper on every alias)
+  tpl    template render time (the TimedDjangoTemplates backend)
+  view   time from the view being called until the response came back
+  total  time spent in Django below the middleware
+and the response size. With PERF_SERVER_TIMING on (it follows DEBUG) they
+are sent back as a Server-Timing header, so they show up in the browser's
+network panel; production clients don't get to see query counts and timings.
+
+Requests slower than PERF_SLOW_REQUEST_MS are appended, with their slowest
+queries, to PERF_LOG_FILE (JSON lines, rotated at PERF_LOG_MAX_BYTES). A
+PERF_LOG_SAMPLE_RATE share of the other requests is logged as well, without
+queries and weighted by 1 / rate, so the percentiles `manage.py perf_report`
+computes describe all traffic rather than just the slow tail.
+"""
+import contextvars
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_SAMPLE_RATE = 0.05
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+WORST_QUERIES = 5
+MAX_SQL_LENGTH = 500
+REPORT_PERCENTILES = (50, 95, 99)
+
+_current = contextvars.ContextVar('roomlink_perf_recorder', default=None)
+
+
+class Recorder:
+    """Collects one request's timings; also the execute_wrapper for its queries."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.view_started = None
+        self._worst = []  # min-heap of (ms, seq, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.query_count += 1
+            self.query_ms += ms
+            item = (ms, self.query_count, sql[:MAX_SQL_LENGTH])
+            if len(self._worst) < WORST_QUERIES:
+                heapq.heappush(self._worst, item)
+            else:
+                heapq.heappushpop(self._worst, item)
+
+    def worst_queries(self):
+        return [{'ms': round(ms, 2), 'sql': sql} for ms, _, sql in sorted(self._worst, reverse=True)]
+
+
+# --- Template timing ---
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        recorder = _current.get()
+        # Only the outermost render is timed; includes and nested
+        # render_to_string calls are part of it already
+        if recorder is None or recorder.template_depth:
+            return super().render(context, request)
+        recorder.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_depth -= 1
+            recorder.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to PerfMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# --- Middleware ---
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+def server_timing(recorder, total_ms, view_ms, size):
+    metrics = [
+        f'db;dur={recorder.query_ms:.1f};desc="{recorder.query_count} queries"',
+        f'tpl;dur={recorder.template_ms:.1f}',
+    ]
+    if view_ms is not None:
+        metrics.append(f'view;dur={view_ms:.1f}')
+    metrics.append(f'total;dur={total_ms:.1f}')
+    if size is not None:
+        metrics.append(f'size;desc="{size} bytes"')
+    return ', '.join(metrics)
+
+
+@contextmanager
+def recording():
+    """Makes a Recorder current for the block."""
+    recorder = Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+def wrap_queries(recorder):
+    """
+    Wraps every connection of the calling thread with `recorder`. Returns the
+    ExitStack that removes the wrappers again.
+    """
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+    return stack
+
+
+class PerfMiddleware:
+    """Goes first in MIDDLEWARE, so `total` covers the whole stack. Runs under WSGI and ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Saves a thread hop per request: the handler adapts a sync
+            # process_view with sync_to_async
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with recording() as recorder, wrap_queries(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with recording() as recorder:
+            # Connections are per thread, and the async ORM runs a request's
+            # queries in its sync thread, so that's where the wrappers go
+            stack = await sync_to_async(wrap_queries)(recorder)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, start)
+
+    def finish(self, request, response, recorder, start):
+        end = time.perf_counter()
+        total_ms = (end - start) * 1000
+        view_ms = (end - recorder.view_started) * 1000 if recorder.view_started else None
+        size = response_size(response)
+        if getattr(settings, 'PERF_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = server_timing(recorder, total_ms, view_ms, size)
+        log_request(request, response, recorder, total_ms, view_ms, size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mark_view_started()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        mark_view_started()
+
+
+def mark_view_started():
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.view_started = time.perf_counter()
+
+
+# --- Log ---
+
+def log_file():
+    return getattr(settings, 'PERF_LOG_FILE', None)
+
+
+@lru_cache(maxsize=4)
+def _log_handler(path, max_bytes):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+def write_entry(entry):
+    path = log_file()
+    if not path:
+        return
+    handler = _log_handler(str(path), getattr(settings, 'PERF_LOG_MAX_BYTES', DEFAULT_LOG_MAX_BYTES))
+    message = json.dumps(entry, separators=(',', ':'))
+    handler.handle(logging.makeLogRecord({'msg': message, 'levelno': logging.INFO, 'levelname': 'INFO'}))
+
+
+def log_request(request, response, recorder, total_ms, view_ms, size):
+    slow = total_ms >= getattr(settings, 'PERF_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+    rate = getattr(settings, 'PERF_LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    if not slow and not (rate > 0 and random.random() < rate):
+        return
+    match = request.resolver_match
+    entry = {
+        'ts': timezone.now().isoformat(timespec='seconds'),
+        'method': request.method,
+        'path': request.path,
+        'url_name': match.view_name if match else None,
+        'status': response.status_code,
+        'total_ms': round(total_ms, 2),
+        'view_ms': round(view_ms, 2) if view_ms is not None else None,
+        'db_ms': round(recorder.query_ms, 2),
+        'queries': recorder.query_count,
+        'template_ms': round(recorder.template_ms, 2),
+        'bytes': size,
+        'slow': slow,
+        'weight': 1 if slow else round(1 / rate, 3),
+    }
+    if slow:
+        entry['worst_queries'] = recorder.worst_queries()
+    write_entry(entry)
+
+
+# --- Report ---
+
+def read_entries(path):
+    """Entries from the log and its rotated files, oldest file first."""
+    paths = [f'{path}.{index}' for index in range(LOG_BACKUP_COUNT, 0, -1)] + [str(path)]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def weighted_percentile(samples, percentile):
+    """`samples` is [(value, weight)]; nearest-rank percentile."""
+    samples = sorted(samples)
+    target = sum(weight for _, weight in samples) * percentile / 100
+    cumulative = 0
+    for value, weight in samples:
+        cumulative += weight
+        if cumulative >= target:
+            return value
+    return samples[-1][0] if samples else None
+
+
+def summarize(entries):
+    """
+    [{'url_name', 'requests', 'slow', 'p50', 'p95', 'p99', 'queries'}] per
+    URL name, slowest p95 first. `requests` is the weighted estimate.
+    """
+    groups = {}
+    for entry in entries:
+        groups.setdefault(entry.get('url_name') or '(unresolved)', []).append(entry)
+    rows = []
+    for url_name, group in groups.items():
+        timings = [(entry['total_ms'], entry.get('weight', 1)) for entry in group]
+        weight = sum(weight for _, weight in timings)
+        row = {
+            'url_name': url_name,
+            'requests': round(weight),
+            'slow': sum(1 for entry in group if entry.get('slow')),
+            'queries': round(sum(entry['queries'] * entry.get('weight', 1) for entry in group) / weight, 1),
+        }
+        for percentile in REPORT_PERCENTILES:
+            row[f'p{percentile}'] = weighted_percentile(timings, percentile)
+        rows.append(row)
+    rows.sort(key=lambda row: row['p95'], reverse=True)
+    return rows
@@ -0,0 +1,187 @@
+"""
+Materialized rent statistics for the budget filters.
+
+One RentSummary row per (listing_type, area) holds the listing count, the
+rent total (for the mean), a histogram over the fixed RENT_BUCKETS and the
+percentiles derived from it. Rows are updated incrementally: saving or
+deleting a listing (core.signals) applies a -1 for its old rent bucket and a
++1 for the new one, so reading the distribution is a single lookup on the
+rent_summary_key unique index.
+
+`area` is the gazetteer place the listing's location names (core.geo), or ''
+for the summary over every listing of the type. Percentiles are
+interpolated within buckets, which is precise enough for a budget hint.
+`manage.py rebuild_rent_stats` recomputes everything from scratch.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import geo
+from .models import Listing, RentSummary
+
+# Lower edge of each bucket in naira; the last bucket is open-ended
+RENT_BUCKETS = [
+    0, 25000, 50000, 75000, 100000, 150000, 200000, 250000, 300000,
+    400000, 500000, 750000, 1000000, 1500000, 2000000,
+]
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def bucket_index(rent):
+    return max(bisect_right(RENT_BUCKETS, rent) - 1, 0)
+
+
+def summary_keys(listing_type, location):
+    keys = [(listing_type, '')]
+    place = geo.geocode(location)
+    if place is not None:
+        keys.append((listing_type, place.slug))
+    return keys
+
+
+def summarize(rows):
+    """
+    Builds {(listing_type, area): (count, total, histogram)} from
+    (listing_type, location, rent, sign) rows; sign is +1 or -1.
+    """
+    deltas = {}
+    for listing_type, location, rent, sign in rows:
+        if rent is None or not listing_type:
+            continue
+        rent = Decimal(str(rent))
+        for key in summary_keys(listing_type, location):
+            count, total, histogram = deltas.get(key, (0, Decimal(0), [0] * len(RENT_BUCKETS)))
+            histogram[bucket_index(rent)] += sign
+            deltas[key] = (count + sign, total + sign * rent, histogram)
+    return deltas
+
+
+def percentiles_from(histogram):
+    count = sum(histogram)
+    result = {}
+    if count <= 0:
+        return result
+    for percentile in PERCENTILES:
+        target = count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(histogram):
+            if bucket_count > 0 and cumulative + bucket_count >= target:
+                low = RENT_BUCKETS[index]
+                high = RENT_BUCKETS[index + 1] if index + 1 < len(RENT_BUCKETS) else low
+                fraction = (target - cumulative) / bucket_count
+                result[str(percentile)] = round(low + (high - low) * fraction)
+                break
+            cumulative += bucket_count
+    return result
+
+
+def apply_changes(rows):
+    """Applies (listing_type, location, rent, sign) rows to the summary table."""
+    deltas = summarize(rows)
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or any(delta[2])}
+    if not deltas:
+        return
+    condition = Q()
+    for listing_type, area in deltas:
+        condition |= Q(listing_type=listing_type, area=area)
+    with transaction.atomic():
+        existing = {
+            (summary.listing_type, summary.area): summary
+            for summary in RentSummary.objects.select_for_update().filter(condition)
+        }
+        new = []
+        for (listing_type, area), (count, total, histogram) in deltas.items():
+            summary = existing.get((listing_type, area))
+            if summary is None:
+                summary = RentSummary(listing_type=listing_type, area=area)
+                new.append(summary)
+            stored = list(summary.histogram) + [0] * (len(RENT_BUCKETS) - len(summary.histogram))
+            summary.histogram = [max(a + b, 0) for a, b in zip(stored, histogram)]
+            summary.count = max(summary.count + count, 0)
+            summary.total = max(summary.total + total, Decimal(0))
+            summary.percentiles = percentiles_from(summary.histogram)
+            if summary.pk:
+                summary.save(update_fields=['histogram', 'count', 'total', 'percentiles', 'updated_at'])
+        RentSummary.objects.bulk_create(new)
+
+
+def _loaded_row(listing):
+    loaded = getattr(listing, '_loaded_values', None)
+    if loaded is None:
+        return None
+    return loaded['listing_type'], loaded['location'], loaded['rent']
+
+
+def listing_saved(listing, created):
+    new = (listing.listing_type, listing.location, listing.rent)
+    rows = [(*new, 1)]
+    if not created:
+        old = _loaded_row(listing)
+        if old is None:
+            # Previous values unknown; rebuild_rent_stats corrects any drift
+            return
+        if old[:2] == new[:2] and Decimal(str(old[2])) == Decimal(str(new[2])):
+            return
+        rows.append((*old, -1))
+    apply_changes(rows)
+
+
+def listing_deleted(listing):
+    old = _loaded_row(listing) or (listing.listing_type, listing.location, listing.rent)
+    apply_changes([(*old, -1)])
+
+
+def rebuild():
+    """Recomputes every summary from the listings table. Returns the row count."""
+    rows = Listing.objects.values_list('listing_type', 'location', 'rent').iterator()
+    summaries = []
+    for (listing_type, area), (count, total, histogram) in summarize(row + (1,) for row in rows).items():
+        summaries.append(RentSummary(
+            listing_type=listing_type, area=area, count=count, total=total,
+            histogram=histogram, percentiles=percentiles_from(histogram),
+        ))
+    with transaction.atomic():
+        RentSummary.objects.all().delete()
+        RentSummary.objects.bulk_create(summaries)
+    return len(summaries)
+
+
+# --- Reading ---
+
+def get_summary(listing_type, area=''):
+    return RentSummary.objects.filter(listing_type=listing_type, area=area or '').first()
+
+
+async def aget_summary(listing_type, area=''):
+    return await RentSummary.objects.filter(listing_type=listing_type, area=area or '').afirst()
+
+
+def as_dict(summary):
+    """Template / JSON friendly form of a RentSummary (None stays None)."""
+    if summary is None:
+        return None
+    histogram = list(summary.histogram) + [0] * (len(RENT_BUCKETS) - len(summary.histogram))
+    tallest = max(histogram) or 1
+    buckets = []
+    for index, count in enumerate(histogram):
+        buckets.append({
+            'min': RENT_BUCKETS[index],
+            'max': RENT_BUCKETS[index + 1] if index + 1 < len(RENT_BUCKETS) else None,
+            'count': count,
+            'share': round(count * 100 / tallest),
+        })
+    percentiles = summary.percentiles
+    return {
+        'listing_type': summary.listing_type,
+        'area': summary.area,
+        'count': summary.count,
+        'mean': round(summary.total / summary.count) if summary.count else None,
+        'percentiles': {int(key): value for key, value in percentiles.items()},
+        'p25': percentiles.get('25'),
+        'p50': percentiles.get('50'),
+        'p75': percentiles.get('75'),
+        'buckets': buckets,
+    }
@@ -0,0 +1,58 @@
+"""
+Replication-lag simulator, for trying the read replica locally with two
+SQLite files.
+
+Every tick takes an in-memory snapshot of the primary with SQLite's online
+backup API and publishes the newest snapshot that is at least `lag` seconds
+old into the replica file. The replica therefore shows the primary as it
+was `lag` seconds ago, which is what a real asynchronous replica looks like
+to the application (and what core.routers' primary pinning must cope with).
+"""
+import sqlite3
+import time
+from collections import deque
+from contextlib import closing
+
+
+class LaggedReplica:
+    def __init__(self, primary_path, replica_path, lag=2.0, clock=time.monotonic):
+        self.primary_path = str(primary_path)
+        self.replica_path = str(replica_path)
+        self.lag = lag
+        self.clock = clock
+        self._snapshots = deque()
+
+    def snapshot(self):
+        snapshot = sqlite3.connect(':memory:')
+        with closing(sqlite3.connect(f'file:{self.primary_path}?mode=ro', uri=True)) as primary:
+            primary.backup(snapshot)
+        self._snapshots.append((self.clock(), snapshot))
+
+    def publish(self):
+        """Copies the newest snapshot that is old enough. Returns True if one was."""
+        now = self.clock()
+        due = None
+        while self._snapshots and now - self._snapshots[0][0] >= self.lag:
+            if due is not None:
+                due.close()
+            due = self._snapshots.popleft()[1]
+        if due is None:
+            return False
+        with closing(due), closing(sqlite3.connect(self.replica_path, timeout=30)) as replica:
+            due.backup(replica)
+        return True
+
+    def tick(self):
+        self.snapshot()
+        return self.publish()
+
+    def run(self, interval=0.5):
+        """Ticks until interrupted; returns the number of snapshots published."""
+        published = 0
+        while True:
+            published += self.tick()
+            time.sleep(interval)
+
+    def close(self):
+        while self._snapshots:
+            self._snapshots.popleft()[1].close()
@@ -0,0 +1,128 @@
+"""
+Primary/replica routing for web requests.
+
+Listing and user reads made while serving a GET go to the `replica`
+database alias, so the feeds don't queue behind post_listing, session and
+view-count writes on the primary. Everything else stays on `default`:
+writes, reads inside transactions, models that are not in REPLICA_MODELS
+(sessions, jobs, uploads), and any code running outside a request
+(management commands, the job runner), which expects to read its own writes.
+
+A replica lags behind the primary, so reads are pinned to the primary
+  * for the rest of a request once it has written anything,
+  * for whole POST/PUT/PATCH/DELETE requests (form validation reads too),
+  * for REPLICA_PIN_SECONDS after a request that wrote, via a cookie, so the
+    redirect after "Post listing" shows the new listing.
+
+Without a `replica` entry in settings.DATABASES every read goes to
+`default`. Locally, `manage.py simulate_replica` keeps a second SQLite file
+in sync with a configurable lag (see core.replication).
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+REPLICA_MODELS = {
+    'core.user', 'core.listing', 'core.listingimage', 'core.listingvideo',
+    'core.interesttag', 'core.listing_tags', 'core.rentsummary',
+}
+PIN_COOKIE = 'roomlink_primary'
+DEFAULT_PIN_SECONDS = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_request_state = contextvars.ContextVar('roomlink_db_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def pin_to_primary():
+    """Sends the rest of the current request's reads to the primary."""
+    state = _request_state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned or not replica_configured():
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema and rows from the primary
+        return db != REPLICA_ALIAS
+
+
+class PrimaryPinMiddleware:
+    """
+    Opens the routing state for each request and sets the pin cookie after
+    requests that wrote. Goes before SessionMiddleware, so the session's
+    user lookup is routed too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = self.open_state(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state, token = self.open_state(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    def open_state(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        state = RequestState(pinned=pinned)
+        return state, _request_state.set(state)
+
+    def pin(self, state, response):
+        if state.wrote and replica_configured():
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,216 @@
+"""
+Full-text search for listings backed by an SQLite FTS5 index.
+
+The index lives in the `core_listing_fts` virtual table (created in migration
+0010) with one row per Listing, keyed by rowid = listing id. It is kept in
+sync by the signal handlers in core.signals and can be rebuilt from scratch
+with `manage.py rebuild_search_index`.
+
+On databases without FTS5 the views fall back to the old icontains filters.
+"""
+import base64
+import binascii
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+
+from .pagination import FEED_PAGE_SIZE
+
+FTS_TABLE = 'core_listing_fts'
+FTS_COLUMNS = ('title', 'location', 'description', 'interests', 'poster_name')
+
+# bm25() weights, in FTS_COLUMNS order. A hit in the title or location says
+# much more about a listing than a hit somewhere in a long description.
+FTS_WEIGHTS = (10.0, 6.0, 1.0, 4.0, 2.0)
+
+# bm25() scores are negative (lower is better), so multiplying a verified
+# listing's score by this factor moves it up the results.
+VERIFIED_BOOST = 1.5
+
+# Upper bound on the number of matches we rank for a single query.
+SEARCH_RESULT_LIMIT = 1000
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(q, columns=None):
+    """
+    Turns free text from the search box into a safe FTS5 MATCH expression:
+    every word must match (as a prefix, so "self" finds "self-contain"),
+    optionally restricted to some columns. Returns None if q has no words.
+    """
+    tokens = TOKEN_RE.findall(q.lower())
+    if not tokens:
+        return None
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+def ranked_ids(q, columns=None, limit=SEARCH_RESULT_LIMIT):
+    """Listing ids matching q, best match first."""
+    match = build_match_query(q, columns)
+    if match is None:
+        return []
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    sql = (
+        f"SELECT f.rowid FROM {FTS_TABLE} f "
+        f"JOIN core_listing l ON l.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}) "
+        f"* CASE WHEN l.is_verified_listing THEN %s ELSE 1.0 END, f.rowid DESC "
+        f"LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, VERIFIED_BOOST, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fallback_filter(queryset, q, columns):
+    """The pre-FTS behaviour: OR of icontains over the searched fields."""
+    lookups = {
+        'title': 'title__icontains',
+        'location': 'location__icontains',
+        'description': 'description__icontains',
+        'interests': 'interests__icontains',
+        'poster_name': 'posted_by__full_name__icontains',
+    }
+    condition = Q()
+    for column in columns or FTS_COLUMNS:
+        condition |= Q(**{lookups[column]: q})
+    return queryset.filter(condition)
+
+
+def _encode_position(listing_id):
+    return base64.urlsafe_b64encode(f"s|{listing_id}".encode()).decode().rstrip('=')
+
+
+def _decode_position(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return int(pk) if kind == 's' else None
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def search_feed(queryset, q, columns=None, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    Ranked, cursor-paginated search over an already filtered queryset.
+
+    Returns (listings, next_cursor) like core.pagination.paginate_feed. The
+    ranking comes from the FTS index; the queryset only contributes the other
+    filters (type, budget, gender) via a cheap id-only query.
+    """
+    ranking = ranked_ids(q, columns)
+    if not ranking:
+        return [], None
+    allowed = set(queryset.filter(id__in=ranking).values_list('id', flat=True))
+    ordered, page_ids = _page_ids(ranking, allowed, cursor, page_size)
+    # Works for model instances and values() dicts alike
+    rows = {_row_id(row): row for row in queryset.filter(id__in=page_ids)}
+    return _page(rows, ordered, page_ids, page_size)
+
+
+async def asearch_feed(queryset, q, columns=None, cursor=None, page_size=FEED_PAGE_SIZE):
+    """search_feed for async views."""
+    # The MATCH query is raw SQL, which has no async API
+    ranking = await sync_to_async(ranked_ids)(q, columns)
+    if not ranking:
+        return [], None
+    allowed = {pk async for pk in queryset.filter(id__in=ranking).values_list('id', flat=True)}
+    ordered, page_ids = _page_ids(ranking, allowed, cursor, page_size)
+    rows = {_row_id(row): row async for row in queryset.filter(id__in=page_ids)}
+    return _page(rows, ordered, page_ids, page_size)
+
+
+def _page_ids(ranking, allowed, cursor, page_size):
+    ordered = [pk for pk in ranking if pk in allowed]
+    last_id = _decode_position(cursor)
+    if last_id in allowed:
+        ordered = ordered[ordered.index(last_id) + 1:]
+    return ordered, ordered[:page_size]
+
+
+def _page(rows, ordered, page_ids, page_size):
+    listings = [rows[pk] for pk in page_ids if pk in rows]
+    next_cursor = None
+    if len(ordered) > page_size and listings:
+        next_cursor = _encode_position(_row_id(listings[-1]))
+    return listings, next_cursor
+
+
+def _row_id(row):
+    return row['id'] if isinstance(row, dict) else row.id
+
+
+# --- Index maintenance ---
+
+def index_listing(listing):
+    index_listings([listing])
+
+
+def index_listings(listings):
+    """Adds or replaces index rows for several listings in two statements."""
+    if not search_available() or not listings:
+        return
+    rows = [
+        [
+            listing.id,
+            listing.title or '',
+            listing.location or '',
+            listing.description or '',
+            (listing.interests or '').replace(',', ' '),
+            listing.posted_by.full_name or '',
+        ]
+        for listing in listings
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[row[0]] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def unindex_listing(listing_id):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing_id])
+
+
+def reindex_poster(user):
+    """Refresh poster_name for all of a user's listings after a name change."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET poster_name = %s "
+            f"WHERE rowid IN (SELECT id FROM core_listing WHERE posted_by_id = %s)",
+            [user.full_name or '', user.id],
+        )
+
+
+def rebuild_index():
+    """Drops every row from the index and repopulates it in one statement."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT l.id, l.title, l.location, l.description, "
+            f"REPLACE(COALESCE(l.interests, ''), ',', ' '), u.full_name "
+            f"FROM core_listing l JOIN core_user u ON u.id = l.posted_by_id"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,232 @@
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, fragment_cache, geo, jobs, page_cache, rent_stats, search, tags, thumbnails
+from .matching import roommate_index
+from .models import Listing, ListingImage, ListingVideo, User
+from .view_counter import view_counter
+
+
+# --- Geocoding ---
+
+@receiver(pre_save, sender=Listing)
+def geocode_listing(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None:
+        geo.geocode_listing(instance)
+
+
+# --- Search index sync ---
+
+SEARCHABLE_LISTING_FIELDS = {'title', 'location', 'description', 'interests', 'posted_by'}
+
+
+@receiver(post_save, sender=Listing)
+def index_listing_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHABLE_LISTING_FIELDS & set(update_fields):
+        return
+    search.index_listing(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def unindex_listing_on_delete(sender, instance, **kwargs):
+    search.unindex_listing(instance.id)
+
+
+@receiver(post_save, sender=User)
+def reindex_poster_on_save(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only; skip anything that can't change the name
+    if created or (update_fields is not None and 'full_name' not in update_fields):
+        return
+    search.reindex_poster(instance)
+
+
+
+# --- Interest tags and facet counts ---
+
+# Facets count the interests of roommate listings, optionally per gender preference
+FACET_FIELDS = ('interests', 'listing_type', 'gender_preference')
+
+
+@receiver(post_save, sender=Listing)
+def sync_interest_tags(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        if instance.interests:
+            tags.sync_listing_tags([instance], created=True)
+        tags.invalidate_facets()
+        return
+    if update_fields is not None and not set(FACET_FIELDS) & set(update_fields):
+        return
+    if instance.changed_since_loaded('interests'):
+        tags.sync_listing_tags([instance])
+    if instance.changed_since_loaded(*FACET_FIELDS):
+        tags.invalidate_facets()
+
+
+@receiver(post_delete, sender=Listing)
+def invalidate_interest_facets(sender, instance, **kwargs):
+    tags.invalidate_facets()
+
+
+# --- Rent statistics ---
+
+RENT_STATS_FIELDS = {'listing_type', 'location', 'rent'}
+
+
+@receiver(post_save, sender=Listing)
+def update_rent_stats(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not RENT_STATS_FIELDS & set(update_fields):
+        return
+    rent_stats.listing_saved(instance, created)
+
+
+@receiver(post_delete, sender=Listing)
+def remove_from_rent_stats(sender, instance, **kwargs):
+    rent_stats.listing_deleted(instance)
+
+
+# --- Denormalized counters ---
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_save, sender=ListingVideo)
+def count_added_media(sender, instance, created, **kwargs):
+    if created:
+        counters.media_added(instance)
+
+
+@receiver(post_delete, sender=ListingImage)
+@receiver(post_delete, sender=ListingVideo)
+def count_deleted_media(sender, instance, **kwargs):
+    counters.media_deleted(instance)
+
+
+@receiver(post_save, sender=Listing)
+def count_saved_listing(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'posted_by' in update_fields:
+        counters.listing_saved(instance, created)
+
+
+@receiver(post_delete, sender=Listing)
+def count_deleted_listing(sender, instance, **kwargs):
+    counters.listing_deleted(instance)
+
+
+# --- Listing card fragment cache ---
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def invalidate_listing_card(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'views_count'}:
+        return
+    fragment_cache.invalidate_listings([instance.id])
+
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_delete, sender=ListingImage)
+@receiver(post_save, sender=ListingVideo)
+@receiver(post_delete, sender=ListingVideo)
+def invalidate_media_card(sender, instance, **kwargs):
+    fragment_cache.invalidate_listings([instance.listing_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_poster_cards(sender, instance, created, update_fields=None, **kwargs):
+    # Cards show the poster's name, picture and verification status
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    fragment_cache.invalidate_posters([instance.id])
+
+
+# --- Anonymous page cache ---
+# Any change that shows on a feed card makes every cached feed page stale.
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def bump_page_generation(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'views_count'}:
+        return
+    page_cache.bump_generation()
+
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_delete, sender=ListingImage)
+@receiver(post_save, sender=ListingVideo)
+@receiver(post_delete, sender=ListingVideo)
+def bump_page_generation_for_media(sender, instance, **kwargs):
+    page_cache.bump_generation()
+
+
+@receiver(post_save, sender=User)
+def bump_page_generation_for_poster(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    page_cache.bump_generation()
+
+
+# --- Image derivatives ---
+# Resizing is slow, so it runs in the job queue (manage.py run_jobs).
+
+def queue_thumbnails(instance, field):
+    if getattr(instance, field):
+        # One pending job per file is enough; it reads the current file when it runs
+        jobs.enqueue_once('generate_thumbnails', model=instance._meta.model_name, pk=instance.pk, field=field)
+
+
+@receiver(post_save, sender=Listing)
+def listing_thumbnails(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None:
+        changed = 'image' in update_fields
+    else:
+        changed = created or instance.changed_since_loaded('image')
+    if changed:
+        queue_thumbnails(instance, 'image')
+
+
+@receiver(post_save, sender=ListingImage)
+def gallery_thumbnails(sender, instance, created, **kwargs):
+    if created:
+        queue_thumbnails(instance, 'image')
+
+
+@receiver(post_save, sender=User)
+def profile_picture_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    if thumbnails.needs_derivatives(instance.profile_picture):
+        queue_thumbnails(instance, 'profile_picture')
+
+
+# --- Roommate compatibility matrix ---
+
+MATCHING_LISTING_FIELDS = {'listing_type', 'interests', 'gender_preference', 'level_preference', 'rent', 'posted_by'}
+
+
+@receiver(post_save, sender=Listing)
+def update_compatibility_row(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not MATCHING_LISTING_FIELDS & set(update_fields):
+        return
+    # After commit, so a rolled-back save never reaches the in-memory matrix
+    transaction.on_commit(lambda: roommate_index.listing_changed(instance))
+
+
+@receiver(post_delete, sender=Listing)
+def drop_compatibility_row(sender, instance, **kwargs):
+    listing_id = instance.id
+    transaction.on_commit(lambda: roommate_index.listing_deleted(listing_id))
+
+
+# --- Write-behind view counts ---
+
+@receiver(request_finished)
+def flush_view_counts(sender, **kwargs):
+    # Runs after the response has been sent, at most once per flush interval
+    view_counter.flush_if_due()
+
+
+# --- Loaded-value tracking ---
+# Connected last, so the receivers above still see the values from before the save.
+
+@receiver(post_save, sender=Listing)
+def remember_loaded_values(sender, instance, **kwargs):
+    instance.remember_loaded_values()
@@ -0,0 +1,126 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their bytes instead of the uploaded
+filename, so the same photo uploaded twice (or saved as both the listing
+thumbnail and a gallery image, as post_listing does) is written to disk once
+and shared by every field that references it:
+
+    listing_images/gallery/house2.jpg -> listing_images/3f/3f9a...c1.jpg
+
+Only the top-level upload folder is kept. It decides what is public (see
+core.media), so verification documents never share files with listing photos.
+Names under PASSTHROUGH_PREFIXES (derived thumbnails, whose names already
+follow the content-addressed original) are stored as given.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from . import assets
+
+HASH_BLOCK_SIZE = 64 * 1024
+CONTENT_NAME_RE = re.compile(r'^(?:[^/]+/)?[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]+)?$')
+
+
+def hash_file(f):
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    PASSTHROUGH_PREFIXES = ('thumbs/',)
+
+    def content_name(self, name, digest):
+        folder = name.split('/', 1)[0] if '/' in name else ''
+        ext = posixpath.splitext(name)[1].lower()
+        hashed = f'{digest[:2]}/{digest}{ext}'
+        return f'{folder}/{hashed}' if folder else hashed
+
+    def is_content_addressed(self, name):
+        return bool(CONTENT_NAME_RE.match(name))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = name.replace('\\', '/')
+        if name.startswith(self.PASSTHROUGH_PREFIXES):
+            return super().save(name, content, max_length=max_length)
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        if hasattr(content, 'chunks'):
+            digest = hashlib.sha256()
+            for chunk in content.chunks():
+                digest.update(chunk)
+            digest = digest.hexdigest()
+        else:
+            digest = hash_file(content)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        name = self.content_name(name, digest)
+        if self.exists(name):
+            # Same bytes are already stored; just point at them
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def import_file(self, name, path):
+        """
+        Moves a file already on local disk (e.g. a finished chunked upload)
+        into the store without reading it into memory. Returns its name.
+        """
+        with open(path, 'rb') as f:
+            name = self.content_name(name, hash_file(f))
+        target = self.path(name)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        return name
+
+
+class MinifiedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that minifies the project's CSS/JS and writes
+    precompressed variants of the collected files (see core.assets).
+    """
+
+    def file_hash(self, name, content=None):
+        # Hash what is actually served, so a minifier change renames the file too
+        if content is not None and name and assets.should_minify(name):
+            content.seek(0)
+            return hashlib.md5(assets.minify(name, content.read())).hexdigest()[:12]
+        return super().file_hash(name, content)
+
+    def _save(self, name, content):
+        if assets.should_minify(name):
+            content.seek(0)
+            content = ContentFile(assets.minify(name, content.read()))
+        return super()._save(name, content)
+
+    def stored_name(self, name):
+        # Not collected yet (tests, a fresh checkout): plain names, like StaticFilesStorage
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for original, processed, was_processed in super().post_process(paths, dry_run, **options):
+            if isinstance(processed, str):
+                hashed.add(processed)
+            yield original, processed, was_processed
+        if dry_run:
+            return
+        for name in sorted(hashed | set(paths)):
+            if assets.is_compressible(name) and self.exists(name):
+                assets.write_variants(self.path(name))
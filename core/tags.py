@@ -0,0 +1,130 @@
+"""
+Interest tags: the normalized form of Listing.interests.
+
+Listing.interests stays the comma-joined string the forms write and the
+cards display. Every save copies it into Listing.tags (see core.signals), so
+roommates() can filter on exact tags through the indexed join table instead
+of interests__icontains, which also matched "Pets" inside "No Pets".
+
+Facet counts (listings per tag) are one GROUP BY query, cached until a
+listing changes.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef
+from django.utils.text import slugify
+
+from .models import InterestTag, Listing
+
+FACET_CACHE_TIMEOUT = 60 * 60
+FACET_GENDERS = ['', 'male', 'female']
+
+
+def split_interests(value):
+    """Unique, stripped interest names from a comma-joined string, in order."""
+    names = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())
+        if name and slugify(name):
+            names.setdefault(slugify(name), name)
+    return names
+
+
+def get_or_create_tags(names_by_slug):
+    """Returns {slug: InterestTag} for the given slugs, creating missing ones."""
+    tags = {tag.slug: tag for tag in InterestTag.objects.filter(slug__in=names_by_slug)}
+    missing = [
+        InterestTag(name=name, slug=slug)
+        for slug, name in names_by_slug.items() if slug not in tags
+    ]
+    if missing:
+        InterestTag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags = {tag.slug: tag for tag in InterestTag.objects.filter(slug__in=names_by_slug)}
+    return tags
+
+
+def sync_listing_tags(listings, created=False):
+    """
+    Rewrites the tag links of several listings from their `interests`
+    strings in a handful of queries. Pass created=True for new listings,
+    which have no links to delete yet.
+    """
+    wanted = {listing.id: split_interests(listing.interests) for listing in listings}
+    all_names = {}
+    for names in wanted.values():
+        all_names.update(names)
+    tags = get_or_create_tags(all_names) if all_names else {}
+
+    through = Listing.tags.through
+    if not created:
+        through.objects.filter(listing_id__in=list(wanted)).delete()
+    through.objects.bulk_create([
+        through(listing_id=listing_id, interesttag_id=tags[slug].id)
+        for listing_id, names in wanted.items() for slug in names
+    ])
+
+
+# --- Filtering ---
+
+def filter_by_tags(queryset, slugs, match='all'):
+    """
+    Exact tag filter. match='all' keeps listings that have every tag,
+    match='any' listings with at least one. Both are EXISTS subqueries on
+    the join table, so the feed keeps one row per listing and its ordering.
+    """
+    slugs = [slug for slug in dict.fromkeys(slugs) if slug]
+    if not slugs:
+        return queryset
+    through = Listing.tags.through
+    if match == 'any':
+        return queryset.filter(Exists(through.objects.filter(
+            listing_id=OuterRef('pk'), interesttag__slug__in=slugs,
+        )))
+    for slug in slugs:
+        queryset = queryset.filter(Exists(through.objects.filter(
+            listing_id=OuterRef('pk'), interesttag__slug=slug,
+        )))
+    return queryset
+
+
+# --- Facet counts ---
+
+def _facet_key(gender):
+    return f'interest_facets:roommate:{gender or "all"}'
+
+
+def facet_counts(gender=''):
+    """
+    [{'slug', 'name', 'count'}] for every tag used by a roommate listing
+    (optionally only those with the given gender preference).
+    """
+    gender = gender if gender in FACET_GENDERS else ''
+    key = _facet_key(gender)
+    facets = cache.get(key)
+    if facets is None:
+        facets = list(_facet_query(gender))
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+async def afacet_counts(gender=''):
+    """facet_counts for async views."""
+    gender = gender if gender in FACET_GENDERS else ''
+    key = _facet_key(gender)
+    facets = await cache.aget(key)
+    if facets is None:
+        facets = [facet async for facet in _facet_query(gender)]
+        await cache.aset(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def _facet_query(gender):
+    # One filter() call, so both conditions apply to the same joined listing
+    conditions = {'listings__listing_type': 'roommate'}
+    if gender:
+        conditions['listings__gender_preference'] = gender
+    tags = InterestTag.objects.filter(**conditions).annotate(count=Count('listings')).order_by('name')
+    return tags.values('slug', 'name', 'count')
+
+
+def invalidate_facets():
+    cache.delete_many([_facet_key(gender) for gender in FACET_GENDERS])
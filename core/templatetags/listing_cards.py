@@ -0,0 +1,78 @@
+from django import template
+
+from core import fragment_cache
+
+register = template.Library()
+
+# render_context key for the cards fetched by {% prefetch_cards %}
+PREFETCHED = 'listing_cards:prefetched'
+
+
+class PrefetchCardsNode(template.Node):
+    def __init__(self, listings, variant):
+        self.listings = listings
+        self.variant = variant
+
+    def render(self, context):
+        variant = self.variant.resolve(context)
+        keys = fragment_cache.card_keys(self.listings.resolve(context) or [], variant)
+        found = fragment_cache.get_cards(list(keys.values()))
+        prefetched = context.render_context.setdefault(PREFETCHED, {})
+        for listing_id, key in keys.items():
+            prefetched[variant, listing_id] = (key, found.get(key))
+        return ''
+
+
+class CardCacheNode(template.Node):
+    def __init__(self, nodelist, listing, variant):
+        self.nodelist = nodelist
+        self.listing = listing
+        self.variant = variant
+
+    def render(self, context):
+        listing = self.listing.resolve(context)
+        variant = self.variant.resolve(context)
+        prefetched = context.render_context.get(PREFETCHED, {}).get((variant, listing.id))
+        if prefetched is not None:
+            key, html = prefetched
+        else:
+            key = fragment_cache.card_key(listing, variant)
+            html = fragment_cache.get_card(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragment_cache.set_card(key, html)
+        return html
+
+
+@register.tag('prefetch_cards')
+def do_prefetch_cards(parser, token):
+    """
+    Looks up a whole page of cards at once, before the loop that renders them:
+
+        {% prefetch_cards houses "houses" %}
+        {% for house in houses %}{% cache_card house "houses" %}...{% endcache_card %}{% endfor %}
+
+    Cards it didn't cover still work, one lookup each.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes the listings and a variant name.")
+    return PrefetchCardsNode(parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
+
+
+@register.tag('cache_card')
+def do_cache_card(parser, token):
+    """
+    Caches the markup of one listing card:
+
+        {% cache_card house "houses" %} ...card markup... {% endcache_card %}
+
+    The second argument names the card variant, since each page renders its
+    cards a little differently. See core.fragment_cache for invalidation.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a listing and a variant name.")
+    nodelist = parser.parse(('endcache_card',))
+    parser.delete_first_token()
+    return CardCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
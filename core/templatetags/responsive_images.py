@@ -0,0 +1,49 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from core import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(image, sizes='100vw', **attrs):
+    """
+    Renders an ImageField as a <picture> with WebP and JPEG srcsets built from
+    the derivatives in core.thumbnails, so the browser downloads the smallest
+    file that fills the slot:
+
+        {% responsive_img house.image sizes="(max-width: 600px) 100vw, 400px" class="card-image" alt=house.title %}
+
+    Extra keyword arguments become attributes of the <img>; underscores turn
+    into dashes (data_index -> data-index). Images without recorded
+    derivatives yet fall back to a plain <img> of the original.
+    """
+    if not image:
+        return ''
+    attrs = {name.replace('_', '-'): value for name, value in attrs.items()}
+    attrs.setdefault('loading', 'lazy')
+    attr_html = format_html_join('', ' {}="{}"', attrs.items())
+
+    # What the thumbnail job recorded; no storage lookups while rendering
+    widths, webp = thumbnails.recorded_derivatives(image) or ([], False)
+    if not widths:
+        return format_html('<img src="{}"{}>', image.url, attr_html)
+
+    def srcset(ext):
+        return ', '.join(
+            f'{default_storage.url(thumbnails.derivative_name(image.name, width, ext))} {width}w'
+            for width in widths
+        )
+
+    # Middle size as the src for browsers that ignore srcset
+    fallback = default_storage.url(thumbnails.derivative_name(image.name, widths[len(widths) // 2], 'jpg'))
+    webp_source = ''
+    if webp:
+        webp_source = format_html('<source type="image/webp" srcset="{}" sizes="{}">', srcset('webp'), sizes)
+
+    return format_html(
+        '<picture style="display:contents">{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        webp_source, fallback, srcset('jpg'), sizes, attr_html,
+    )
@@ -1,3 +1,1674 @@
-from django.test import TestCase
+import base64
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from roomlink.handlers import AsyncViewsHandler
+
+from . import assets, async_views, benchmarks, counters, fragment_cache, geo, jobs, moderation, page_cache, pagination, perf, rent_stats, search, tags, thumbnails, uploads
+from .admin import CustomUserAdmin, ListingAdmin
+from .matching import roommate_index
+from .replication import LaggedReplica
+from .routers import PIN_COOKIE, PrimaryPinMiddleware, ReplicaRouter
+from .models import ChunkedUpload, InterestTag, Job, Listing, ListingImage, ListingVideo, RentSummary, User
+from .templatetags.responsive_images import responsive_img
+from .validators import MAX_VIDEO_SIZE
+from .view_counter import ViewCounter, view_counter
+
+# Keep anything the tests write (e.g. thumbnails) out of the real media folder
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+# ... and requests out of the performance log
+no_perf_log = override_settings(PERF_LOG_FILE=None)
+
+
+def setUpModule():
+    no_perf_log.enable()
+
+
+def tearDownModule():
+    no_perf_log.disable()
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    """
+    Every public view must render in a fixed number of queries, no matter how
+    many listings are on the page. Each test renders the page with a small and
+    a large dataset and asserts the same budget for both.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            email='owner@example.com',
+            full_name='Ada Owner', phone_number='08012345678',
+        )
+        self.poster_count = 0
+
+    def make_listings(self, count, listing_type='house'):
+        for i in range(count):
+            self.poster_count += 1
+            poster = User.objects.create_user(
+                email=f'poster{self.poster_count}@example.com',
+                full_name=f'Poster {self.poster_count}', phone_number='08012345678',
+                is_verified_student=i % 2 == 0,
+                profile_picture=f'profile_pics/p{self.poster_count}.jpg' if i % 3 == 0 else None,
+            )
+            for owner in (poster, self.owner):
+                listing = Listing.objects.create(
+                    title=f'{listing_type} {i}', description='Close to campus', rent=100000 + i,
+                    location='Akoka', listing_type=listing_type, posted_by=owner,
+                    is_verified_listing=i % 3 == 0, interests='Studious,Gamer',
+                    image=f'listing_images/{listing_type}{i}.jpg',
+                )
+                ListingImage.objects.create(listing=listing, image=f'listing_images/gallery/{listing_type}{i}.jpg')
+                if i % 2 == 0:
+                    ListingVideo.objects.create(listing=listing, video=f'listing_videos/{listing_type}{i}.mp4')
+
+    def assertBudget(self, budget, url, login=False):
+        if login:
+            self.client.force_login(self.owner)
+        for count in (2, 12):
+            self.make_listings(count, 'house')
+            self.make_listings(count, 'roommate')
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_home(self):
+        self.assertBudget(1, reverse('home'))
+
+    def test_houses(self):
+        # Page rows + the rent summary row for the budget histogram
+        self.assertBudget(2, reverse('houses'))
+
+    def test_houses_search(self):
+        # FTS ranking, id-only filter query, the page rows, rent summary
+        self.assertBudget(4, reverse('houses') + '?q=campus&min_budget=1000&max_budget=900000')
+
+    def test_roommates(self):
+        # Page rows + rent summary + interest facet counts (cold: listings were just added)
+        self.assertBudget(3, reverse('roommates'))
+
+    def test_roommates_filtered(self):
+        self.assertBudget(5, reverse('roommates') + '?q=Poster&min_budget=1000&tags=gamer')
+
+    def test_listing_detail(self):
+        self.make_listings(3)
+        listing = Listing.objects.filter(posted_by=self.owner).first()
+        # Listing + gallery + videos; the view count is buffered, not saved
+        self.assertBudget(3, reverse('listing_detail', args=[listing.id]))
+
+    def test_user_profile(self):
+        self.assertBudget(2, reverse('user_profile', args=[self.owner.id]))
+
+    def test_my_listings(self):
+        self.assertBudget(3, reverse('my_listings'), login=True)
+
+    def test_login_and_signup(self):
+        self.assertBudget(0, reverse('login'))
+        self.assertBudget(0, reverse('signup'))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+
+    def house(self, title, verified=False, created_at=None):
+        listing = Listing.objects.create(
+            title=title, description='Quiet', rent=100000, location='Akoka', listing_type='house',
+            posted_by=self.poster, is_verified_listing=verified,
+        )
+        if created_at is not None:
+            Listing.objects.filter(id=listing.id).update(created_at=created_at)
+        return listing
+
+    def walk(self, page_size):
+        pages, cursor = [], None
+        while True:
+            listings, cursor = pagination.paginate_feed(Listing.objects.all(), cursor, page_size=page_size)
+            pages.append([listing.title for listing in listings])
+            if cursor is None:
+                return pages
+
+    def test_cursor_round_trip(self):
+        listing = self.house('Room')
+        listing.refresh_from_db()
+        cursor = pagination.encode_cursor(listing)
+        self.assertEqual(pagination.decode_cursor(cursor), (False, listing.created_at, listing.id))
+        values = Listing.objects.values('is_verified_listing', 'created_at', 'id').get()
+        self.assertEqual(pagination.encode_cursor(values), cursor)
+
+    def test_invalid_cursor_serves_the_first_page(self):
+        self.house('Room')
+        tampered = base64.urlsafe_b64encode(b'1|yesterday|7').decode()
+        for cursor in ('', 'not base64!', 'bm9wZQ', tampered):
+            self.assertIsNone(pagination.decode_cursor(cursor), cursor)
+            listings, next_cursor = pagination.paginate_feed(Listing.objects.all(), cursor)
+            self.assertEqual([listing.title for listing in listings], ['Room'])
+            self.assertIsNone(next_cursor)
+        response = self.client.get(reverse('houses'), {'cursor': 'not base64!'})
+        self.assertEqual([listing.title for listing in response.context['houses']], ['Room'])
+
+    def test_same_created_at_pages_by_id(self):
+        moment = timezone.now() - timedelta(days=1)
+        for number in range(5):
+            self.house(f'Room {number}', created_at=moment)
+        self.assertEqual(self.walk(2), [['Room 4', 'Room 3'], ['Room 2', 'Room 1'], ['Room 0']])
+
+    def test_verified_listings_come_first_across_pages(self):
+        now = timezone.now()
+        self.house('Old verified', verified=True, created_at=now - timedelta(days=30))
+        self.house('New', created_at=now - timedelta(days=1))
+        self.house('Newer verified', verified=True, created_at=now - timedelta(days=20))
+        self.house('Newest', created_at=now)
+        self.assertEqual(self.walk(1), [['Newer verified'], ['Old verified'], ['Newest'], ['New']])
+        self.assertEqual(self.walk(3), [['Newer verified', 'Old verified', 'Newest'], ['New']])
+
+    def test_load_more_link_keeps_filters(self):
+        now = timezone.now()
+        for number in range(pagination.FEED_PAGE_SIZE + 1):
+            self.house(f'Room {number}', created_at=now - timedelta(minutes=number))
+        response = self.client.get(reverse('houses'), {'max_budget': 200000})
+        self.assertEqual(len(response.context['houses']), pagination.FEED_PAGE_SIZE)
+        next_url = response.context['next_page_url']
+        self.assertIn('max_budget=200000', next_url)
+        self.assertContains(response, 'load-more-link')
+
+        response = self.client.get(next_url)
+        self.assertEqual([listing.title for listing in response.context['houses']], [f'Room {pagination.FEED_PAGE_SIZE}'])
+        self.assertIsNone(response.context['next_page_url'])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+
+    def make_listing(self, **kwargs):
+        fields = {
+            'title': 'Self contain', 'description': 'Quiet compound', 'rent': 150000,
+            'location': 'Akoka', 'listing_type': 'house', 'posted_by': self.poster,
+        }
+        fields.update(kwargs)
+        return Listing.objects.create(**fields)
+
+    def search_titles(self, url):
+        return [listing.title for listing in self.client.get(url).context['houses']]
+
+    def test_ranks_title_matches_and_verified_listings_first(self):
+        self.make_listing(title='Flat near campus', description='Gate')
+        self.make_listing(title='Mini flat', description='Walk to the north gate')
+        self.make_listing(title='Verified north gate flat', is_verified_listing=True)
+        titles = self.search_titles(reverse('houses') + '?q=north gate')
+        self.assertEqual(titles, ['Verified north gate flat', 'Mini flat'])
+
+    def test_index_follows_edits_and_deletes(self):
+        listing = self.make_listing(title='Room in Yaba')
+        self.assertEqual(self.search_titles(reverse('houses') + '?q=yab'), ['Room in Yaba'])
+
+        listing.title = 'Room in Bariga'
+        listing.save()
+        self.assertEqual(self.search_titles(reverse('houses') + '?q=yaba'), [])
+        self.assertEqual(self.search_titles(reverse('houses') + '?q=bariga'), ['Room in Bariga'])
+
+        listing.delete()
+        self.assertEqual(search.ranked_ids('bariga'), [])
+
+    def test_roommates_search_poster_name(self):
+        self.make_listing(title='Roommate wanted', listing_type='roommate', interests='Gamer,Studious')
+        response = self.client.get(reverse('roommates') + '?q=tolu gamer')
+        self.assertEqual([r.title for r in response.context['roommates']], ['Roommate wanted'])
+        # Houses don't search by poster name
+        self.make_listing(title='Two bedroom')
+        self.assertEqual(self.search_titles(reverse('houses') + '?q=tolu'), [])
+
+    def test_search_pagination(self):
+        for i in range(25):
+            self.make_listing(title=f'Akoka room {i}')
+        response = self.client.get(reverse('houses') + '?q=akoka')
+        first_page = [listing.id for listing in response.context['houses']]
+        response = self.client.get(response.context['next_page_url'])
+        second_page = [listing.id for listing in response.context['houses']]
+        self.assertEqual(len(first_page), 20)
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(set(first_page) & set(second_page))
+        self.assertIsNone(response.context['next_page_url'])
+
+    def test_rebuild_command(self):
+        listing = self.make_listing(title='Rebuilt room')
+        search.unindex_listing(listing.id)
+        self.assertEqual(search.ranked_ids('rebuilt'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.ranked_ids('rebuilt'), [listing.id])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        view_counter.clear()
+        poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.listings = [
+            Listing.objects.create(
+                title=f'Room {i}', description='Quiet', rent=100000, location='Akoka',
+                listing_type='house', posted_by=poster,
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        view_counter.clear()
+
+    def test_detail_views_are_buffered_then_flushed(self):
+        first, second, third = self.listings
+        for listing, views in ((first, 3), (second, 3), (third, 1)):
+            for _ in range(views):
+                self.client.get(reverse('listing_detail', args=[listing.id]))
+
+        first.refresh_from_db()
+        self.assertEqual(first.views_count, 0)
+        self.assertEqual(view_counter.pending(first.id), 3)
+
+        # Same increment shares one UPDATE
+        with self.assertNumQueries(2):
+            self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(
+            [listing.views_count for listing in Listing.objects.order_by('id')], [3, 3, 1]
+        )
+        self.assertEqual(view_counter.pending(first.id), 0)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_flushes_after_response_once_due(self):
+        listing = self.listings[0]
+        self.client.get(reverse('listing_detail', args=[listing.id]))
+        listing.refresh_from_db()
+        self.assertEqual(listing.views_count, 1)
+
+    def test_worker_thread_and_exit_flush(self):
+        counter = ViewCounter()
+        listing = self.listings[0]
+        with mock.patch('atexit.register') as register, mock.patch('threading.Thread') as thread:
+            counter.record(listing.id)
+            thread.assert_not_called()
+            counter.start_worker()
+            counter.start_worker()
+            counter.record(listing.id)
+            counter.record(listing.id)
+        register.assert_called_once_with(counter.flush_quietly)
+        thread.return_value.start.assert_called_once()
+
+        # What the process would run at exit, long before the interval is up
+        counter.flush_quietly()
+        listing.refresh_from_db()
+        self.assertEqual(listing.views_count, 3)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.listing = Listing.objects.create(
+            title='Room in Yaba', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=self.poster,
+        )
+
+    def render_houses(self):
+        # Past the anonymous page cache, so the cards render every time
+        page_cache.bump_generation()
+        return self.client.get(reverse('houses')).content.decode()
+
+    def test_second_render_is_a_hit(self):
+        self.render_houses()
+        self.render_houses()
+        self.assertEqual(fragment_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_a_page_of_cards_costs_a_fixed_number_of_cache_calls(self):
+        for number in range(4):
+            Listing.objects.create(
+                title=f'Room {number}', description='Quiet', rent=100000, location='Yaba',
+                listing_type='house', posted_by=self.poster,
+            )
+        self.render_houses()
+        self.render_houses()
+        hits = fragment_cache.stats()['hits']
+        with mock.patch.object(fragment_cache, 'cache', mock.Mock(wraps=cache)) as counted:
+            html = self.render_houses()
+        self.assertIn('Room 3', html)
+        # Version stamps and fragments: one get_many each; hits: one incr
+        self.assertEqual([call[0] for call in counted.method_calls], ['get_many', 'get_many', 'incr'])
+        self.assertEqual(fragment_cache.stats()['hits'], hits + 5)
+
+    def test_listing_and_media_changes_invalidate(self):
+        self.render_houses()
+        self.listing.title = 'Room in Akoka'
+        self.listing.save()
+        self.assertIn('Room in Akoka', self.render_houses())
+
+        ListingVideo.objects.create(listing=self.listing, video='listing_videos/tour.mp4')
+        self.assertIn('ph-video-camera', self.render_houses())
+        self.assertEqual(fragment_cache.stats()['hits'], 0)
+
+    def test_admin_verification_invalidates_poster_cards(self):
+        self.assertIn('Unverified User', self.render_houses())
+        admin = CustomUserAdmin(User, None)
+        admin.message_user = lambda *args, **kwargs: None
+        admin.approve_verification(None, User.objects.filter(id=self.poster.id))
+        self.assertIn('Verified Student', self.render_houses())
+        self.assertNotIn('Unverified User', self.render_houses())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.listing = Listing.objects.create(
+            title='Room in Yaba', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=self.poster,
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_feed_pages_are_cached(self):
+        for name in ('home', 'houses', 'roommates'):
+            self.assertEqual(self.get(reverse(name))[page_cache.STATUS_HEADER], 'miss')
+            with self.assertNumQueries(0):
+                response = self.get(reverse(name))
+            self.assertEqual(response[page_cache.STATUS_HEADER], 'hit')
+
+    def test_key_uses_normalized_query(self):
+        url = reverse('houses')
+        self.get(url + '?q=yaba&max_budget=200000')
+        self.assertEqual(self.get(url + '?max_budget=200000&min_budget=&q=yaba')[page_cache.STATUS_HEADER], 'hit')
+        self.assertEqual(self.get(url + '?q=yaba&max_budget=90000')[page_cache.STATUS_HEADER], 'miss')
+        # Parameters outside the key aren't cached at all
+        self.assertNotIn(page_cache.STATUS_HEADER, self.get(url + '?near=gandu'))
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.get(reverse('houses'))
+        self.client.force_login(self.poster)
+        self.assertNotIn(page_cache.STATUS_HEADER, self.get(reverse('houses')))
+        # Skipping the cache doesn't load the session or the user: only the feed query runs
+        with self.assertNumQueries(1):
+            self.assertNotIn(page_cache.STATUS_HEADER, self.get(reverse('home')))
+
+    def test_listing_changes_and_admin_verification_invalidate(self):
+        self.get(reverse('houses'))
+        self.listing.title = 'Room in Akoka'
+        self.listing.save()
+        self.assertContains(self.get(reverse('houses')), 'Room in Akoka')
+
+        self.listing.views_count = 5
+        self.listing.save(update_fields=['views_count'])
+        self.assertEqual(self.get(reverse('houses'))[page_cache.STATUS_HEADER], 'hit')
+
+        admin = ListingAdmin(Listing, None)
+        admin.verify_listings(None, Listing.objects.filter(id=self.listing.id))
+        self.assertContains(self.get(reverse('houses')), 'Verified Listing')
+
+        self.listing.delete()
+        self.assertNotContains(self.get(reverse('houses')), 'Room in Akoka')
+
+    def test_stale_page_served_while_another_request_rebuilds(self):
+        url = reverse('houses')
+        self.get(url)
+        Listing.objects.create(
+            title='Flat in Surulere', description='New', rent=90000, location='Surulere',
+            listing_type='house', posted_by=self.poster,
+        )
+        # Another request is rebuilding the page
+        with mock.patch.object(cache, 'add', return_value=False):
+            response = self.get(url)
+        self.assertEqual(response[page_cache.STATUS_HEADER], 'stale')
+        self.assertNotContains(response, 'Flat in Surulere')
+
+        response = self.get(url)
+        self.assertEqual(response[page_cache.STATUS_HEADER], 'miss')
+        self.assertContains(response, 'Flat in Surulere')
+        self.assertEqual(self.get(url)[page_cache.STATUS_HEADER], 'hit')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ModerationQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            email='staff@example.com', full_name='Staff', phone_number='08012345678', is_staff=True, is_superuser=True,
+        )
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@example.com', full_name=f'Student {i}', phone_number='08012345678',
+                verification_status='pending',
+            )
+            for i in range(5)
+        ]
+        self.listings = [
+            Listing.objects.create(
+                title=f'Room {i}', description='Quiet', rent=100000, location='Yaba',
+                listing_type='house', posted_by=self.students[i],
+            )
+            for i in range(5)
+        ]
+        self.url = reverse('moderation_queue')
+
+    def walk(self, page):
+        rows, cursor = page()
+        pages = [rows]
+        while cursor:
+            rows, cursor = page(cursor)
+            pages.append(rows)
+        return [[row.id for row in rows] for rows in pages]
+
+    def test_keyset_pages_cover_the_queue_once(self):
+        self.assertEqual(
+            self.walk(lambda cursor=None: moderation.verification_page(cursor, page_size=2)),
+            [[u.id for u in self.students[0:2]], [u.id for u in self.students[2:4]], [self.students[4].id]],
+        )
+        self.assertEqual(
+            self.walk(lambda cursor=None: moderation.listing_page(cursor, page_size=2)),
+            [[l.id for l in self.listings[0:2]], [l.id for l in self.listings[2:4]], [self.listings[4].id]],
+        )
+        # A malformed cursor serves the first page
+        self.assertEqual(moderation.listing_page('garbage', page_size=2)[0], self.listings[0:2])
+
+    def test_staff_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+        # Staff without the model permissions can't see or decide either queue
+        clerk = User.objects.create_user(
+            email='clerk@example.com', full_name='Clerk', phone_number='08012345678', is_staff=True,
+        )
+        self.client.force_login(clerk)
+        for queue in moderation.QUEUES:
+            self.assertEqual(self.client.get(f'{self.url}?queue={queue}').status_code, 403)
+        response = self.client.post(self.url, {'ids': [self.students[0].id], 'decision': 'approve'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(self.url + '?queue=listings', {'ids': [self.listings[0].id], 'decision': 'approve'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(moderation.pending_verifications().filter(id=self.students[0].id).exists())
+        self.assertFalse(Listing.objects.filter(is_verified_listing=True).exists())
+
+        clerk.user_permissions.add(Permission.objects.get(codename='change_listing'))
+        clerk = User.objects.get(id=clerk.id)
+        self.client.force_login(clerk)
+        self.assertEqual(self.client.get(f'{self.url}?queue=listings').status_code, 200)
+        self.assertEqual(self.client.get(f'{self.url}?queue=verifications').status_code, 403)
+
+    def test_page_queries_do_not_grow_with_the_queue(self):
+        self.client.force_login(self.staff)
+
+        def queries(queue):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(f'{self.url}?queue={queue}')
+            self.assertEqual(response.status_code, 200)
+            return len(context)
+
+        before = {queue: queries(queue) for queue in moderation.QUEUES}
+        for student in self.students:
+            User.objects.create_user(
+                email=f'new.{student.email}', full_name='New', phone_number='08012345678',
+                verification_status='pending',
+            )
+            Listing.objects.create(
+                title='Another room', description='Quiet', rent=100000, location='Yaba',
+                listing_type='house', posted_by=student,
+            )
+        # No counts and no per-row poster lookups
+        self.assertEqual({queue: queries(queue) for queue in moderation.QUEUES}, before)
+
+    def test_bulk_decisions_run_in_chunks_and_invalidate_caches(self):
+        self.assertContains(self.client.get(reverse('houses')), 'Unverified User')
+        # Three chunks, each its own UPDATE inside a savepoint
+        with self.assertNumQueries(9):
+            updated = moderation.set_verification([u.id for u in self.students], approved=True, chunk_size=2)
+        self.assertEqual(updated, 5)
+        self.assertFalse(moderation.pending_verifications().exists())
+        response = self.client.get(reverse('houses'))
+        self.assertEqual(response[page_cache.STATUS_HEADER], 'miss')
+        self.assertNotContains(response, 'Unverified User')
+
+        moderation.review_listings([self.listings[0].id], approved=True)
+        moderation.review_listings([l.id for l in self.listings[1:]], approved=False, chunk_size=2)
+        self.assertFalse(moderation.unreviewed_listings().exists())
+        self.assertEqual(Listing.objects.filter(is_verified_listing=True).get(), self.listings[0])
+        self.assertContains(self.client.get(reverse('houses')), 'Verified Listing', count=1)
+
+    def test_queue_form(self):
+        self.client.force_login(self.staff)
+        ids = [self.listings[0].id, self.listings[1].id]
+        response = self.client.post(self.url + '?queue=listings', {'ids': ids, 'decision': 'approve'})
+        self.assertRedirects(response, self.url + '?queue=listings', fetch_redirect_response=False)
+        self.assertEqual(Listing.objects.filter(is_verified_listing=True).count(), 2)
+
+        response = self.client.get(self.url + '?queue=listings')
+        self.assertContains(response, '2 listings verified.')
+        self.assertNotContains(response, 'Room 0')
+        self.assertContains(response, 'Room 2')
+
+        response = self.client.post(self.url, {'ids': [self.students[0].id], 'decision': 'reject'}, follow=True)
+        self.assertContains(response, '1 verifications rejected.')
+        self.students[0].refresh_from_db()
+        self.assertEqual(self.students[0].verification_status, 'rejected')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CounterTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.listing = Listing.objects.create(
+            title='Room in Yaba', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=self.poster,
+        )
+
+    def counts(self):
+        self.listing.refresh_from_db()
+        self.poster.refresh_from_db()
+        return self.listing.image_count, self.listing.video_count, self.poster.listing_count
+
+    def test_signals_keep_counts(self):
+        self.assertEqual(self.counts(), (0, 0, 1))
+        image = ListingImage.objects.create(listing=self.listing, image='listing_images/gallery/a.jpg')
+        ListingImage.objects.create(listing=self.listing, image='listing_images/gallery/b.jpg')
+        video = ListingVideo.objects.create(listing=self.listing, video='listing_videos/tour.mp4')
+        self.assertEqual(self.counts(), (2, 1, 1))
+        self.assertTrue(self.listing.has_video)
+
+        image.delete()
+        video.delete()
+        self.assertEqual(self.counts(), (1, 0, 1))
+
+        other = User.objects.create_user(email='ada@example.com', full_name='Ada Obi', phone_number='08012345678')
+        self.listing.posted_by = other
+        self.listing.save()
+        other.refresh_from_db()
+        self.assertEqual((self.counts()[2], other.listing_count), (0, 1))
+        self.listing.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.listing_count, 0)
+
+    def test_full_save_keeps_counts_moved_since_loading(self):
+        stale = Listing.objects.get(id=self.listing.id)
+        stale_poster = User.objects.get(id=self.poster.id)
+        ListingImage.objects.create(listing=self.listing, image='listing_images/gallery/a.jpg')
+        Listing.objects.create(
+            title='Flat in Akoka', description='New', rent=90000, location='Akoka',
+            listing_type='house', posted_by=self.poster,
+        )
+        stale.title = 'Room in Akoka'
+        stale.save()
+        stale_poster.full_name = 'Tolu B.'
+        stale_poster.save()
+        self.assertEqual(self.counts(), (1, 0, 2))
+        self.assertEqual(self.listing.title, 'Room in Akoka')
+        self.assertEqual(self.poster.full_name, 'Tolu B.')
+
+    def test_saving_a_deleted_row_inserts_it_again(self):
+        stale = Listing.objects.get(id=self.listing.id)
+        Listing.objects.filter(id=self.listing.id).delete()
+        stale.save()
+        self.assertTrue(Listing.objects.filter(id=self.listing.id, title='Room in Yaba').exists())
+
+    def test_reconcile_repairs_drift(self):
+        ListingImage.objects.create(listing=self.listing, image='listing_images/gallery/a.jpg')
+        Listing.objects.filter(id=self.listing.id).update(image_count=5, video_count=2)
+        User.objects.filter(id=self.poster.id).update(listing_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('3 counters wrong', out.getvalue())
+        self.assertEqual(self.counts(), (5, 2, 0))
+
+        out = StringIO()
+        call_command('reconcile_counters', '--batch-size', '1', stdout=out)
+        self.assertIn('listing images: 1 repaired', out.getvalue())
+        self.assertEqual(self.counts(), (1, 0, 1))
+        self.assertEqual(counters.reconcile(), {'listing images': 0, 'listing videos': 0, 'user listings': 0})
+
+    def test_pages_read_counts(self):
+        ListingVideo.objects.create(listing=self.listing, video='listing_videos/tour.mp4')
+        self.assertContains(self.client.get(reverse('houses')), 'ph-video-camera')
+        self.assertContains(self.client.get(reverse('user_profile', args=[self.poster.id])), '(1)')
+        # No gallery to prefetch: the listing (with its poster) and the videos
+        with self.assertNumQueries(2):
+            self.client.get(reverse('listing_detail', args=[self.listing.id]))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    def upload(self, name, size):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0110] = 'Phone Camera'  # Model
+        Image.new('RGB', size, 'teal').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_generates_resized_derivatives_without_exif(self):
+        poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        listing = Listing.objects.create(
+            title='Room', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=poster, image=self.upload('room.jpg', (1000, 500)),
+        )
+        # Resizing happens in the job queue, not in the request
+        self.assertEqual(thumbnails.available_widths(listing.image.name), [])
+        self.assertEqual(Job.objects.get().name, 'generate_thumbnails')
+        call_command('run_jobs', '--once', '--concurrency', '1', stdout=StringIO())
+        self.assertEqual(thumbnails.available_widths(listing.image.name), [320, 640])
+
+        with Image.open(f'{TEST_MEDIA_ROOT}/{thumbnails.derivative_name(listing.image.name, 320, "jpg")}') as thumb:
+            self.assertEqual(thumb.size, (320, 160))
+            self.assertNotIn(0x0110, thumb.getexif())
+
+        # The job recorded what it wrote; rendering reads that, not the storage
+        self.assertEqual(responsive_img(listing.image, alt='Room'), f'<img src="{listing.image.url}" alt="Room" loading="lazy">')
+        listing.refresh_from_db()
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("storage probed")):
+            html = responsive_img(listing.image, sizes='300px', alt='Room')
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('_640.jpg 640w', html)
+        self.assertIn('alt="Room"', html)
+
+    def test_jobs_are_queued_only_for_new_images(self):
+        poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        listing = Listing.objects.create(
+            title='Room', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=poster, image=self.upload('room.jpg', (1000, 500)),
+        )
+        listing = Listing.objects.get(id=listing.id)
+        listing.title = 'Quiet room'
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("storage probed")):
+            listing.save()
+        self.assertEqual(Job.objects.count(), 1)
+
+        # A second new image before the worker ran: the queued job covers it
+        listing.image = self.upload('room2.jpg', (1000, 500))
+        listing.save()
+        self.assertEqual(Job.objects.filter(status='queued').count(), 1)
+
+    def test_small_images_are_not_upscaled(self):
+        image = ListingImage(image=default_storage.save('tiny.jpg', self.upload('tiny.jpg', (100, 80))))
+        thumbnails.generate_derivatives(image.image)
+        self.assertEqual(thumbnails.available_widths(image.image.name), [320])
+        with Image.open(f'{TEST_MEDIA_ROOT}/{thumbnails.derivative_name(image.image.name, 320, "webp")}') as thumb:
+            self.assertEqual(thumb.size, (100, 80))
+
+
+FLAKY_CALLS = []
+
+
+@jobs.task('test_flaky')
+def flaky_task(fail_times):
+    FLAKY_CALLS.append(fail_times)
+    if len(FLAKY_CALLS) <= fail_times:
+        raise RuntimeError("try again")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        FLAKY_CALLS.clear()
+
+    def run_due_jobs(self):
+        Job.objects.filter(status='queued').update(run_after=timezone.now())
+        return jobs.work(concurrency=1, once=True)
+
+    def test_retries_until_success(self):
+        job = jobs.enqueue('test_flaky', fail_times=1)
+        self.assertEqual(self.run_due_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('try again', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        self.assertEqual(self.run_due_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue('test_flaky', max_attempts=2, fail_times=5)
+        self.run_due_jobs()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_due_jobs()
+        self.assertEqual(self.run_due_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_unknown_job_name(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('no_such_job')
+
+    def test_requeues_jobs_from_dead_workers(self):
+        job = jobs.enqueue('test_flaky', fail_times=0)
+        Job.objects.filter(id=job.id).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(self.run_due_jobs(), 1)
+
+
+MP4_HEADER = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00'
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class UploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.client.force_login(self.user)
+
+    def start(self, size, filename='tour.mp4'):
+        return self.client.post(reverse('chunked_upload_start'), {'filename': filename, 'size': size})
+
+    def send(self, upload_id, data, start, total):
+        return self.client.post(
+            reverse('chunked_upload', args=[upload_id]), data=data,
+            content_type='application/octet-stream',
+            headers={'content-range': f'bytes {start}-{start + len(data) - 1}/{total}'},
+        )
+
+    def test_resumable_upload_is_attached_to_new_listing(self):
+        video = MP4_HEADER + b'x' * 100
+        upload_id = self.start(len(video)).json()['id']
+
+        self.assertEqual(self.send(upload_id, video[:50], 0, len(video)).json()['offset'], 50)
+        # A retried or out-of-order chunk is refused with the offset to resume from
+        response = self.send(upload_id, video[80:], 80, len(video))
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 50))
+        self.assertEqual(self.client.get(reverse('chunked_upload', args=[upload_id])).json()['offset'], 50)
+        self.assertEqual(self.send(upload_id, video[50:], 50, len(video)).json()['status'], 'complete')
+
+        self.client.post(reverse('post_listing'), {
+            'title': 'Room with tour', 'description': 'Quiet', 'rent': '150000', 'location': 'Yaba',
+            'listing_type': 'house', 'video_uploads': [upload_id, 'not-a-uuid'],
+        })
+        listing_video = ListingVideo.objects.get(listing__title='Room with tour')
+        with listing_video.video.open('rb') as f:
+            self.assertEqual(f.read(), video)
+        self.assertFalse(os.path.exists(uploads.staging_path(ChunkedUpload.objects.get())))
+
+    def test_rejects_oversize_and_non_video_uploads(self):
+        self.assertEqual(self.start(MAX_VIDEO_SIZE + 1).status_code, 413)
+
+        upload_id = self.start(100).json()['id']
+        response = self.send(upload_id, b'<html>' + b'x' * 94, 0, 100)
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_active_uploads_are_capped_and_abandoned_ones_expire(self):
+        ids = [self.start(100).json()['id'] for _ in range(uploads.MAX_ACTIVE_UPLOADS)]
+        self.assertEqual(self.start(100).status_code, 429)
+
+        # Untouched for longer than the expiry: deleted with the staging file
+        stale = ChunkedUpload.objects.get(id=ids[0])
+        ChunkedUpload.objects.filter(id=ids[0]).update(updated_at=timezone.now() - uploads.UPLOAD_EXPIRY * 2)
+        self.assertEqual(self.start(100).status_code, 201)
+        self.assertFalse(ChunkedUpload.objects.filter(id=ids[0]).exists())
+        self.assertFalse(os.path.exists(uploads.staging_path(stale)))
+
+        ChunkedUpload.objects.filter(id=ids[1]).update(updated_at=timezone.now() - timedelta(hours=2))
+        out = StringIO()
+        call_command('expire_uploads', '--hours', '1', stdout=out)
+        self.assertIn('Expired 1 uploads.', out.getvalue())
+        self.assertEqual(ChunkedUpload.objects.count(), uploads.MAX_ACTIVE_UPLOADS - 1)
+
+    def test_form_uploads_are_limited_while_streaming(self):
+        limits = {'videos': (64, '64B', 'video/')}
+        with mock.patch.dict(uploads.FIELD_LIMITS, limits):
+            response = self.client.post(reverse('post_listing'), {
+                'title': 'Room', 'description': 'Quiet', 'rent': '150000', 'location': 'Yaba',
+                'listing_type': 'house',
+                'videos': [
+                    SimpleUploadedFile('big.mp4', MP4_HEADER + b'x' * 100, content_type='video/mp4'),
+                    SimpleUploadedFile('fake.mp4', b'not a video', content_type='video/mp4'),
+                    SimpleUploadedFile('ok.mp4', MP4_HEADER, content_type='video/mp4'),
+                ],
+            }, follow=True)
+        errors = [str(m) for m in response.context['messages']]
+        self.assertIn("big.mp4 exceeds the 64B limit.", errors)
+        self.assertIn("fake.mp4 is not a supported video file.", errors)
+        video = ListingVideo.objects.get()
+        with video.video.open('rb') as f:
+            self.assertEqual(f.read(), MP4_HEADER)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.name = default_storage.save('listing_videos/tour.mp4', ContentFile(bytes(range(100))))
+        self.url = f'/media/{self.name}'
+
+    def test_full_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        self.assertEqual(self.client.get(self.url, headers={'if-none-match': response['ETag']}).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, headers={'if-modified-since': response['Last-Modified']}).status_code, 304
+        )
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, headers={'range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get(self.url, headers={'range': 'bytes=-5'})
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+
+        response = self.client.get(self.url, headers={'range': 'bytes=200-'})
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */100'))
+
+        # Stale If-Range: send the whole (changed) file instead of a part
+        response = self.client.get(self.url, headers={'range': 'bytes=0-9', 'if-range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_private_and_hidden_files(self):
+        name = default_storage.save('verification_docs/id.jpg', ContentFile(b'id card'))
+        self.assertEqual(self.client.get(f'/media/{name}').status_code, 404)
+        self.assertEqual(self.client.get('/media/../roomlink/settings.py').status_code, 404)
+
+        staff = User.objects.create_user(
+            email='staff@example.com', full_name='Staff', phone_number='08012345678', is_staff=True,
+        )
+        self.client.force_login(staff)
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        settings_override = self.settings(STATIC_ROOT=self.static_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        assets.immutable_names.cache_clear()
+        self.addCleanup(assets.immutable_names.cache_clear)
+
+    def collect(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        assets.immutable_names.cache_clear()
+
+    def test_minifiers_keep_meaning(self):
+        css = "/* nav */\na :hover > b { margin : 0 auto ;\n width: calc(100% - 2px); content: ' {x} ' ; }\n"
+        self.assertEqual(assets.minify_css(css), "a :hover>b{margin :0 auto;width:calc(100% - 2px);content:' {x} '}")
+        css = "a ,b {color:red;}\n@media (max-width: 600px) {\n  .x ,.y {background: url(data:image/png;base64,AA==) }\n}"
+        self.assertEqual(assets.minify_css(css), "a,b{color:red}@media (max-width:600px){.x,.y{background:url(data:image/png;base64,AA==)}}")
+        js = "// setup\nconst a = b / 2; /* c */\nlet re = /[/]+ x/g;\nlet s = `two  spaces`\nx = y + +z\n"
+        self.assertEqual(assets.minify_js(js), "const a=b/2;\nlet re=/[/]+ x/g;\nlet s=`two  spaces`\nx=y+ +z")
+        # A `/` after these keywords starts a regex, which is copied as is
+        js = "function f(s) {\n  if (s) return / a b/.test(s)\n  return typeof /[//]/ + x\n}\nlet y = a / b / c\n"
+        self.assertEqual(assets.minify_js(js), "function f(s){\nif(s)return/ a b/.test(s)\nreturn typeof/[//]/+x\n}\nlet y=a/b/c")
+
+    def test_stylesheet_minifies_to_the_same_rules(self):
+        with open(finders.find('css/styles.css')) as f:
+            css = f.read()
+        minified = assets.minify_css(css)
+        self.assertLess(len(minified), len(css) * 0.85)
+        self.assertNotRegex(minified, r'\s[{};,>]|[{};,>:]\s|;}')
+        # Only comments, whitespace and the last semicolon of each block went away
+        without_comments = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+        self.assertEqual(re.sub(r';}', '}', re.sub(r'\s+', '', minified)), re.sub(r';}', '}', re.sub(r'\s+', '', without_comments)))
+
+    def test_collectstatic_fingerprints_minifies_and_precompresses(self):
+        self.collect()
+        hashed = staticfiles_storage.stored_name('css/styles.css')
+        self.assertRegex(hashed, r'^css/styles\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.static_root, hashed), 'rb') as f:
+            content = f.read()
+        with open(finders.find('css/styles.css'), 'rb') as f:
+            self.assertLess(len(content), len(f.read()))
+        with gzip.open(os.path.join(self.static_root, hashed + '.gz')) as f:
+            self.assertEqual(f.read(), content)
+        # Images are already compressed
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, staticfiles_storage.stored_name('images/logo.png') + '.gz')))
+        self.assertContains(self.client.get(reverse('home')), f'href="/static/{hashed}"')
+
+    def test_serving_negotiates_encoding_and_caches_hashed_names(self):
+        self.collect()
+        url = staticfiles_storage.url('js/app.js')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content))[:8], b'document')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # Unhashed names may change, so they are revalidated
+        self.assertEqual(self.client.get('/static/js/app.js')['Cache-Control'], 'public, no-cache')
+        self.assertEqual(self.client.get('/static/js/app.js.gz').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_budget_report(self):
+        pages = assets.page_assets()
+        self.assertEqual(pages['home.html'][0], ['css/styles.css', 'images/logo.png', 'js/app.js'])
+        self.assertNotIn('base.html', pages)
+        out = StringIO()
+        call_command('asset_budget', stdout=out)
+        self.assertIn('houses.html', out.getvalue())
+        with self.assertRaisesMessage(CommandError, 'over the 1000-byte static budget'):
+            call_command('asset_budget', budget=1000, stdout=StringIO())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    def test_identical_uploads_share_one_file(self):
+        first = default_storage.save('listing_images/a.jpg', ContentFile(b'same bytes'))
+        second = default_storage.save('listing_images/gallery/b.JPG', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertTrue(default_storage.is_content_addressed(first))
+        self.assertTrue(first.startswith('listing_images/') and first.endswith('.jpg'))
+        # The folder is kept, so private documents never share public files
+        document = default_storage.save('verification_docs/a.jpg', ContentFile(b'same bytes'))
+        self.assertNotEqual(document, first)
+
+    def test_dedupe_media_moves_legacy_files(self):
+        poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        listing = Listing.objects.create(
+            title='Room', description='Quiet', rent=100000, location='Yaba',
+            listing_type='house', posted_by=poster,
+        )
+        # Files written before content addressing, under their upload names
+        for name in ('listing_images/room.jpg', 'listing_images/gallery/room.jpg'):
+            os.makedirs(os.path.dirname(f'{TEST_MEDIA_ROOT}/{name}'), exist_ok=True)
+            with open(f'{TEST_MEDIA_ROOT}/{name}', 'wb') as f:
+                f.write(b'photo bytes')
+        Listing.objects.filter(pk=listing.pk).update(image='listing_images/room.jpg')
+        ListingImage.objects.create(listing=listing, image='listing_images/gallery/room.jpg')
+
+        call_command('dedupe_media', stdout=StringIO())
+
+        listing.refresh_from_db()
+        self.assertTrue(default_storage.is_content_addressed(listing.image.name))
+        self.assertEqual(listing.images.get().image.name, listing.image.name)
+        self.assertFalse(default_storage.exists('listing_images/room.jpg'))
+        self.assertFalse(default_storage.exists('listing_images/gallery/room.jpg'))
+        with listing.image.open('rb') as f:
+            self.assertEqual(f.read(), b'photo bytes')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ImportListingsTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='agent@example.com', full_name='Ada Agent', phone_number='08012345678',
+        )
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        Image.new('RGB', (40, 30), 'teal').save(os.path.join(self.dir, 'front.jpg'))
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_csv_rows_are_validated_and_bulk_inserted(self):
+        path = self.write('listings.csv', (
+            "title,description,rent,location,listing_type,gender_preference,interests,images\n"
+            "Yaba flat,Close to campus,150000,Yaba,house,,,front.jpg\n"
+            ",Tidy student,80000,Akoka,roommate,female,Reading,\n"
+            "Bad rent,Nope,lots,Yaba,house,,,\n"
+            "Bariga room,Quiet,90000,Bariga,house,,,missing.jpg\n"
+        ))
+        err = StringIO()
+        cached_generation = page_cache.generation()
+        # One batch: poster lookup, then a fixed set of statements, not one per row
+        with self.assertNumQueries(17):
+            call_command(
+                'import_listings', path, '--poster', 'agent@example.com', '--media-dir', self.dir,
+                '--batch-size', '2', stdout=StringIO(), stderr=err,
+            )
+        self.assertIn('line 4: rent:', err.getvalue())
+        self.assertIn('line 5: media file missing.jpg not found', err.getvalue())
+
+        house = Listing.objects.get(listing_type='house')
+        self.assertEqual(house.posted_by, self.poster)
+        self.assertEqual(house.images.get().image.name, house.image.name)
+        self.assertEqual(house.image_count, 1)
+        self.poster.refresh_from_db()
+        self.assertEqual(self.poster.listing_count, 2)
+        roommate = Listing.objects.get(listing_type='roommate')
+        self.assertEqual(roommate.title, 'Roommate Request - Ada Agent')
+        if search.search_available():
+            self.assertEqual(search.ranked_ids('Yaba flat'), [house.id])
+        self.assertEqual(Job.objects.filter(name='generate_thumbnails').count(), 2)
+        self.assertNotEqual(page_cache.generation(), cached_generation)
+
+    def test_jsonl_with_posted_by_and_dry_run(self):
+        path = self.write('listings.jsonl', (
+            '{"title": "Akoka flat", "description": "Near gate", "rent": 120000, "location": "Akoka", '
+            '"listing_type": "house", "posted_by": "AGENT@example.com"}\n'
+            '\n'
+            '{"title": "Ghost", "description": "x", "rent": 1, "location": "x", "listing_type": "house", '
+            '"posted_by": "nobody@example.com"}\n'
+            'not json\n'
+        ))
+        err = StringIO()
+        call_command('import_listings', path, '--dry-run', stdout=StringIO(), stderr=err)
+        self.assertFalse(Listing.objects.exists())
+        self.assertIn("line 3: unknown poster", err.getvalue())
+        self.assertIn("line 4: invalid JSON", err.getvalue())
+
+        call_command('import_listings', path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Listing.objects.get().posted_by, self.poster)
+
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        roommate_index.reset()
+        self.seeker = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+        self.other = User.objects.create_user(
+            email='ada@example.com', full_name='Ada Obi', phone_number='08087654321',
+        )
+
+    def roommate(self, poster, **fields):
+        defaults = {
+            'title': 'Roommate', 'description': 'Looking', 'rent': 100000, 'location': 'Akoka',
+            'listing_type': 'roommate', 'gender_preference': 'female', 'level_preference': '300',
+        }
+        defaults.update(fields)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Listing.objects.create(posted_by=poster, **defaults)
+
+    def test_best_matches_rank_by_interests_rent_and_level(self):
+        self.roommate(self.seeker, interests='Reading,Night Owl,Gamer')
+        close = self.roommate(self.other, interests='Reading,Gamer,Night Owl')
+        clash = self.roommate(self.other, interests='Reading,Early Riser', rent=150000, level_preference='500')
+        self.roommate(self.other, interests='Reading,Night Owl,Gamer', gender_preference='male')
+
+        self.client.force_login(self.seeker)
+        response = self.client.get(reverse('roommates'), {'match': '1'})
+        ranked = response.context['roommates']
+        # The male-only listing and the seeker's own request are left out
+        self.assertEqual([listing.id for listing in ranked], [close.id, clash.id])
+        self.assertEqual(ranked[0].match_score, 100)
+        self.assertLess(ranked[1].match_score, 50)
+        self.assertContains(response, '100% match')
+
+    def test_matrix_is_updated_in_place(self):
+        roommate_index.ensure_loaded()
+        listing = self.roommate(self.other, interests='Studious', level_preference='200', rent=80000)
+        with self.assertNumQueries(0):
+            seeker = roommate_index.encode_seeker(['Studious'], 'female', '200', 80000)
+            self.assertEqual(roommate_index.best_matches(seeker), [(listing.id, 1.0)])
+            self.assertEqual(roommate_index.best_matches(seeker), [(listing.id, 1.0)])
+
+        listing.listing_type = 'house'
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(roommate_index.best_matches(seeker), [])
+
+    def test_request_interests_never_grow_the_vocabulary(self):
+        self.roommate(self.seeker, interests='Reading')
+        self.roommate(self.other, interests='Night Owl')
+        self.client.force_login(self.seeker)
+        self.client.get(reverse('roommates'), {'match': '1', 'interests': ['night-owl', 'Made up 1', 'Made up 2']})
+        vocabulary = dict(roommate_index.vocabulary)
+        self.client.get(reverse('roommates'), {'match': '1', 'interests': ['Made up 3']})
+        self.assertEqual(roommate_index.vocabulary, vocabulary)
+        self.assertNotIn('made-up-1', vocabulary)
+        # Same normalization as the interest tags
+        self.assertEqual(roommate_index.encode_seeker(['NIGHT-OWL', 'Made up 4'])[0], vocabulary['night-owl'])
+
+    def test_reloads_when_another_process_changed_listings(self):
+        seeker = roommate_index.encode_seeker(['Studious'])
+        roommate_index.best_matches(seeker)
+        # Rows written without signals, e.g. by import_listings
+        listing = Listing.objects.bulk_create([Listing(
+            title='Room', description='x', rent=1, location='x', listing_type='roommate', posted_by=self.other,
+        )])[0]
+        roommate_index.invalidate()
+        self.assertEqual([listing_id for listing_id, _ in roommate_index.best_matches(seeker)], [listing.id])
+
+    def test_needs_a_roommate_request_to_match(self):
+        self.client.force_login(self.seeker)
+        response = self.client.get(reverse('roommates'), {'match': '1'})
+        self.assertRedirects(response, reverse('roommates'))
+
+
+class InterestTagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+
+    def roommate(self, interests, **fields):
+        return Listing.objects.create(
+            title='Roommate', description='Looking', rent=100000, location='Akoka',
+            listing_type='roommate', posted_by=self.poster, interests=interests, **fields,
+        )
+
+    def feed_ids(self, **params):
+        response = self.client.get(reverse('roommates'), params)
+        return [listing.id for listing in response.context['roommates']]
+
+    def test_tags_follow_the_interests_string(self):
+        listing = self.roommate('Gamer, Night Owl,gamer')
+        self.assertEqual(sorted(listing.tags.values_list('slug', flat=True)), ['gamer', 'night-owl'])
+        listing.interests = 'Studious'
+        listing.save()
+        self.assertEqual(list(listing.tags.values_list('name', flat=True)), ['Studious'])
+        self.assertEqual(InterestTag.objects.count(), 3)
+
+        # Edits that leave the interests alone don't touch the tag links or the facets
+        tags.facet_counts()
+        listing = Listing.objects.get(id=listing.id)
+        listing.title = 'Quiet roommate'
+        with mock.patch.object(tags, 'sync_listing_tags') as sync, mock.patch.object(tags, 'invalidate_facets') as invalidate:
+            listing.save()
+        sync.assert_not_called()
+        invalidate.assert_not_called()
+        listing.gender_preference = 'female'
+        with mock.patch.object(tags, 'sync_listing_tags') as sync, mock.patch.object(tags, 'invalidate_facets') as invalidate:
+            listing.save()
+        sync.assert_not_called()
+        invalidate.assert_called_once()
+
+    def test_exact_all_and_any_filters(self):
+        pets = self.roommate('Pet Friendly,Gamer')
+        no_pets = self.roommate('No Pets,Studious')
+        gamer = self.roommate('Gamer')
+        # "Pets" no longer matches "No Pets"
+        self.assertEqual(self.feed_ids(tags='pet-friendly'), [pets.id])
+        self.assertEqual(self.feed_ids(tags=['pet-friendly', 'gamer']), [pets.id])
+        self.assertEqual(
+            sorted(self.feed_ids(tags=['studious', 'gamer'], tag_mode='any')), [pets.id, no_pets.id, gamer.id]
+        )
+
+    def test_facet_counts_are_cached_until_listings_change(self):
+        self.roommate('Gamer,Studious')
+        self.roommate('Gamer', gender_preference='female')
+        counts = {facet['slug']: facet['count'] for facet in tags.facet_counts()}
+        self.assertEqual(counts, {'gamer': 2, 'studious': 1})
+        self.assertEqual([facet['count'] for facet in tags.facet_counts('female')], [1])
+
+        with self.assertNumQueries(0):
+            tags.facet_counts()
+        self.roommate('Studious')
+        counts = {facet['slug']: facet['count'] for facet in tags.facet_counts()}
+        self.assertEqual(counts['studious'], 2)
+
+        response = self.client.get(reverse('roommates'))
+        self.assertContains(response, 'value="gamer"')
+
+
+class GeoTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+
+    def house(self, location, **fields):
+        return Listing.objects.create(
+            title='House', description='Rooms', rent=100000, location=location,
+            listing_type='house', posted_by=self.poster, **fields,
+        )
+
+    def test_gazetteer_geocoding(self):
+        self.assertEqual(geo.geocode('AY Lodge, GANDU').slug, 'gandu')
+        self.assertEqual(geo.geocode('Fulafia north gate').slug, 'north-gate')
+        self.assertEqual(geo.geocode('Mararaba Akunza road').slug, 'mararaba')
+        self.assertIsNone(geo.geocode('Somewhere else'))
+
+    def test_coordinates_follow_the_location_text(self):
+        listing = self.house('Gandu')
+        gandu = geo.get_place('gandu')
+        self.assertEqual((listing.latitude, listing.longitude), (gandu.latitude, gandu.longitude))
+
+        listing = Listing.objects.get(id=listing.id)
+        listing.location = 'Behind the old market'
+        listing.save()
+        listing.refresh_from_db()
+        self.assertIsNone(listing.latitude)
+
+        explicit = self.house('Gandu', latitude=8.5, longitude=8.6)
+        self.assertEqual((explicit.latitude, explicit.longitude), (8.5, 8.6))
+
+    def test_houses_within_radius_sorted_by_distance(self):
+        gate = geo.get_place('main-gate')
+        near = self.house('Main gate')
+        middle = self.house('Gandu')
+        far = self.house('Kwandere')
+        self.house('Unknown street')
+
+        distance = geo.haversine_km(gate.latitude, gate.longitude, middle.latitude, middle.longitude)
+        annotated = geo.within(Listing.objects.all(), gate.latitude, gate.longitude, 5).get(id=middle.id).distance
+        self.assertAlmostEqual(annotated, distance, places=6)
+
+        with self.assertNumQueries(2):  # houses + rent summary
+            response = self.client.get(reverse('houses'), {'near': 'main-gate', 'km': '3', 'sort': 'distance'})
+        self.assertEqual([house.id for house in response.context['houses']], [near.id, middle.id])
+        self.assertContains(response, 'km from Main Gate')
+
+        queryset = geo.within(Listing.objects.all(), gate.latitude, gate.longitude, 10)
+        first, cursor = geo.distance_feed(queryset, page_size=2)
+        rest, next_cursor = geo.distance_feed(queryset, cursor, page_size=2)
+        self.assertEqual([listing.id for listing in first + rest], [near.id, middle.id, far.id])
+        self.assertIsNone(next_cursor)
+
+
+class RentStatsTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='tolu@example.com', full_name='Tolu Bello', phone_number='08012345678',
+        )
+
+    def house(self, rent, location='Gandu'):
+        return Listing.objects.create(
+            title='House', description='Rooms', rent=rent, location=location,
+            listing_type='house', posted_by=self.poster,
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = {
+            (row.listing_type, row.area): (row.count, row.total, row.histogram, row.percentiles)
+            for row in RentSummary.objects.all() if row.count
+        }
+        rent_stats.rebuild()
+        rebuilt = {
+            (row.listing_type, row.area): (row.count, row.total, row.histogram, row.percentiles)
+            for row in RentSummary.objects.all()
+        }
+        self.assertEqual(incremental, rebuilt)
+
+    def test_summaries_follow_saves_and_deletes(self):
+        cheap = self.house(60000)
+        self.house(120000)
+        self.house(180000, location='Akurba')
+        overall = rent_stats.get_summary('house')
+        self.assertEqual((overall.count, overall.total), (3, 360000))
+        self.assertEqual(rent_stats.get_summary('house', 'gandu').count, 2)
+
+        cheap = Listing.objects.get(id=cheap.id)
+        cheap.rent = 90000
+        cheap.location = 'Akurba'
+        cheap.save()
+        self.assertEqual(rent_stats.get_summary('house', 'gandu').count, 1)
+        self.assertEqual(rent_stats.get_summary('house', 'akurba').count, 2)
+
+        # Saves that don't touch rent, type or location leave the table alone
+        with self.assertNumQueries(0):
+            rent_stats.listing_saved(cheap, created=False)
+
+        Listing.objects.get(id=cheap.id).delete()
+        self.assertEqual(rent_stats.get_summary('house').count, 2)
+        self.assertMatchesRebuild()
+
+    def test_histogram_in_page_and_json(self):
+        for rent in (40000, 60000, 60000, 110000, 900000):
+            self.house(rent)
+        response = self.client.get(reverse('rent_stats'), {'type': 'house', 'area': 'gandu'})
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['percentiles']['50'], 68750)  # interpolated within 50k-75k
+        self.assertEqual(sum(bucket['count'] for bucket in data['buckets']), 5)
+        self.assertEqual(data['buckets'][2], {'min': 50000, 'max': 75000, 'count': 2, 'share': 100})
+
+        self.assertEqual(self.client.get(reverse('rent_stats'), {'type': 'flat'}).status_code, 400)
+        self.assertContains(self.client.get(reverse('houses')), 'median')
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            email='ada@example.com', full_name='Ada Obi', phone_number='08011111111',
+        )
+        for i in range(25):
+            Listing.objects.create(
+                title=f'Room {i}', description='Quiet room near the gate', rent=50000 + i,
+                location='Gandu', listing_type='house', posted_by=self.poster,
+            )
+        Listing.objects.create(
+            title='Looking for a roommate', description='Clean and calm', rent=80000,
+            location='Akurba', listing_type='roommate', posted_by=self.poster, interests='Reading, Gaming',
+        )
+
+    def test_feed_pages_with_cursor_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api_listings'), {'type': 'house'}).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['poster']['name'], 'Ada Obi')
+        self.assertNotIn('description', data['results'][0])
+
+        rest = self.client.get(data['next']).json()
+        self.assertEqual(len(rest['results']), 5)
+        self.assertIsNone(rest['next'])
+        ids = [row['id'] for row in data['results'] + rest['results']]
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_sparse_fields_and_filters(self):
+        data = self.client.get(reverse('api_listings'), {
+            'fields': 'id,rent,interests', 'type': 'roommate', 'max_budget': '90000',
+        }).json()
+        self.assertEqual(data['results'], [{
+            'id': Listing.objects.get(listing_type='roommate').id, 'rent': 80000, 'interests': ['Reading', 'Gaming'],
+        }])
+        searched = self.client.get(reverse('api_listings'), {'q': 'roommate', 'fields': 'title'}).json()
+        self.assertEqual(searched['results'], [{'title': 'Looking for a roommate'}])
+        self.assertEqual(self.client.get(reverse('api_listings'), {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_listings'), {'min_budget': 'cheap'}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('api_listings')).status_code, 405)
+
+    def test_detail_and_user_listings(self):
+        listing = Listing.objects.get(listing_type='roommate')
+        data = self.client.get(reverse('api_listing_detail', args=[listing.id])).json()
+        self.assertEqual(data['title'], 'Looking for a roommate')
+        self.assertEqual(data['poster']['phone_number'], '08011111111')
+        self.assertEqual((data['images'], data['videos'], data['has_video']), ([], [], False))
+        self.assertEqual(self.client.get(reverse('api_listing_detail', args=[99999])).status_code, 404)
+
+        data = self.client.get(reverse('api_user_listings', args=[self.poster.id]), {'limit': 50}).json()
+        self.assertEqual(data['user']['name'], 'Ada Obi')
+        self.assertEqual(len(data['results']), 26)
+
+    def test_etag_and_gzip(self):
+        response = self.client.get(reverse('api_listings'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        etag = response['ETag']
+        again = self.client.get(reverse('api_listings'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+
+        Listing.objects.filter(title='Room 24').update(rent=1)
+        changed = self.client.get(reverse('api_listings'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+
+    def test_payload_smaller_than_page(self):
+        api = self.client.get(reverse('api_listings'), {'type': 'house'})
+        page = self.client.get(reverse('houses'))
+        self.assertLess(len(api.content), len(page.content) / 2)
+
+
+@mock.patch('core.routers.replica_configured', return_value=True)
+class ReplicaRoutingTests(TestCase):
+    def route_request(self, request):
+        """Runs `request` through the middleware; returns the alias of a listing read and the response."""
+        router = ReplicaRouter()
+        seen = {}
+
+        def view(request):
+            seen['before'] = router.db_for_read(Listing)
+            if request.GET.get('write'):
+                router.db_for_write(Listing)
+            seen['after'] = router.db_for_read(Listing)
+            return HttpResponse()
+
+        # TestCase wraps each test in a transaction, which would pin every read
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            response = PrimaryPinMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_replica_until_they_write(self, _):
+        factory = RequestFactory()
+        seen, response = self.route_request(factory.get('/houses/'))
+        self.assertEqual(seen, {'before': 'replica', 'after': 'replica'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        seen, response = self.route_request(factory.get('/houses/', {'write': 1}))
+        self.assertEqual(seen, {'before': 'replica', 'after': 'default'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # The next request from the same browser stays on the primary
+        pinned = factory.get('/houses/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.route_request(pinned)[0]['before'], 'default')
+        self.assertEqual(self.route_request(factory.post('/post/'))[0]['before'], 'default')
+
+    def test_other_models_and_background_code_use_primary(self, _):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Listing), 'default')  # outside a request
+        self.assertEqual(router.db_for_read(Job), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+
+    def test_lagged_replica_trails_primary(self, _):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary, replica = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(primary) as db:
+            db.execute('CREATE TABLE listing (title TEXT)')
+        now = [0.0]
+        simulator = LaggedReplica(primary, replica, lag=2, clock=lambda: now[0])
+        self.addCleanup(simulator.close)
+        simulator.tick()
+
+        with sqlite3.connect(primary) as db:
+            db.execute("INSERT INTO listing VALUES ('Fresh')")
+        now[0] = 1
+        self.assertFalse(simulator.tick())  # nothing is two seconds old yet
+        now[0] = 2.5
+        self.assertTrue(simulator.tick())
+        with sqlite3.connect(replica) as db:
+            self.assertEqual(db.execute('SELECT COUNT(*) FROM listing').fetchone(), (0,))
+        now[0] = 3.5
+        simulator.tick()
+        with sqlite3.connect(replica) as db:
+            self.assertEqual(db.execute('SELECT COUNT(*) FROM listing').fetchone(), (1,))
+
+
+class PerfTests(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir)
+        self.log = os.path.join(self.log_dir, 'perf.jsonl')
+        poster = User.objects.create_user(email='ada@example.com', full_name='Ada Obi', phone_number='08011111111')
+        Listing.objects.create(
+            title='Room', description='Quiet', rent=50000, location='Gandu', listing_type='house', posted_by=poster,
+        )
+
+    def test_server_timing_header(self):
+        with self.settings(PERF_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('houses') + '?q=room'))
+        response = self.client.get(reverse('houses'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="2 queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+, view;dur=[\d.]+, total;dur=[\d.]+')
+        self.assertIn(f'size;desc="{len(response.content)} bytes"', timing)
+
+    def test_slow_requests_logged_and_reported(self):
+        with self.settings(PERF_LOG_FILE=self.log, PERF_SLOW_REQUEST_MS=0, PERF_LOG_SAMPLE_RATE=0):
+            self.client.get(reverse('houses'))
+            self.client.get(reverse('listing_detail', args=[Listing.objects.get().id]))
+        entries = list(perf.read_entries(self.log))
+        self.assertEqual([entry['url_name'] for entry in entries], ['houses', 'listing_detail'])
+        self.assertEqual(entries[0]['queries'], 2)
+        self.assertTrue(entries[0]['worst_queries'][0]['sql'].startswith('SELECT'))
+
+        out = StringIO()
+        call_command('perf_report', log=self.log, slowest=1, stdout=out)
+        self.assertIn('listing_detail', out.getvalue())
+
+        with self.settings(PERF_LOG_FILE=self.log, PERF_SLOW_REQUEST_MS=10 ** 6, PERF_LOG_SAMPLE_RATE=0):
+            self.client.get(reverse('houses'))
+        self.assertEqual(len(list(perf.read_entries(self.log))), 2)
+
+    def test_percentiles_weight_sampled_requests(self):
+        entries = [{'url_name': 'houses', 'total_ms': 10.0, 'queries': 2, 'weight': 20}] * 9
+        entries.append({'url_name': 'houses', 'total_ms': 900.0, 'queries': 30, 'weight': 1, 'slow': True})
+        row, = perf.summarize(entries)
+        self.assertEqual((row['requests'], row['slow']), (181, 1))
+        self.assertEqual((row['p50'], row['p95'], row['p99']), (10.0, 10.0, 10.0))
+        self.assertEqual(perf.weighted_percentile([(10.0, 1), (900.0, 1)], 99), 900.0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SeedScaleTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_scale', listings=150, seed=3, batch_size=40, stdout=StringIO(), **options)
+        return list(Listing.objects.order_by('id').values_list(
+            'title', 'rent', 'location', 'listing_type', 'interests', 'is_verified_listing', 'created_at', 'image',
+        ))
+
+    def test_seed_is_deterministic_and_complete(self):
+        cached_generation = page_cache.generation()
+        first = self.seed()
+        self.assertNotEqual(page_cache.generation(), cached_generation)
+        self.assertEqual(len(first), 150)
+        self.assertEqual(User.objects.count(), 37)
+        self.assertEqual(RentSummary.objects.get(listing_type='house', area='').count, Listing.objects.filter(listing_type='house').count())
+        self.assertTrue(ListingImage.objects.exists())
+        self.assertTrue(InterestTag.objects.exists())
+        self.assertTrue(search.ranked_ids('Gandu'))
+        self.assertTrue(Listing.objects.filter(latitude__isnull=False).exists())
+
+        # Dates come from the seed, not from auto_now_add
+        self.assertLess(max(row[6] for row in first), timezone.now())
+        self.assertGreater(len({row[6].date() for row in first}), 30)
+
+        with self.assertRaises(CommandError):
+            self.seed()
+        User.objects.all().delete()
+        self.assertEqual(self.seed(), first)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(benchmarks.uncovered_routes(), set())
+
+    def test_suite_runs_every_scenario(self):
+        call_command('seed_scale', listings=60, seed=2, stdout=StringIO())
+        results = benchmarks.run_suite(iterations=2, warmup=0)
+        self.assertEqual(set(results), {scenario.name for scenario in benchmarks.SCENARIOS})
+        for name, metrics in results.items():
+            self.assertLess(metrics['status'], 400, name)
+            self.assertLessEqual(metrics['p50'], metrics['p99'])
+        self.assertEqual(results['api listings']['queries'], 1)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'1000': {'houses': {'status': 200, 'p50': 10.0, 'p95': 12.0, 'p99': 13.0, 'queries': 2, 'alloc_kib': 300.0}}}
+        same = {'1000': {'houses': dict(baseline['1000']['houses'], p50=12.0)}}
+        self.assertEqual(benchmarks.compare(same, baseline), [])
+        worse = {'1000': {'houses': dict(baseline['1000']['houses'], p50=30.0, queries=3, alloc_kib=900.0)}}
+        self.assertEqual(len(benchmarks.compare(worse, baseline)), 3)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, ROOT_URLCONF='roomlink.asgi_urls')
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.poster = User.objects.create_user(email='ada@example.com', full_name='Ada Obi', phone_number='08011111111')
+        for i in range(3):
+            Listing.objects.create(
+                title=f'Flat {i}', description='Near the main gate', rent=50000 + i, location='Gandu',
+                listing_type='house' if i else 'roommate', posted_by=self.poster, interests='Gamer',
+            )
+
+    async def test_async_views_serve_the_public_pages(self):
+        cases = [
+            (reverse('home'), async_views.home),
+            (reverse('houses') + '?q=flat&max_budget=90000', async_views.houses),
+            (reverse('roommates') + '?tags=gamer', async_views.roommates),
+            (reverse('listing_detail', args=[(await Listing.objects.afirst()).id]), async_views.listing_detail),
+            (reverse('user_profile', args=[self.poster.id]), async_views.user_profile),
+        ]
+        for url, view in cases:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIs(response.resolver_match.func, view)
+        # Non-public routes keep their sync views
+        response = await self.async_client.get(reverse('login'))
+        self.assertEqual(response.resolver_match.func.__name__, 'login_view')
+
+    async def test_same_pages_as_sync_views(self):
+        for url in (reverse('houses') + '?q=flat', reverse('roommates'), reverse('user_profile', args=[self.poster.id])):
+            with self.settings(ROOT_URLCONF='roomlink.urls'):
+                expected = await sync_to_async(self.client.get)(url)
+            response = await self.async_client.get(url)
+            self.assertEqual(response.content, expected.content, url)
+
+    async def test_anonymous_pages_cached(self):
+        await sync_to_async(page_cache.bump_generation)()
+        url = reverse('roommates') + '?gender=female'
+        self.assertEqual((await self.async_client.get(url))[page_cache.STATUS_HEADER], 'miss')
+        self.assertEqual((await self.async_client.get(url))[page_cache.STATUS_HEADER], 'hit')
+
+    async def test_queries_recorded_and_user_resolved(self):
+        await self.async_client.aforce_login(self.poster)
+        response = await self.async_client.get(reverse('houses'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        # Loaded before rendering, not left lazy for the template to query
+        self.assertIs(type(response.asgi_request.user), User)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    def test_wsgi_and_asgi_serve_the_load(self):
+        call_command('seed_scale', listings=40, seed=3, stdout=StringIO())
+        results = benchmarks.run_concurrent(WSGIHandler(), AsyncViewsHandler(), [1, 4], total=12)
+        self.assertEqual(set(results), {1, 4})
+        for servers in results.values():
+            for stats in servers.values():
+                self.assertEqual((stats['requests'], stats['errors']), (12, 0))
+                self.assertGreater(stats['rps'], 0)
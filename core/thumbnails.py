@@ -0,0 +1,146 @@
+"""
+Resized derivatives of uploaded images.
+
+Every listing photo and profile picture gets WebP and JPEG copies at a few
+widths so cards can pick a 320px file instead of the original phone photo.
+Derivatives live next to each other under `thumbs/`, named after the
+original, e.g. `listing_images/house.jpg` ->
+`thumbs/listing_images/house_320.webp`. Once they are written, the widths
+that exist and whether WebP copies do are recorded in a JSON column next to
+the image (`<field>_derivatives`, e.g. Listing.image_derivatives) together
+with the image name they belong to. The responsive_img tag builds srcsets
+from that record alone, without touching storage, and a record for another
+name (the image was replaced) counts as missing. Re-encoding drops EXIF (GPS
+position, camera serial, ...) after applying its rotation to the pixels.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_ROOT = 'thumbs'
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def webp_supported():
+    return features.check('webp')
+
+
+def derivative_name(name, width, ext):
+    stem, _ = posixpath.splitext(name)
+    return f'{THUMBNAIL_ROOT}/{stem}_{width}.{ext}'
+
+
+def target_widths(original_width):
+    """
+    Widths to generate. We never upscale; an image narrower than the smallest
+    width is stored under that width's name at its own size, so every image
+    has at least one derivative.
+    """
+    widths = [w for w in THUMBNAIL_WIDTHS if w < original_width]
+    return widths or [THUMBNAIL_WIDTHS[0]]
+
+
+def available_widths(name, storage=default_storage):
+    """
+    Widths that have been generated for an image, smallest first. Only the
+    JPEG of each width is checked, since it is always written last.
+    """
+    return [w for w in THUMBNAIL_WIDTHS if storage.exists(derivative_name(name, w, 'jpg'))]
+
+
+# --- Recorded derivatives ---
+# Rendering must not stat a file per width, so the thumbnail job records what
+# it wrote in a JSON column next to the image: `<field>_derivatives`, holding
+# {'name': image name, 'widths': [...], 'webp': bool}. The name guards against
+# a record left over from the previous image.
+
+def derivatives_field(field_name):
+    return f'{field_name}_derivatives'
+
+
+def recorded_derivatives(field_file):
+    """(widths, webp) recorded for the file, or None if nothing is recorded for it yet."""
+    record = getattr(field_file.instance, derivatives_field(field_file.field.name), None) or {}
+    if not field_file or record.get('name') != field_file.name:
+        return None
+    return record['widths'], record['webp']
+
+
+def derivatives_record(name, storage=default_storage):
+    """The record for the derivatives present in storage for image `name`."""
+    widths = available_widths(name, storage) if name else []
+    return {
+        'name': name,
+        'widths': widths,
+        'webp': bool(widths) and storage.exists(derivative_name(name, widths[0], 'webp')),
+    }
+
+
+def record_derivatives(instance, field, storage=default_storage):
+    """Stores the derivatives present in storage for instance.<field>. Runs in the job, not in requests."""
+    name = getattr(instance, field).name
+    record = derivatives_record(name, storage)
+    # Only if the image hasn't been replaced meanwhile; update() so no save signals fire
+    type(instance).objects.filter(pk=instance.pk, **{field: name}).update(**{derivatives_field(field): record})
+    setattr(instance, derivatives_field(field), record)
+    return record
+
+
+def needs_derivatives(field_file):
+    return bool(field_file) and recorded_derivatives(field_file) is None
+
+
+def _encode(image, ext):
+    buffer = BytesIO()
+    if ext == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_derivatives(field_file, force=False, storage=default_storage):
+    """
+    Writes the WebP/JPEG derivatives for an ImageField file. Returns the list
+    of derivative names written (empty if they already existed or the file
+    could not be read as an image).
+    """
+    if not field_file:
+        return []
+    name = field_file.name
+    if not field_file.storage.exists(name):
+        return []
+    if not force and available_widths(name, storage):
+        return []
+
+    try:
+        with field_file.storage.open(name, 'rb') as source:
+            image = Image.open(source)
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("Could not generate thumbnails for %s", name, exc_info=True)
+        return []
+
+    extensions = ('webp', 'jpg') if webp_supported() else ('jpg',)
+    written = []
+    for width in target_widths(image.width):
+        if width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        else:
+            resized = image
+        for ext in extensions:
+            target = derivative_name(name, width, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            written.append(storage.save(target, _encode(resized, ext)))
+    return written
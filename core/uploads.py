@@ -0,0 +1,228 @@
+"""
+Upload limits enforced while the bytes arrive, and resumable chunked uploads
+for listing videos.
+
+LimitedUploadHandler sits first in FILE_UPLOAD_HANDLERS. It checks each file
+of a normal multipart form against FIELD_LIMITS and drops the file as soon as
+it is clearly too big or the wrong type, instead of letting Django buffer the
+whole body before ListingForm.clean_videos gets to look at it. Rejections are
+collected on request.upload_errors for the view to report.
+
+The chunked endpoints (see core.views) let slow connections send a video in
+pieces and resume after a failure: bytes are appended to a staging file, and
+the finished file is moved, not copied, into MEDIA_ROOT when the listing is
+saved. A user can have MAX_ACTIVE_UPLOADS in progress at once; uploads left
+untouched for UPLOAD_EXPIRY are deleted with their staging files by
+`manage.py expire_uploads` (run it from cron).
+"""
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import ChunkedUpload, ListingVideo
+from .validators import MAX_IMAGE_SIZE, MAX_IMAGE_SIZE_MB, MAX_VIDEO_SIZE, MAX_VIDEO_SIZE_MB, looks_like_video
+
+# form field name -> (max bytes, size label, required content type prefix)
+FIELD_LIMITS = {
+    'videos': (MAX_VIDEO_SIZE, f'{MAX_VIDEO_SIZE_MB}MB', 'video/'),
+    'images': (MAX_IMAGE_SIZE, f'{MAX_IMAGE_SIZE_MB}MB', 'image/'),
+    'profile_picture': (MAX_IMAGE_SIZE, f'{MAX_IMAGE_SIZE_MB}MB', 'image/'),
+}
+
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Per user; a listing takes at most 2 videos, the rest is room for retries
+MAX_ACTIVE_UPLOADS = 4
+UPLOAD_EXPIRY = timedelta(hours=24)
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    def new_file(self, field_name, file_name, content_type, content_length, *args, **kwargs):
+        super().new_file(field_name, file_name, content_type, content_length, *args, **kwargs)
+        self.limit = FIELD_LIMITS.get(field_name)
+        self.received = 0
+        if self.limit is None:
+            return
+        max_size, size_label, type_prefix = self.limit
+        # Some browsers send no useful type for less common formats; the
+        # video sniffing below and Pillow's image check still apply then.
+        generic = content_type in (None, '', 'application/octet-stream')
+        if not generic and not content_type.startswith(type_prefix):
+            self.reject(f"{file_name} is not a {type_prefix.rstrip('/')} file.")
+        if content_length and content_length > max_size:
+            self.reject(f"{file_name} exceeds the {size_label} limit.")
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.limit is not None:
+            max_size, size_label, type_prefix = self.limit
+            if start == 0 and type_prefix == 'video/' and not looks_like_video(raw_data[:16]):
+                self.reject(f"{self.file_name} is not a supported video file.")
+            self.received += len(raw_data)
+            if self.received > max_size:
+                self.reject(f"{self.file_name} exceeds the {size_label} limit.")
+        # Pass the data on to the handler that actually stores it
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def reject(self, message):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = []
+        self.request.upload_errors.append(message)
+        raise SkipFile(message)
+
+
+# --- Chunked uploads ---
+
+def staging_dir():
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'upload_staging'))
+
+
+def staging_path(upload):
+    return os.path.join(staging_dir(), f'{upload.id}.part')
+
+
+def start_upload(user, filename, total_size):
+    if total_size <= 0:
+        raise UploadRejected("Empty file.")
+    if total_size > MAX_VIDEO_SIZE:
+        raise UploadRejected(f"Max video size is {MAX_VIDEO_SIZE_MB}MB", status=413)
+    # The user's own abandoned uploads don't count against the limit
+    expire_uploads(user=user)
+    if ChunkedUpload.objects.filter(user=user, status='uploading').count() >= MAX_ACTIVE_UPLOADS:
+        raise UploadRejected("Too many uploads in progress. Finish or wait for the others first.", status=429)
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        filename=get_valid_filename(os.path.basename(filename)) or 'video.mp4',
+        total_size=total_size,
+    )
+    os.makedirs(staging_dir(), exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def receive_chunk(upload, content_range, stream, content_length):
+    """
+    Appends one chunk to the staging file. Chunks must arrive in order: the
+    client asks for `upload.received` and continues from there after a
+    failure. The body is streamed to disk, never held in memory whole.
+    """
+    match = CONTENT_RANGE_RE.match(content_range or '')
+    if not match:
+        raise UploadRejected("Missing or invalid Content-Range header.")
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+    if upload.status != 'uploading':
+        raise UploadRejected("Upload already finished.", status=409)
+    if total != upload.total_size or end >= total or length <= 0 or length != content_length:
+        raise UploadRejected("Content-Range does not match the upload.")
+    if length > MAX_CHUNK_SIZE:
+        raise UploadRejected("Chunk too large.", status=413)
+    if start != upload.received:
+        raise UploadRejected(f"Expected offset {upload.received}.", status=409)
+
+    written = 0
+    with open(staging_path(upload), 'r+b') as target:
+        target.seek(start)
+        target.truncate()
+        while written < length:
+            block = stream.read(min(64 * 1024, length - written))
+            if not block:
+                break
+            if start == 0 and written == 0 and not looks_like_video(block[:16]):
+                discard(upload)
+                raise UploadRejected("Not a supported video file.", status=415)
+            target.write(block)
+            written += len(block)
+    if written != length:
+        # Connection dropped mid-chunk; the client resends it from `received`
+        raise UploadRejected("Incomplete chunk.")
+
+    upload.received = end + 1
+    if upload.received == upload.total_size:
+        upload.status = 'complete'
+    upload.save(update_fields=['received', 'status', 'updated_at'])
+    return upload
+
+
+def discard(upload):
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def expire_uploads(older_than=UPLOAD_EXPIRY, user=None):
+    """
+    Deletes uploads that were never attached to a listing and haven't
+    changed for `older_than`, with their staging files. Returns how many.
+    """
+    stale = ChunkedUpload.objects.filter(
+        status__in=('uploading', 'complete'), updated_at__lt=timezone.now() - older_than,
+    )
+    if user is not None:
+        stale = stale.filter(user=user)
+    expired = 0
+    for upload in stale.iterator():
+        discard(upload)
+        expired += 1
+    return expired
+
+
+def attach_videos(listing, user, upload_ids, limit):
+    """
+    Turns finished chunked uploads into ListingVideos, at most `limit` of
+    them. Returns the number attached.
+    """
+    valid_ids = []
+    for upload_id in upload_ids:
+        try:
+            valid_ids.append(uuid.UUID(upload_id))
+        except ValueError:
+            continue
+    uploads = ChunkedUpload.objects.filter(id__in=valid_ids, user=user, status='complete')[:max(limit, 0)]
+    attached = 0
+    for upload in uploads:
+        ListingVideo.objects.create(listing=listing, video=_store_staged_file(upload))
+        upload.status = 'attached'
+        upload.save(update_fields=['status', 'updated_at'])
+        attached += 1
+    return attached
+
+
+def _store_staged_file(upload):
+    """Moves a finished upload into the media storage and returns its name."""
+    name = f'listing_videos/{upload.filename}'
+    source = staging_path(upload)
+    if hasattr(default_storage, 'import_file'):
+        # Content-addressed storage (core.storage) dedupes while moving
+        return default_storage.import_file(name, source)
+    name = default_storage.get_available_name(name)
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storage: stream the file across in chunks
+        with open(source, 'rb') as f:
+            name = default_storage.save(name, File(f))
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+    return name
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Public
@@ -8,6 +8,12 @@ urlpatterns = [
     path('houses/<int:id>/', views.listing_detail, name='listing_detail'),
     path('user/<int:user_id>/', views.user_profile, name='user_profile'),
     path('roommates/', views.roommates, name='roommates'),
+    path('api/rent-stats/', views.rent_stats_api, name='rent_stats'),
+
+    # Read-only JSON API
+    path('api/v1/listings/', api.listings, name='api_listings'),
+    path('api/v1/listings/<int:id>/', api.listing_detail, name='api_listing_detail'),
+    path('api/v1/users/<int:user_id>/listings/', api.user_listings, name='api_user_listings'),
     
     # Auth
     path('signup/', views.signup_view, name='signup'),
@@ -25,4 +31,8 @@ urlpatterns = [
     path('my-listings/edit/<int:id>/', views.edit_listing, name='edit_listing'),
     path('my-listings/delete/<int:id>/', views.delete_listing, name='delete_listing'),
     path('settings/', views.settings, name='settings'),
+
+    # Resumable video uploads
+    path('uploads/videos/', views.chunked_upload_start, name='chunked_upload_start'),
+    path('uploads/videos/<uuid:upload_id>/', views.chunked_upload, name='chunked_upload'),
 ]
\ No newline at end of file
@@ -1,7 +1,25 @@
 from django.core.exceptions import ValidationError
 
+MAX_VIDEO_SIZE_MB = 20
+MAX_VIDEO_SIZE = MAX_VIDEO_SIZE_MB * 1024 * 1024
+MAX_IMAGE_SIZE_MB = 10
+MAX_IMAGE_SIZE = MAX_IMAGE_SIZE_MB * 1024 * 1024
+
 def validate_video_size(value):
     filesize = value.size
-    limit_mb = 20
-    if filesize > limit_mb * 1024 * 1024:
-        raise ValidationError(f"Max video size is {limit_mb}MB")
+    if filesize > MAX_VIDEO_SIZE:
+        raise ValidationError(f"Max video size is {MAX_VIDEO_SIZE_MB}MB")
+
+def looks_like_video(head):
+    """
+    Checks the first bytes of a file against the containers phones and
+    browsers record in: MP4/MOV/3GP ('ftyp' box), WebM/MKV (EBML) and AVI.
+    The client's Content-Type alone is easy to fake.
+    """
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return True
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return True
+    if head.startswith(b'RIFF') and head[8:12] == b'AVI ':
+        return True
+    return False
@@ -0,0 +1,123 @@
+"""
+Write-behind view counting for listings.
+
+listing_detail used to do `views_count += 1; save()` on every GET, which took
+the SQLite write lock on our busiest read path and lost increments when two
+requests raced. Views are now collected in memory per process and written
+out in batches of `UPDATE ... SET views_count = views_count + n` once
+VIEW_COUNT_FLUSH_INTERVAL seconds have passed. The flush runs from the
+request_finished signal, i.e. after the response has been sent, so page
+reads themselves never write.
+
+Server processes (roomlink.wsgi, roomlink.asgi) also call start_worker(): a
+background thread then flushes due views even when no requests arrive, and
+the buffer is flushed once more when the process exits, so a restart or a
+deploy keeps the views counted so far. Only a process that is killed
+outright loses up to one interval of views; that is the trade-off for
+taking writes off the hot path.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import F
+
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 30
+
+
+class ViewCounter:
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._worker_enabled = False
+        self._worker_pid = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def record(self, listing_id):
+        with self._lock:
+            self._pending[listing_id] += 1
+            # Started on first use, so each process forked after start_worker() gets its own thread
+            if self._worker_enabled and self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                threading.Thread(target=self._work, name='view-counter-flush', daemon=True).start()
+
+    def pending(self, listing_id):
+        with self._lock:
+            return self._pending[listing_id]
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+    def flush_due(self):
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush_if_due(self):
+        if self.flush_due():
+            self.flush_quietly()
+
+    def flush_quietly(self):
+        if not self._pending:
+            return
+        try:
+            self.flush()
+        except DatabaseError:
+            # Views were put back into the buffer; the next flush retries them
+            logger.exception("Could not flush listing view counts")
+
+    def flush(self):
+        """
+        Writes all buffered views to the database and returns how many
+        listings were updated. Listings with the same number of new views
+        share one UPDATE statement.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+
+        by_count = defaultdict(list)
+        for listing_id, count in pending.items():
+            by_count[count].append(listing_id)
+
+        try:
+            for count, listing_ids in by_count.items():
+                Listing.objects.filter(id__in=listing_ids).update(views_count=F('views_count') + count)
+        except DatabaseError:
+            # Put the views back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return len(pending)
+
+    # --- Background flushing (server processes) ---
+
+    def start_worker(self):
+        """Flushes due views from a background thread, and the rest at exit."""
+        with self._lock:
+            if self._worker_enabled:
+                return
+            self._worker_enabled = True
+        atexit.register(self.flush_quietly)
+
+    def _work(self):
+        while True:
+            time.sleep(max(self.flush_interval, 1))
+            self.flush_if_due()
+            # The thread's own connection; the next flush opens a fresh one
+            connection.close()
+
+
+view_counter = ViewCounter()
@@ -2,37 +2,47 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Listing, User, ListingImage, ListingVideo
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST, require_safe
+from .models import Listing, User, ListingImage, ListingVideo, ChunkedUpload, RentSummary
 from .forms import SignupForm, LoginForm, ListingForm, VerificationForm, ProfileUpdateForm, UpdateAvatarForm
-from django.db.models import Case, When, Value, IntegerField, Q
+from django.db.models import Case, When, Value, IntegerField, Q, prefetch_related_objects
+from .pagination import FEED_ORDERING, FEED_PAGE_SIZE, paginate_feed, next_page_url
+from . import geo, rent_stats, search, tags, uploads
+from .matching import roommate_index, seeker_from_listing
+from .page_cache import cache_anonymous_page
+from .view_counter import view_counter
 
 # --- Public Views ---
 
+@cache_anonymous_page
 def home(request):
     # Featured listings: Verified listings first, then recent
-    featured_houses = Listing.objects.all().order_by(
-        '-is_verified_listing', '-created_at'
-    )[:20]
+    featured_houses = Listing.objects.for_cards().order_by(*FEED_ORDERING)[:FEED_PAGE_SIZE]
     return render(request, 'home.html', {'featured_houses': featured_houses})
 
-def houses(request):
+HOUSE_SEARCH_COLUMNS = ('title', 'location', 'description')
+
+
+def house_feed_query(request):
+    """
+    The houses feed with the request's filters applied, and the values the
+    page needs: (queryset, q, near, radius, sort_by_distance). Runs no
+    queries, so core.async_views builds its feed with it too.
+    """
     # Sort: Verified listings higher
     # Logic: 
     # 1. Verified Listing (Highest)
     # 2. Verified User
     # 3. Unverified
     
-    # Simple sorting by verified listing boolean first
-    houses = Listing.objects.filter(listing_type='house').order_by('-is_verified_listing', '-created_at')
+    # Simple sorting by verified listing boolean first (applied by paginate_feed)
+    houses = Listing.objects.for_cards().filter(listing_type='house')
     
-    # Filter logic (basic)
+    # Filter logic (basic). Searches only the house's own text, not the poster.
     q = request.GET.get('q')
-    if q:
-        houses = houses.filter(
-            Q(location__icontains=q) | 
-            Q(title__icontains=q) | 
-            Q(description__icontains=q)
-        )
+    if q and not search.search_available():
+        houses = search.fallback_filter(houses, q, HOUSE_SEARCH_COLUMNS)
     
     min_budget = request.GET.get('min_budget')
     max_budget = request.GET.get('max_budget')
@@ -42,22 +52,52 @@ def houses(request):
     if max_budget:
         houses = houses.filter(rent__lte=max_budget)
 
-    return render(request, 'houses.html', {'houses': houses})
+    # Proximity: ?near=<gazetteer place>&km=2&sort=distance
+    near = geo.get_place(request.GET.get('near'))
+    radius = geo.parse_radius(request.GET.get('km'))
+    if near:
+        houses = geo.within(houses, near.latitude, near.longitude, radius)
+    sort_by_distance = near is not None and request.GET.get('sort') == 'distance'
+    return houses, q, near, radius, sort_by_distance
 
-def roommates(request):
+def houses_context(request, houses, next_cursor, near, radius, summary):
+    return {
+        'houses': houses,
+        'next_page_url': next_page_url(request, next_cursor),
+        'places': geo.all_places(),
+        'near': near,
+        'radius': radius,
+        'rent_summary': rent_stats.as_dict(summary),
+    }
+
+@cache_anonymous_page
+def houses(request):
+    houses, q, near, radius, sort_by_distance = house_feed_query(request)
+
+    # Searches are ranked by relevance (BM25 + verified boost) instead
+    if sort_by_distance:
+        if q and search.search_available():
+            houses = houses.filter(id__in=search.ranked_ids(q, HOUSE_SEARCH_COLUMNS))
+        houses, next_cursor = geo.distance_feed(houses, request.GET.get('cursor'))
+    elif q and search.search_available():
+        houses, next_cursor = search.search_feed(houses, q, HOUSE_SEARCH_COLUMNS, request.GET.get('cursor'))
+    else:
+        houses, next_cursor = paginate_feed(houses, request.GET.get('cursor'))
+    summary = rent_stats.get_summary('house', near.slug if near else '')
+    return render(request, 'houses.html', houses_context(request, houses, next_cursor, near, radius, summary))
+
+def roommate_feed_query(request):
+    """
+    The roommates feed with the request's filters applied:
+    (queryset, q, gender, selected_tags, tag_mode). Runs no queries.
+    """
     # Show roommate listings
-    roommates = Listing.objects.filter(listing_type='roommate').order_by('-is_verified_listing', '-created_at')
+    roommates = Listing.objects.for_cards().filter(listing_type='roommate')
     
     # Filter logic
     q = request.GET.get('q')
-    if q:
-        roommates = roommates.filter(
-            Q(location__icontains=q) | 
-            Q(title__icontains=q) | 
-            Q(description__icontains=q) |
-            Q(interests__icontains=q) |
-            Q(posted_by__full_name__icontains=q)
-        )
+    if q and not search.search_available():
+        roommates = search.fallback_filter(roommates, q, search.FTS_COLUMNS)
     
     min_budget = request.GET.get('min_budget')
     max_budget = request.GET.get('max_budget')
@@ -71,23 +111,92 @@ def roommates(request):
     if gender:
         roommates = roommates.filter(gender_preference=gender)
 
-    return render(request, 'roommates.html', {'roommates': roommates})
+    # Exact interest tags: ?tags=gamer&tags=studious&tag_mode=any
+    selected_tags = request.GET.getlist('tags')
+    tag_mode = 'any' if request.GET.get('tag_mode') == 'any' else 'all'
+    roommates = tags.filter_by_tags(roommates, selected_tags, tag_mode)
+    return roommates, q, gender, selected_tags, tag_mode
+
+@cache_anonymous_page
+def roommates(request):
+    if request.GET.get('match') and request.user.is_authenticated:
+        return roommate_matches(request)
+
+    roommates, q, gender, selected_tags, tag_mode = roommate_feed_query(request)
+    if q and search.search_available():
+        roommates, next_cursor = search.search_feed(roommates, q, cursor=request.GET.get('cursor'))
+    else:
+        roommates, next_cursor = paginate_feed(roommates, request.GET.get('cursor'))
+    return render(request, 'roommates.html', {
+        'roommates': roommates,
+        'next_page_url': next_page_url(request, next_cursor),
+        'interest_facets': tags.facet_counts(gender),
+        'selected_tags': selected_tags,
+        'tag_mode': tag_mode,
+        'rent_summary': rent_stats.as_dict(rent_stats.get_summary('roommate')),
+    })
+
+def match_seeker(request, own):
+    """The compatibility seeker for ?match=1: the user's own request, or ?interests."""
+    interests = request.GET.getlist('interests')
+    max_budget = request.GET.get('max_budget')
+    if own is not None:
+        seeker = seeker_from_listing(own, rent=max_budget)
+        if interests:
+            seeker = (roommate_index.encode_seeker(interests)[0],) + seeker[1:]
+        return seeker
+    return roommate_index.encode_seeker(interests, request.GET.get('gender'), request.GET.get('level'), max_budget)
+
+def find_matches(request, seeker):
+    return roommate_index.best_matches(
+        seeker,
+        exclude_poster=request.user.id,
+        gender=request.GET.get('gender'),
+        min_rent=request.GET.get('min_budget'),
+        max_rent=request.GET.get('max_budget'),
+    )
+
+def rank_matches(matches, listings):
+    ranked = []
+    for listing_id, score in matches:
+        listing = listings.get(listing_id)
+        if listing is not None:
+            listing.match_score = round(score * 100)
+            ranked.append(listing)
+    return ranked
+
+def roommate_matches(request):
+    """Roommate listings ranked by compatibility with the user's own request."""
+    own = Listing.objects.filter(posted_by=request.user, listing_type='roommate').order_by('-created_at').first()
+    if own is None and not request.GET.getlist('interests'):
+        messages.info(request, "Post a roommate request first so we can find your best matches.")
+        return redirect('roommates')
+
+    matches = find_matches(request, match_seeker(request, own))
+    listings = Listing.objects.for_cards().in_bulk([listing_id for listing_id, _ in matches])
+    return render(request, 'roommates.html', {'roommates': rank_matches(matches, listings), 'match_mode': True})
 
 def listing_detail(request, id):
-    house = get_object_or_404(Listing, id=id)
-    
-    # Increment view count
-    house.views_count += 1
-    house.save()
+    house = get_object_or_404(Listing.objects.select_related('posted_by'), id=id)
+    prefetch_related_objects([house], *media_lookups(house))
     
+    # Count the view in memory; core.view_counter writes it out in batches
+    view_counter.record(house.id)
+    return render(request, 'listing_detail.html', detail_context(house))
+
+def media_lookups(house):
+    """The gallery / video prefetches worth running: none for media the listing has none of."""
+    return [lookup for lookup, count in (('images', house.image_count), ('videos', house.video_count)) if count]
+
+def detail_context(house):
     interests_list = []
     if house.interests:
         interests_list = [i.strip() for i in house.interests.split(',')]
-    return render(request, 'listing_detail.html', {'house': house, 'interests_list': interests_list})
+    return {'house': house, 'interests_list': interests_list}
 
 def user_profile(request, user_id):
     profile_user = get_object_or_404(User, id=user_id)
-    user_listings = Listing.objects.filter(posted_by=profile_user).order_by('-created_at')
+    user_listings = Listing.objects.for_cards().filter(posted_by=profile_user).order_by('-created_at')
     return render(request, 'user_profile.html', {'profile_user': profile_user, 'user_listings': user_listings})
 
 # --- Auth Views ---
@@ -126,15 +235,21 @@ def logout_view(request):
 
 # --- Protected Views ---
 
+def report_upload_errors(request):
+    # Files dropped by uploads.LimitedUploadHandler while the form streamed in
+    for error in getattr(request, 'upload_errors', []):
+        messages.error(request, error)
+
 @login_required
 def profile(request):
-    user_listings = Listing.objects.filter(posted_by=request.user)
-    return render(request, 'profile.html', {'user_listings': user_listings})
+    # The listing count comes from request.user.listing_count
+    return render(request, 'profile.html')
 
 @login_required
 def update_avatar(request):
     if request.method == 'POST':
         form = UpdateAvatarForm(request.POST, request.FILES, instance=request.user)
+        report_upload_errors(request)
         if form.is_valid():
             form.save()
             messages.success(request, "Profile picture updated!")
@@ -146,6 +261,7 @@ def update_avatar(request):
 def post_listing(request):
     if request.method == 'POST':
         form = ListingForm(request.POST, request.FILES)
+        report_upload_errors(request)
         if form.is_valid():
             listing = form.save(commit=False)
             listing.posted_by = request.user
@@ -180,6 +296,11 @@ def post_listing(request):
                 for video in videos:
                     ListingVideo.objects.create(listing=listing, video=video)
 
+            # Videos sent ahead through the resumable uploader
+            upload_ids = request.POST.getlist('video_uploads')
+            if upload_ids:
+                uploads.attach_videos(listing, request.user, upload_ids, limit=2 - len(videos))
+
             messages.success(request, "Listing posted successfully!")
             
             # Redirect based on type
@@ -206,7 +327,7 @@ def upload_verification(request):
 
 @login_required
 def my_listings(request):
-    user_listings = Listing.objects.filter(posted_by=request.user).order_by('-created_at')
+    user_listings = Listing.objects.for_cards().filter(posted_by=request.user).order_by('-created_at')
     return render(request, 'my_listings.html', {'user_listings': user_listings})
 
 @login_required
@@ -214,6 +335,7 @@ def edit_listing(request, id):
     listing = get_object_or_404(Listing, id=id, posted_by=request.user)
     if request.method == 'POST':
         form = ListingForm(request.POST, request.FILES, instance=listing)
+        report_upload_errors(request)
         if form.is_valid():
             listing = form.save(commit=False)
             
@@ -233,15 +355,25 @@ def edit_listing(request, id):
             if delete_video_ids:
                 ListingVideo.objects.filter(id__in=delete_video_ids, listing=listing).delete()
 
-            # Handle new videos
+            # Handle new videos. The signals keep video_count in the database,
+            # so it is reloaded rather than read off this instance.
             videos = request.FILES.getlist('videos')
             if videos:
-                current_video_count = listing.videos.count()
+                listing.refresh_from_db(fields=['video_count'])
+                current_video_count = listing.video_count
                 if current_video_count + len(videos) > 2:
                     messages.warning(request, f"You can only have 2 videos. You already have {current_video_count}.")
                 else:
                     for video in videos:
                         ListingVideo.objects.create(listing=listing, video=video)
+
+            upload_ids = request.POST.getlist('video_uploads')
+            if upload_ids:
+                listing.refresh_from_db(fields=['video_count'])
+                remaining = 2 - listing.video_count
+                if remaining < len(upload_ids):
+                    messages.warning(request, "You can only have 2 videos. Extra videos were not added.")
+                uploads.attach_videos(listing, request.user, upload_ids, limit=remaining)
             
             # Handle multi-select interests for roommates
             if listing.listing_type == 'roommate':
@@ -267,6 +399,7 @@ def delete_listing(request, id):
 def settings(request):
     if request.method == 'POST':
         form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user)
+        report_upload_errors(request)
         if form.is_valid():
             form.save()
             messages.success(request, "Profile updated successfully.")
@@ -275,3 +408,48 @@ def settings(request):
         form = ProfileUpdateForm(instance=request.user)
     
     return render(request, 'settings.html', {'form': form})
+
+# --- Chunked Uploads ---
+# Used by the resumable video uploader in static/js/app.js
+
+@login_required
+@require_POST
+def chunked_upload_start(request):
+    try:
+        upload = uploads.start_upload(request.user, request.POST.get('filename', ''), int(request.POST.get('size', '')))
+    except ValueError:
+        return JsonResponse({'error': "Invalid file size."}, status=400)
+    except uploads.UploadRejected as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'id': str(upload.id), 'offset': 0, 'chunk_size': uploads.CHUNK_SIZE}, status=201)
+
+@login_required
+def chunked_upload(request, upload_id):
+    # GET reports how far the upload got (to resume); POST appends a chunk
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    if request.method == 'POST':
+        try:
+            content_length = int(request.headers.get('Content-Length') or 0)
+            upload = uploads.receive_chunk(upload, request.headers.get('Content-Range'), request, content_length)
+        except uploads.UploadRejected as e:
+            return JsonResponse({'error': str(e), 'offset': upload.received}, status=e.status)
+    return JsonResponse({
+        'id': str(upload.id),
+        'offset': upload.received,
+        'size': upload.total_size,
+        'status': upload.status,
+    })
+
+# --- Rent Statistics ---
+
+@require_safe
+def rent_stats_api(request):
+    """Rent histogram and percentiles for ?type=house|roommate and optional ?area=<place>."""
+    listing_type = request.GET.get('type', 'house')
+    if listing_type not in dict(Listing.LISTING_TYPE_CHOICES):
+        return JsonResponse({'error': "type must be 'house' or 'roommate'."}, status=400)
+    area = request.GET.get('area', '')
+    summary = rent_stats.get_summary(listing_type, area) or RentSummary(listing_type=listing_type, area=area)
+    response = JsonResponse(rent_stats.as_dict(summary))
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
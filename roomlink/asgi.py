@@ -3,14 +3,29 @@ ASGI config for roomlink project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Requests served under ASGI resolve against settings.ASGI_URLCONF, which
+routes the read-heavy public pages to the async views in core.async_views
+(see roomlink.handlers). WSGI keeps using ROOT_URLCONF and the synchronous
+views.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomlink.settings')
 
-application = get_asgi_application()
+
+def get_application():
+    django.setup(set_prefix=False)
+    from core.view_counter import view_counter
+    from roomlink.handlers import AsyncViewsHandler
+
+    view_counter.start_worker()
+    return AsyncViewsHandler()
+
+
+application = get_application()
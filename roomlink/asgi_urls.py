@@ -0,0 +1,15 @@
+"""
+Root URLconf for ASGI: roomlink.urls with core.urls replaced by
+core.async_urls. Set per request by roomlink.handlers.AsyncViewsHandler.
+"""
+from django.urls import include, path
+
+import core.urls
+
+from . import urls
+
+urlpatterns = [
+    path(str(pattern.pattern), include('core.async_urls'))
+    if getattr(pattern, 'urlconf_name', None) is core.urls else pattern
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,14 @@
+"""
+The ASGI handler behind roomlink.asgi, importable without building the
+application (benchmark_concurrency and the tests instantiate their own).
+"""
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+
+
+class AsyncViewsHandler(ASGIHandler):
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = getattr(settings, 'ASGI_URLCONF', settings.ROOT_URLCONF)
+        return request, error_response
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -28,7 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -38,10 +41,13 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'roomlink.urls'
+# Served under ASGI (roomlink.asgi): the public pages use the async views
+ASGI_URLCONF = 'roomlink.asgi_urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, with render time reported to core.perf
+        'BACKEND': 'core.perf.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -59,13 +65,49 @@ WSGI_APPLICATION = 'roomlink.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# busy_timeout makes a second writer wait for the lock instead of failing
+# with "database is locked", and IMMEDIATE transactions take that lock up
+# front. WAL lets the feeds read while a write is in progress, but it is
+# written into the database file itself and leaves -wal/-shm files next to
+# it, so it is only switched on where ROOMLINK_SQLITE_WAL=1 (the deployed
+# database), not for the db.sqlite3 checked into the repository.
+SQLITE_INIT_COMMAND = 'PRAGMA busy_timeout=5000'
+if os.environ.get('ROOMLINK_SQLITE_WAL') == '1':
+    SQLITE_INIT_COMMAND = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; ' + SQLITE_INIT_COMMAND
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Read replica (optional). Listing and user reads of GET requests go here
+# (see core.routers). Locally, point ROOMLINK_REPLICA_DB at a second SQLite
+# file and run `manage.py simulate_replica --lag 2` to keep it in sync.
+REPLICA_DB = os.environ.get('ROOMLINK_REPLICA_DB')
+if REPLICA_DB:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DB,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + '; PRAGMA query_only=ON',
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Reads stay on the primary this long after a user's write (seconds);
+# keep it above the replication lag
+REPLICA_PIN_SECONDS = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -100,6 +142,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# `collectstatic` minifies, fingerprints and precompresses into STATIC_ROOT
+# (core.assets); Django serves it with far-future caching unless the web
+# server does (SERVE_STATIC = False)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+SERVE_STATIC = True
+# Static bytes (as transferred) one page may pull in; see `manage.py asset_budget`
+STATIC_BUDGET_BYTES = 100 * 1024
 
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
@@ -107,6 +156,54 @@ AUTH_USER_MODEL = 'core.User'
 # Media files (Uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+SERVE_MEDIA = True
+
+# Uploads are stored once per distinct content (see core.storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.MinifiedManifestStaticFilesStorage',
+    },
+}
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 30
+# Set to an nginx `internal` location (e.g. '/protected-media/') to let the
+# proxy send media files after Django has checked access
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+
+# Cache
+# Card fragments, anonymous feed pages and their version stamps live here.
+# With several worker processes, point this at a shared backend
+# (Redis/Memcached) so invalidations and hit/miss counters are seen by every
+# worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roomlink',
+    }
+}
+
+# Listing views are buffered in memory and written out at most this often (seconds)
+VIEW_COUNT_FLUSH_INTERVAL = 30
+
+# Request performance (core.perf)
+# Requests slower than this, plus a sample of the rest, go to PERF_LOG_FILE;
+# summarize it with `manage.py perf_report`
+PERF_SLOW_REQUEST_MS = 500
+PERF_LOG_SAMPLE_RATE = 0.05
+PERF_LOG_FILE = BASE_DIR / 'logs' / 'perf.jsonl'
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+# Send the timings and query counts to the client as a Server-Timing header
+PERF_SERVER_TIMING = DEBUG
+
+# Uploads
+# LimitedUploadHandler rejects oversize / wrong-type files while they stream in
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 # Auth Redirects
 LOGIN_URL = 'signup'
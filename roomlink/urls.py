@@ -14,15 +14,33 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.assets import serve_static
+from core import moderation
+from core.media import serve_media
 
 urlpatterns = [
+    # Pending verifications and listing review (staff only)
+    path('admin/moderation/', admin.site.admin_view(moderation.queue), name='moderation_queue'),
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media with Range/ETag support (video seeking), in development and production.
+# Turn off if the web server serves MEDIA_ROOT directly.
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
+
+# Collected static files (hashed names cached as immutable, .br/.gz variants
+# negotiated). `runserver` serves the source files itself in DEBUG.
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static, name='static'),
+    ]
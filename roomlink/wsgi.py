@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomlink.settings')
 
 application = get_wsgi_application()
+
+# Flushes buffered listing views when idle and at shutdown (needs the app registry)
+from core.view_counter import view_counter  # noqa: E402
+
+view_counter.start_worker()
@@ -63,3 +63,131 @@ if (postForm) {
         // Allow form to submit normally to Django
     });
 }
+
+// --- Feed Pagination ("Load more") ---
+// The link works without JS (it just opens the next page). With JS we fetch
+// the next page and append its cards to the current list instead.
+
+document.addEventListener('click', async (e) => {
+    const link = e.target.closest('.load-more-link');
+    if (!link) return;
+    e.preventDefault();
+
+    const list = document.getElementById(link.dataset.target);
+    const container = link.closest('.load-more');
+    link.textContent = 'Loading...';
+
+    try {
+        const response = await fetch(link.href);
+        const page = new DOMParser().parseFromString(await response.text(), 'text/html');
+        const nextList = page.getElementById(link.dataset.target);
+        if (list && nextList) {
+            list.append(...nextList.children);
+        }
+        // Swap in the next page's "Load more" (or drop it on the last page)
+        const nextContainer = page.querySelector('.load-more');
+        if (nextContainer) {
+            container.replaceWith(nextContainer);
+        } else {
+            container.remove();
+        }
+    } catch (err) {
+        window.location.href = link.href;
+    }
+});
+
+// --- Resumable Video Uploads ---
+// Videos are sent in chunks before the form is submitted, so a dropped
+// connection only costs the current chunk. The form then carries the upload
+// ids (video_uploads) instead of the files themselves.
+
+const CHUNK_RETRIES = 5;
+
+function csrfToken(form) {
+    const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+    return input ? input.value : '';
+}
+
+async function uploadInChunks(file, startUrl, token, onProgress) {
+    const body = new FormData();
+    body.append('filename', file.name);
+    body.append('size', file.size);
+    const started = await fetch(startUrl, { method: 'POST', body, headers: { 'X-CSRFToken': token } });
+    const state = await started.json();
+    if (!started.ok) throw new Error(state.error || 'Upload failed');
+
+    const uploadUrl = `${startUrl}${state.id}/`;
+    let offset = state.offset;
+    let failures = 0;
+
+    while (offset < file.size) {
+        const end = Math.min(offset + state.chunk_size, file.size);
+        let response = null;
+        try {
+            response = await fetch(uploadUrl, {
+                method: 'POST',
+                body: file.slice(offset, end),
+                headers: {
+                    'X-CSRFToken': token,
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+                },
+            });
+        } catch (err) {
+            // Network error: handled below like a server error
+        }
+
+        if (!response || response.status >= 500) {
+            if (++failures > CHUNK_RETRIES) throw new Error('Upload failed. Check your connection and try again.');
+            await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** failures));
+            // Ask the server how much it has before resending
+            const status = await fetch(uploadUrl).then(r => r.json()).catch(() => null);
+            if (status) offset = status.offset;
+            continue;
+        }
+
+        const result = await response.json();
+        // 409 means the server has a different offset: continue from there
+        if (!response.ok && response.status !== 409) throw new Error(result.error || 'Upload failed');
+        offset = result.offset;
+        failures = 0;
+        onProgress(offset / file.size);
+    }
+    return state.id;
+}
+
+document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach((input) => {
+    const form = input.form;
+    let uploaded = false;
+
+    form.addEventListener('submit', async (e) => {
+        if (uploaded || !input.files.length) return;
+        e.preventDefault();
+
+        const progress = document.getElementById('video-upload-progress');
+        const button = form.querySelector('button[type="submit"]');
+        if (button) button.disabled = true;
+        if (progress) progress.style.display = 'block';
+
+        try {
+            const files = Array.from(input.files);
+            for (const [index, file] of files.entries()) {
+                const id = await uploadInChunks(file, input.dataset.chunkedUpload, csrfToken(form), (fraction) => {
+                    if (progress) progress.textContent = `Uploading video ${index + 1} of ${files.length}: ${Math.round(fraction * 100)}%`;
+                });
+                const hidden = document.createElement('input');
+                hidden.type = 'hidden';
+                hidden.name = 'video_uploads';
+                hidden.value = id;
+                form.appendChild(hidden);
+            }
+            // The files are already on the server; don't send them again
+            input.value = '';
+            uploaded = true;
+            form.requestSubmit();
+        } catch (err) {
+            if (button) button.disabled = false;
+            showToast(err.message);
+        }
+    });
+});